@@ -26,6 +26,8 @@ import {
 import {BIERC20} from "./boringcrypto/boring-solidity/interfaces/IERC20.sol";
 import "./sushiswap/sushiswap/interfaces/IMasterChef.sol";
 import "./uniswapv2/interfaces/IUniswapV2Router02.sol";
+import "./uniswapv2/interfaces/IUniswapV2Factory.sol";
+import "./uniswapv2/interfaces/IUniswapV2Pair.sol";
 
 contract Strategy is BaseStrategy {
     using SafeERC20 for IERC20;
@@ -33,19 +35,71 @@ contract Strategy is BaseStrategy {
     using SafeMath for uint256;
     using RebaseLibrary for Rebase;
 
+    // Packed into a single slot
     struct KashiPairInfo {
+        IKashiPair kashiPair;
+        uint96 pid;
+    }
+
+    // In-memory view of a kashiPair, loaded once per entry point and kept in
+    // sync locally as we accrue, deposit and withdraw
+    struct KashiPairSnapshot {
         IKashiPair kashiPair;
         uint256 pid;
+        Rebase totalAsset;
+        Rebase totalBorrow;
+        uint256 interestPerBlock;
+        uint256 lastAccrued;
+        uint256 fractionInPair;
+        uint256 fractionInMasterChef;
+    }
+
+    // Returned by strategyState, everything monitoring and keepers read
+    // about a pair in one call. Amounts are in want, shares in bentoBox
+    // shares, fractions in kashiPair fractions, shareOfAssets in bps
+    struct KashiPairState {
+        IKashiPair kashiPair;
+        uint256 pid;
+        uint256 assets;
+        uint256 shareOfAssets;
+        uint256 fractionInPair;
+        uint256 fractionInMasterChef;
+        uint256 pendingSushi;
+        uint256 liquidShares;
+        uint256 utilization;
+        uint256 interestPerBlock;
+        uint256 lastAccrued;
+    }
+
+    struct StrategyState {
+        KashiPairState[] kashiPairs;
+        uint256 totalAssets;
+        uint256 idleWant;
+        uint256 idleShares;
+        uint256 idleSharesInWant;
+        uint256 sushiBalance;
     }
 
-    bool internal isOriginal = true;
     uint256 internal constant MAX_PAIRS = 5;
     uint256 internal constant MAX_BPS = 1e4;
+    uint256 internal constant MAX_DEPOSIT_CHUNKS = 20;
 
     // Kashi constants (apply to MediumRiskPairs)
     uint256 internal constant KASHI_MINIMUM_TARGET_UTILIZATION = 7e17; // 70%
     uint256 internal constant KASHI_MAXIMUM_TARGET_UTILIZATION = 8e17; // 80%
     uint256 internal constant KASHI_UTILIZATION_PRECISION = 1e18;
+    uint256 internal constant KASHI_INTEREST_PRECISION = 1e18;
+    uint256 internal constant KASHI_PROTOCOL_FEE = 1e4; // 10%
+    uint256 internal constant KASHI_PROTOCOL_FEE_DIVISOR = 1e5;
+
+    // Kashi cook actions
+    uint8 internal constant KASHI_ACTION_ADD_ASSET = 1;
+    uint8 internal constant KASHI_ACTION_REMOVE_ASSET = 3;
+    uint8 internal constant KASHI_ACTION_BENTO_WITHDRAW = 21;
+    int256 internal constant KASHI_USE_VALUE1 = -1;
+
+    // ethToWant averages the WETH/want price over at least this long
+    uint256 internal constant WANT_PRICE_PERIOD = 1 hours;
 
     IERC20 internal constant weth =
         IERC20(0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2);
@@ -57,16 +111,70 @@ contract Strategy is BaseStrategy {
     IUniswapV2Router02 public constant sushiRouter =
         IUniswapV2Router02(0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F);
 
+    // Storage is packed so that values read together share a slot:
+    // bentoBox and dustThreshold are read on every deposit and withdrawal,
+    // the settings below are read together on harvests
+
     IBentoBox public bentoBox;
-    KashiPairInfo[] public kashiPairs;
+    uint96 public dustThreshold = 2;
+
+    bool internal isOriginal = true;
+
+    // Number of slices adjustPosition splits a deposit into, 0 or 1 sends
+    // everything to the highestInterestPair
+    uint8 public depositChunks;
+
+    // harvestTrigger counts no interest owed on pairs accrued within this
+    // many seconds. Transactions always accrue pairs to the current block
+    uint32 public accrueStalenessWindow;
 
-    uint256 public dustThreshold = 2;
+    // Harvests only claim a pair's rewards once pendingSushi reaches
+    // minPendingSushi, and only sell once the SUSHI held is worth at least
+    // minSushiSellValue of want
+    uint96 public minPendingSushi;
+    uint96 public minSushiSellValue;
+
+    KashiPairInfo[] public kashiPairs;
 
     // Path for swaps
     address[] private path;
 
     string private strategyName;
 
+    // Time weighted WETH price in want from the sushi WETH/want pair, see
+    // ethToWant. The average (UQ112x112) covers the window between the two
+    // latest observations, harvests observe at most once per WANT_PRICE_PERIOD
+    IUniswapV2Pair public wantPricePair;
+    uint32 internal wantPriceObservedAt;
+    bool internal wethIsToken0;
+    uint256 internal wantPriceCumulativeLast;
+    uint224 internal wantPriceAverage;
+
+    // Every move of funds into or out of a pair, so that indexers can follow
+    // each pair's balance from logs alone. shares are bentoBox shares,
+    // fraction the kashiPair fraction minted or burnt, fractionBalance what
+    // the strategy holds in the pair afterwards, staked or not
+    event KashiPairDeposit(
+        address indexed kashiPair,
+        uint256 shares,
+        uint256 fraction,
+        uint256 fractionBalance
+    );
+    event KashiPairWithdrawal(
+        address indexed kashiPair,
+        uint256 shares,
+        uint256 fraction,
+        uint256 fractionBalance
+    );
+
+    // Emitted by harvests once interest is accrued and rewards are sold,
+    // before any funds move. Assets are in want, in the order of kashiPairs
+    event KashiPairsHarvested(
+        address[] kashiPairs,
+        uint256[] kashiPairAssets,
+        uint256 totalAssets
+    );
+
     constructor(
         address _vault,
         address _bentoBox,
@@ -154,13 +262,17 @@ contract Strategy is BaseStrategy {
         healthCheck = address(0xDDCea799fF1699e98EDF118e0629A974Df7DF012); // health.ychad.eth
 
         for (uint256 i = 0; i < _kashiPairs.length; i++) {
-            kashiPairs.push(
-                KashiPairInfo(IKashiPair(_kashiPairs[i]), _pids[i])
-            );
+            IKashiPair kashiPair = IKashiPair(_kashiPairs[i]);
             // kashiPair must use the right bentoBox
-            require(address(kashiPairs[i].kashiPair.bentoBox()) == _bentoBox);
+            require(address(kashiPair.bentoBox()) == _bentoBox);
             // kashiPair asset must match want
-            require(address(kashiPairs[i].kashiPair.asset()) == address(want));
+            require(address(kashiPair.asset()) == address(want));
+            // pid must fit the packed KashiPairInfo
+            require(_pids[i] <= type(uint96).max);
+
+            kashiPairs.push(KashiPairInfo(kashiPair, uint96(_pids[i])));
+
+            approveKashiMasterContract(IBentoBox(_bentoBox), kashiPair);
 
             if (_pids[i] != 0) {
                 // the masterChef pid token must match the kashiPair
@@ -184,6 +296,19 @@ contract Strategy is BaseStrategy {
         path[0] = address(sushi);
         path[1] = address(weth);
         path[2] = address(want);
+
+        if (address(want) != address(weth)) {
+            wantPricePair = IUniswapV2Pair(
+                IUniswapV2Factory(sushiRouter.factory()).getPair(
+                    address(weth),
+                    address(want)
+                )
+            );
+            if (address(wantPricePair) != address(0)) {
+                wethIsToken0 = wantPricePair.token0() == address(weth);
+                observeWantPrice();
+            }
+        }
     }
 
     function name() external view override returns (string memory) {
@@ -191,40 +316,106 @@ contract Strategy is BaseStrategy {
     }
 
     function estimatedTotalAssets() public view override returns (uint256) {
-        uint256 totalShares = sharesInBento();
+        IBentoBox _bentoBox = bentoBox;
 
-        for (uint256 i = 0; i < kashiPairs.length; i++) {
-            KashiPairInfo memory kashiPairInfo = kashiPairs[i];
+        return
+            estimatedTotalAssets(
+                _bentoBox,
+                loadKashiPairs(),
+                loadBentoTotals(_bentoBox)
+            );
+    }
+
+    function estimatedTotalAssets(
+        IBentoBox _bentoBox,
+        KashiPairSnapshot[] memory snapshots,
+        Rebase memory bentoTotals
+    ) internal view returns (uint256) {
+        uint256 totalShares = sharesInBento(_bentoBox);
 
+        for (uint256 i = 0; i < snapshots.length; i++) {
             totalShares = totalShares.add(
-                kashiFractionToBentoShares(
-                    kashiPairInfo.kashiPair,
-                    kashiFractionTotal(
-                        kashiPairInfo.kashiPair,
-                        kashiPairInfo.pid
-                    )
-                )
+                kashiPairEstimatedShares(snapshots[i], bentoTotals)
             );
         }
 
-        return balanceOfWant().add(bentoSharesToWant(totalShares));
+        return balanceOfWant().add(bentoSharesToWant(bentoTotals, totalShares));
     }
 
     function kashiPairEstimatedAssets(uint256 i) public view returns (uint256) {
-        KashiPairInfo memory kashiPairInfo = kashiPairs[i];
+        Rebase memory bentoTotals = loadBentoTotals(bentoBox);
 
         return
             bentoSharesToWant(
-                kashiFractionToBentoShares(
-                    kashiPairInfo.kashiPair,
-                    kashiFractionTotal(
-                        kashiPairInfo.kashiPair,
-                        kashiPairInfo.pid
-                    )
+                bentoTotals,
+                kashiPairEstimatedShares(
+                    loadKashiPair(kashiPairs[i]),
+                    bentoTotals
                 )
             );
     }
 
+    // The state of every pair plus totals, estimated from the pairs' totals
+    // as last accrued like estimatedTotalAssets
+    function strategyState()
+        external
+        view
+        returns (StrategyState memory state)
+    {
+        IBentoBox _bentoBox = bentoBox;
+        KashiPairSnapshot[] memory snapshots = loadKashiPairs();
+        Rebase memory bentoTotals = loadBentoTotals(_bentoBox);
+
+        state.kashiPairs = new KashiPairState[](snapshots.length);
+        state.totalAssets = estimatedTotalAssets(
+            _bentoBox,
+            snapshots,
+            bentoTotals
+        );
+        state.idleWant = balanceOfWant();
+        state.idleShares = sharesInBento(_bentoBox);
+        state.idleSharesInWant = bentoSharesToWant(
+            bentoTotals,
+            state.idleShares
+        );
+        state.sushiBalance = balanceOfSushi();
+
+        for (uint256 i = 0; i < snapshots.length; i++) {
+            KashiPairSnapshot memory snapshot = snapshots[i];
+            KashiPairState memory pairState = state.kashiPairs[i];
+
+            pairState.kashiPair = snapshot.kashiPair;
+            pairState.pid = snapshot.pid;
+            pairState.assets = bentoSharesToWant(
+                bentoTotals,
+                kashiPairEstimatedShares(snapshot, bentoTotals)
+            );
+            if (state.totalAssets > 0) {
+                pairState.shareOfAssets = pairState.assets.mul(MAX_BPS).div(
+                    state.totalAssets
+                );
+            }
+            pairState.fractionInPair = snapshot.fractionInPair;
+            pairState.fractionInMasterChef = snapshot.fractionInMasterChef;
+            if (snapshot.pid != 0) {
+                pairState.pendingSushi = masterChef.pendingSushi(
+                    snapshot.pid,
+                    address(this)
+                );
+            }
+            pairState.liquidShares = kashiPairLiquidShares(snapshot);
+            if (snapshot.totalAsset.base > 0) {
+                pairState.utilization = kashiPairUtilization(
+                    snapshot,
+                    bentoTotals,
+                    0
+                );
+            }
+            pairState.interestPerBlock = snapshot.interestPerBlock;
+            pairState.lastAccrued = snapshot.lastAccrued;
+        }
+    }
+
     function prepareReturn(uint256 _debtOutstanding)
         internal
         override
@@ -234,24 +425,20 @@ contract Strategy is BaseStrategy {
             uint256 _debtPayment
         )
     {
-        for (uint256 i = 0; i < kashiPairs.length; i++) {
-            KashiPairInfo memory kashiPairInfo = kashiPairs[i];
-            if (
-                kashiFractionTotal(
-                    kashiPairInfo.kashiPair,
-                    kashiPairInfo.pid
-                ) == 0
-            ) continue; // skip the pair has no assets
-            accrueInterest(kashiPairInfo.kashiPair);
-            depositKashiInMasterChef(
-                kashiPairInfo.kashiPair,
-                kashiPairInfo.pid
-            ); // claim and deposit loose
-        }
+        IBentoBox _bentoBox = bentoBox;
+        KashiPairSnapshot[] memory snapshots = loadKashiPairs();
+        Rebase memory bentoTotals = loadBentoTotals(_bentoBox);
+
+        accrueAndClaim(snapshots);
 
         sell();
 
-        uint256 assets = estimatedTotalAssets();
+        observeWantPrice();
+
+        uint256 assets =
+            estimatedTotalAssets(_bentoBox, snapshots, bentoTotals);
+        emitKashiPairsHarvested(snapshots, bentoTotals, assets);
+
         uint256 wantBal = balanceOfWant();
 
         uint256 debt = vault.strategies(address(this)).totalDebt;
@@ -266,7 +453,13 @@ contract Strategy is BaseStrategy {
         uint256 amountToFree = _debtPayment.add(_profit);
 
         if (amountToFree > 0 && wantBal < amountToFree) {
-            (uint256 newLoose, ) = liquidatePosition(amountToFree);
+            (uint256 newLoose, ) =
+                liquidatePosition(
+                    amountToFree,
+                    _bentoBox,
+                    snapshots,
+                    bentoTotals
+                );
 
             // if we didnt free enough money, prioritize paying down debt before taking profit
             if (newLoose < amountToFree) {
@@ -280,27 +473,81 @@ contract Strategy is BaseStrategy {
         }
     }
 
+    function emitKashiPairsHarvested(
+        KashiPairSnapshot[] memory snapshots,
+        Rebase memory bentoTotals,
+        uint256 totalAssets
+    ) internal {
+        address[] memory pairs = new address[](snapshots.length);
+        uint256[] memory pairAssets = new uint256[](snapshots.length);
+
+        for (uint256 i = 0; i < snapshots.length; i++) {
+            pairs[i] = address(snapshots[i].kashiPair);
+            pairAssets[i] = bentoSharesToWant(
+                bentoTotals,
+                kashiPairEstimatedShares(snapshots[i], bentoTotals)
+            );
+        }
+
+        emit KashiPairsHarvested(pairs, pairAssets, totalAssets);
+    }
+
+    function accrueAndClaim(KashiPairSnapshot[] memory snapshots) internal {
+        uint256 _minPendingSushi = minPendingSushi;
+
+        for (uint256 i = 0; i < snapshots.length; i++) {
+            KashiPairSnapshot memory snapshot = snapshots[i];
+            if (kashiFractionTotal(snapshot) == 0) continue; // skip the pair has no assets
+            accrueInterest(snapshot);
+            if (shouldClaimSushi(snapshot, _minPendingSushi)) {
+                depositKashiInMasterChef(snapshot); // claim and deposit loose
+            }
+        }
+    }
+
     function adjustPosition(uint256 _debtOutstanding) internal override {
         if (emergencyExit) {
             return;
         }
 
         uint256 wantBalance = balanceOfWant();
+        IBentoBox _bentoBox = bentoBox;
+        Rebase memory bentoTotals = loadBentoTotals(_bentoBox);
+        uint256 dust = dustThreshold;
 
         uint256 shares = 0;
 
-        if (wantBalance > dustThreshold) {
-            (, shares) = depositInBento(wantBalance);
+        if (wantBalance > dust) {
+            (, shares) = depositInBento(_bentoBox, bentoTotals, wantBalance);
         }
 
-        uint256 sharesInBento = sharesInBento();
+        uint256 sharesInBento = sharesInBento(_bentoBox);
+
+        if (sharesInBento > wantToBentoShares(bentoTotals, dust)) {
+            KashiPairSnapshot[] memory snapshots = loadKashiPairs();
+            uint256 chunks = Math.min(depositChunks, sharesInBento);
 
-        if (sharesInBento > wantToBentoShares(dustThreshold)) {
-            // Get highest interest rate pair
-            (IKashiPair highestPair, uint256 highestPid) =
-                highestInterestPair(sharesInBento);
+            if (chunks > 1) {
+                // Spread the deposit so the pairs' supply rates even out
+                uint256[] memory allocations =
+                    allocateDeposit(
+                        snapshots,
+                        bentoTotals,
+                        sharesInBento,
+                        chunks
+                    );
 
-            depositInKashiPair(highestPair, highestPid, sharesInBento);
+                for (uint256 i = 0; i < snapshots.length; i++) {
+                    if (allocations[i] == 0) continue;
+                    depositInKashiPair(snapshots[i], allocations[i]);
+                }
+            } else {
+                // Get highest interest rate pair
+                KashiPairSnapshot memory highestPair =
+                    highestInterestPair(snapshots, bentoTotals, sharesInBento);
+
+                depositInKashiPair(highestPair, sharesInBento);
+            }
         }
     }
 
@@ -309,76 +556,59 @@ contract Strategy is BaseStrategy {
         override
         returns (uint256 _liquidatedAmount, uint256 _loss)
     {
+        IBentoBox _bentoBox = bentoBox;
+
+        return
+            liquidatePosition(
+                _amountNeeded,
+                _bentoBox,
+                loadKashiPairs(),
+                loadBentoTotals(_bentoBox)
+            );
+    }
+
+    function liquidatePosition(
+        uint256 _amountNeeded,
+        IBentoBox _bentoBox,
+        KashiPairSnapshot[] memory snapshots,
+        Rebase memory bentoTotals
+    ) internal returns (uint256 _liquidatedAmount, uint256 _loss) {
         uint256 wantBalance = balanceOfWant();
 
         if (_amountNeeded <= wantBalance) {
             return (_amountNeeded, 0);
         }
 
+        uint256 dust = dustThreshold;
         uint256 amountToFree = _amountNeeded.sub(wantBalance);
-        uint256 deposited = estimatedTotalAssets().sub(wantBalance);
+        uint256 deposited =
+            estimatedTotalAssets(_bentoBox, snapshots, bentoTotals).sub(
+                wantBalance
+            );
 
-        if (amountToFree.add(dustThreshold) > deposited) {
+        if (amountToFree.add(dust) > deposited) {
             amountToFree = deposited;
         }
 
         if (amountToFree > 0) {
-            uint256 sharesNeeded = wantToBentoShares(amountToFree);
-            uint256 bentoShares = sharesInBento();
+            uint256 sharesNeeded = wantToBentoShares(bentoTotals, amountToFree);
+            uint256 bentoShares = sharesInBento(_bentoBox);
 
             if (sharesNeeded > bentoShares) {
-                uint256 sharesToFreeFromKashi = sharesNeeded.sub(bentoShares);
-                uint256 sharesFreedFromKashi = 0;
-
-                // Find the lowest apr pair with at least the lesser of
-                //   - the amount to free
-                //   - the mean assets per pair
-                (IKashiPair lowestPair, uint256 lowestPid) =
-                    lowestInterestPair(
-                        Math.min(
-                            sharesToFreeFromKashi,
-                            wantToBentoShares(
-                                estimatedTotalAssets().div(kashiPairs.length)
-                            )
-                        )
-                    );
-                if (address(lowestPair) != address(0)) {
-                    sharesFreedFromKashi = liquidateKashiPair(
-                        lowestPair,
-                        lowestPid,
-                        sharesToFreeFromKashi
-                    );
-                }
-
-                for (
-                    uint256 i = 0;
-                    i < kashiPairs.length &&
-                        sharesFreedFromKashi.add(dustThreshold) <
-                        sharesToFreeFromKashi;
-                    i++
-                ) {
-                    KashiPairInfo memory kashiPairInfo = kashiPairs[i];
-
-                    if (address(kashiPairInfo.kashiPair) == address(lowestPair))
-                        continue; // we already visited this
-
-                    sharesFreedFromKashi = sharesFreedFromKashi.add(
-                        liquidateKashiPair(
-                            kashiPairInfo.kashiPair,
-                            kashiPairInfo.pid,
-                            sharesToFreeFromKashi.sub(sharesFreedFromKashi)
-                        )
-                    );
-                }
+                liquidateKashiPairs(
+                    snapshots,
+                    bentoTotals,
+                    sharesNeeded.sub(bentoShares),
+                    dust
+                );
             }
 
-            bentoBox.withdraw(
-                BIERC20(address(want)),
-                address(this),
-                address(this),
-                0,
-                sharesInBento()
-            );
+            // Kashi withdrawals already went straight to want, only idle
+            // shares are left in bentoBox
+            uint256 idleShares = sharesInBento(_bentoBox);
+            if (idleShares > 0) {
+                withdrawFromBento(_bentoBox, bentoTotals, idleShares);
+            }
         }
 
         _liquidatedAmount = Math.min(balanceOfWant(), _amountNeeded);
@@ -387,23 +617,116 @@ contract Strategy is BaseStrategy {
         // when we return the amountRequested minus dust, take a dust sized loss
         if (_liquidatedAmount < _amountNeeded) {
             uint256 diff = _amountNeeded.sub(_liquidatedAmount);
-            if (diff <= dustThreshold) {
+            if (diff <= dust) {
                 _loss = diff;
             }
         }
     }
 
+    function liquidateKashiPairs(
+        KashiPairSnapshot[] memory snapshots,
+        Rebase memory bentoTotals,
+        uint256 sharesToFreeFromKashi,
+        uint256 dust
+    ) internal returns (uint256 sharesFreedFromKashi) {
+        (uint256[] memory plan, uint256 planLength) =
+            planLiquidation(
+                snapshots,
+                bentoTotals,
+                sharesToFreeFromKashi,
+                dust
+            );
+
+        for (
+            uint256 i = 0;
+            i < planLength &&
+                sharesFreedFromKashi.add(dust) < sharesToFreeFromKashi;
+            i++
+        ) {
+            sharesFreedFromKashi = sharesFreedFromKashi.add(
+                liquidateKashiPair(
+                    snapshots[plan[i]],
+                    bentoTotals,
+                    sharesToFreeFromKashi.sub(sharesFreedFromKashi),
+                    dust,
+                    true
+                )
+            );
+        }
+    }
+
+    // planLiquidation orders the pairs to free shares from so that we touch
+    // as few of them as possible. If some pair can cover the full amount on
+    // its own, the lowest interest one of those goes first. Every other pair
+    // we can withdraw from follows, largest withdrawable amount first.
+    function planLiquidation(
+        KashiPairSnapshot[] memory snapshots,
+        Rebase memory bentoTotals,
+        uint256 sharesToFree,
+        uint256 dust
+    ) internal pure returns (uint256[] memory _plan, uint256 _planLength) {
+        _plan = new uint256[](snapshots.length);
+        uint256[] memory withdrawable = new uint256[](snapshots.length);
+
+        for (uint256 i = 0; i < snapshots.length; i++) {
+            withdrawable[i] = kashiPairWithdrawableShares(
+                snapshots[i],
+                bentoTotals,
+                dust
+            );
+        }
+
+        uint256 lowestIndex =
+            lowestInterestPair(
+                snapshots,
+                bentoTotals,
+                withdrawable,
+                sharesToFree
+            );
+        if (lowestIndex < snapshots.length) {
+            _plan[_planLength++] = lowestIndex;
+            withdrawable[lowestIndex] = 0;
+        }
+
+        while (_planLength < snapshots.length) {
+            uint256 largestIndex;
+            uint256 largestWithdrawable = 0;
+
+            for (uint256 i = 0; i < snapshots.length; i++) {
+                if (withdrawable[i] > largestWithdrawable) {
+                    largestWithdrawable = withdrawable[i];
+                    largestIndex = i;
+                }
+            }
+
+            if (largestWithdrawable == 0) break; // nothing left to take
+
+            _plan[_planLength++] = largestIndex;
+            withdrawable[largestIndex] = 0;
+        }
+    }
+
     function liquidateAllPositions()
         internal
         override
         returns (uint256 _liquidatedAmount)
     {
-        (_liquidatedAmount, ) = liquidatePosition(estimatedTotalAssets());
+        IBentoBox _bentoBox = bentoBox;
+        KashiPairSnapshot[] memory snapshots = loadKashiPairs();
+        Rebase memory bentoTotals = loadBentoTotals(_bentoBox);
+        (_liquidatedAmount, ) = liquidatePosition(
+            estimatedTotalAssets(_bentoBox, snapshots, bentoTotals),
+            _bentoBox,
+            snapshots,
+            bentoTotals
+        );
     }
 
     // new strategy **must** have the same kashiPairs attached
     function prepareMigration(address _newStrategy) internal override {
-        for (uint256 i = 0; i < kashiPairs.length; i++) {
+        uint256 kashiPairsLength = kashiPairs.length;
+
+        for (uint256 i = 0; i < kashiPairsLength; i++) {
             KashiPairInfo memory kashiPairInfo = kashiPairs[i];
 
             if (kashiPairInfo.pid != 0) {
@@ -413,7 +736,7 @@ contract Strategy is BaseStrategy {
                 );
             }
 
-            kashiPairs[i].kashiPair.transfer(
+            kashiPairInfo.kashiPair.transfer(
                 _newStrategy,
                 kashiFractionInPair(kashiPairInfo.kashiPair)
             );
@@ -424,14 +747,19 @@ contract Strategy is BaseStrategy {
         external
         onlyGovernance
     {
+        uint256 kashiPairsLength = kashiPairs.length;
+        IBentoBox _bentoBox = bentoBox;
+
         // cannot exceed max pair length
-        require(kashiPairs.length < MAX_PAIRS);
+        require(kashiPairsLength < MAX_PAIRS);
         // must use the correct bentobox
         require(
-            address(IKashiPair(_newKashiPair).bentoBox()) == address(bentoBox)
+            address(IKashiPair(_newKashiPair).bentoBox()) == address(_bentoBox)
         );
         // kashPair asset must match want
         require(IKashiPair(_newKashiPair).asset() == BIERC20(address(want)));
+        // pid must fit the packed KashiPairInfo
+        require(_newPid <= type(uint96).max);
         if (_newPid != 0) {
             // masterChef pid token must match the kashiPair
             require(
@@ -439,12 +767,16 @@ contract Strategy is BaseStrategy {
             );
         }
 
-        for (uint256 i = 0; i < kashiPairs.length; i++) {
+        for (uint256 i = 0; i < kashiPairsLength; i++) {
             // kashiPair must not already be attached
             require(_newKashiPair != address(kashiPairs[i].kashiPair));
         }
 
-        kashiPairs.push(KashiPairInfo(IKashiPair(_newKashiPair), _newPid));
+        kashiPairs.push(
+            KashiPairInfo(IKashiPair(_newKashiPair), uint96(_newPid))
+        );
+
+        approveKashiMasterContract(_bentoBox, IKashiPair(_newKashiPair));
 
         if (_newPid != 0) {
             IERC20(_newKashiPair).safeApprove(
@@ -459,27 +791,26 @@ contract Strategy is BaseStrategy {
         uint256 _remIndex,
         bool _force
     ) external onlyEmergencyAuthorized {
-        KashiPairInfo memory kashiPairInfo = kashiPairs[_remIndex];
+        KashiPairSnapshot memory snapshot =
+            loadKashiPair(kashiPairs[_remIndex]);
 
-        require(_remKashiPair == address(kashiPairInfo.kashiPair));
+        require(_remKashiPair == address(snapshot.kashiPair));
 
+        uint256 dust = dustThreshold;
         liquidateKashiPair(
-            kashiPairInfo.kashiPair,
-            kashiPairInfo.pid,
-            type(uint256).max // liquidateAll
+            snapshot,
+            loadBentoTotals(bentoBox),
+            type(uint256).max, // liquidateAll
+            dust,
+            false
         );
 
         if (!_force) {
             // must have liquidated all but dust
-            require(
-                kashiFractionTotal(
-                    kashiPairInfo.kashiPair,
-                    kashiPairInfo.pid
-                ) <= dustThreshold
-            );
+            require(kashiFractionTotal(snapshot) <= dust);
         }
 
-        if (kashiPairInfo.pid != 0) {
+        if (snapshot.pid != 0) {
             IERC20(_remKashiPair).safeApprove(address(masterChef), 0);
         }
         kashiPairs[_remIndex] = kashiPairs[kashiPairs.length - 1];
@@ -493,45 +824,49 @@ contract Strategy is BaseStrategy {
         // length of ratios must match number of pairs
         require(_ratios.length == kashiPairs.length);
 
+        KashiPairSnapshot[] memory snapshots = loadKashiPairs();
         uint256 totalRatio;
 
-        for (uint256 i = 0; i < kashiPairs.length; i++) {
+        for (uint256 i = 0; i < snapshots.length; i++) {
             // We must accrue all pairs to ensure we get an accurate estimate of assets
-            accrueInterest(kashiPairs[i].kashiPair);
+            accrueInterest(snapshots[i]);
             totalRatio += _ratios[i];
         }
 
         require(totalRatio == MAX_BPS); //ratios must add to 10000 bps
 
+        IBentoBox _bentoBox = bentoBox;
+        uint256 dust = dustThreshold;
+        Rebase memory bentoTotals = loadBentoTotals(_bentoBox);
         uint256 wantBalance = balanceOfWant();
-        if (wantBalance > dustThreshold) {
-            depositInBento(wantBalance);
+        if (wantBalance > dust) {
+            depositInBento(_bentoBox, bentoTotals, wantBalance);
         }
 
-        uint256 totalAssets = estimatedTotalAssets();
+        uint256 totalAssets =
+            estimatedTotalAssets(_bentoBox, snapshots, bentoTotals);
         uint256[] memory kashiPairsIncreasedAllocation =
-            new uint256[](kashiPairs.length);
+            new uint256[](snapshots.length);
 
-        for (uint256 i = 0; i < kashiPairs.length; i++) {
-            KashiPairInfo memory kashiPairInfo = kashiPairs[i];
+        for (uint256 i = 0; i < snapshots.length; i++) {
+            KashiPairSnapshot memory snapshot = snapshots[i];
 
             uint256 pairTotalAssets =
                 bentoSharesToWant(
-                    kashiFractionToBentoShares(
-                        kashiPairInfo.kashiPair,
-                        kashiFractionTotal(
-                            kashiPairInfo.kashiPair,
-                            kashiPairInfo.pid
-                        )
-                    )
+                    bentoTotals,
+                    kashiPairEstimatedShares(snapshot, bentoTotals)
                 );
             uint256 targetAssets = (_ratios[i] * totalAssets) / MAX_BPS;
             if (targetAssets < pairTotalAssets) {
-                uint256 toLiquidate = pairTotalAssets.sub(targetAssets);
                 liquidateKashiPair(
-                    kashiPairInfo.kashiPair,
-                    kashiPairInfo.pid,
-                    wantToBentoShares(toLiquidate)
+                    snapshot,
+                    bentoTotals,
+                    wantToBentoShares(
+                        bentoTotals,
+                        pairTotalAssets.sub(targetAssets)
+                    ),
+                    dust,
+                    false
                 );
             } else if (targetAssets > pairTotalAssets) {
                 kashiPairsIncreasedAllocation[i] = targetAssets.sub(
@@ -540,81 +875,135 @@ contract Strategy is BaseStrategy {
             }
         }
 
-        for (uint256 i = 0; i < kashiPairs.length; i++) {
+        for (uint256 i = 0; i < snapshots.length; i++) {
             if (kashiPairsIncreasedAllocation[i] == 0) continue;
 
-            KashiPairInfo memory kashiPairInfo = kashiPairs[i];
-
-            uint256 sharesInBento = sharesInBento();
+            uint256 sharesInBento = sharesInBento(_bentoBox);
             uint256 sharesToAdd =
-                wantToBentoShares(kashiPairsIncreasedAllocation[i]);
+                wantToBentoShares(
+                    bentoTotals,
+                    kashiPairsIncreasedAllocation[i]
+                );
 
             if (sharesToAdd > sharesInBento) {
                 sharesToAdd = sharesInBento;
             }
 
-            depositInKashiPair(
-                kashiPairInfo.kashiPair,
-                kashiPairInfo.pid,
-                sharesToAdd
-            );
+            depositInKashiPair(snapshots[i], sharesToAdd);
         }
     }
 
     function depositInKashiPair(
-        IKashiPair kashiPair,
-        uint256 pid,
+        KashiPairSnapshot memory snapshot,
         uint256 sharesToDeposit
     ) internal {
-        transferBento(address(kashiPair), sharesToDeposit);
+        uint8[] memory actions = new uint8[](1);
+        uint256[] memory values = new uint256[](1);
+        bytes[] memory datas = new bytes[](1);
+
+        // Kashi accrues and pulls the shares from our bentoBox balance
+        actions[0] = KASHI_ACTION_ADD_ASSET;
+        datas[0] = abi.encode(int256(sharesToDeposit), address(this), false);
+
+        (uint256 depositedFraction, ) =
+            snapshot.kashiPair.cook(actions, values, datas);
 
-        uint256 depositedFraction =
-            kashiPair.addAsset(address(this), true, sharesToDeposit);
+        snapshot.totalAsset = snapshot.totalAsset.add(
+            sharesToDeposit,
+            depositedFraction
+        );
+        snapshot.fractionInPair = snapshot.fractionInPair.add(
+            depositedFraction
+        );
 
-        depositKashiInMasterChef(kashiPair, pid);
+        depositKashiInMasterChef(snapshot);
+
+        emit KashiPairDeposit(
+            address(snapshot.kashiPair),
+            sharesToDeposit,
+            depositedFraction,
+            kashiFractionTotal(snapshot)
+        );
     }
 
-    function depositKashiInMasterChef(IKashiPair kashiPair, uint256 pid)
+    function depositKashiInMasterChef(KashiPairSnapshot memory snapshot)
         internal
     {
-        if (pid == 0) return;
+        if (snapshot.pid == 0) return;
+
+        uint256 fractionsToStake = snapshot.fractionInPair;
+        masterChef.deposit(snapshot.pid, fractionsToStake);
 
-        uint256 fractionsToStake = kashiFractionInPair(kashiPair);
-        masterChef.deposit(pid, fractionsToStake);
+        snapshot.fractionInMasterChef = snapshot.fractionInMasterChef.add(
+            fractionsToStake
+        );
+        snapshot.fractionInPair = 0;
     }
 
-    function depositInBento(uint256 wantToDeposit)
-        internal
-        returns (uint256 amountOut, uint256 shareOut)
-    {
-        return
-            bentoBox.deposit(
-                BIERC20(address(want)),
-                address(this),
-                address(this),
-                wantToDeposit,
-                0
-            );
+    function depositInBento(
+        IBentoBox _bentoBox,
+        Rebase memory bentoTotals,
+        uint256 wantToDeposit
+    ) internal returns (uint256 amountOut, uint256 shareOut) {
+        (amountOut, shareOut) = _bentoBox.deposit(
+            BIERC20(address(want)),
+            address(this),
+            address(this),
+            wantToDeposit,
+            0
+        );
+
+        // Keep the cached totals in step with bentoBox
+        bentoTotals.add(amountOut, shareOut);
     }
 
-    function transferBento(address to, uint256 shares) internal {
-        bentoBox.transfer(
+    function withdrawFromBento(
+        IBentoBox _bentoBox,
+        Rebase memory bentoTotals,
+        uint256 shares
+    ) internal returns (uint256 amountOut, uint256 shareOut) {
+        (amountOut, shareOut) = _bentoBox.withdraw(
             BIERC20(address(want)),
             address(this),
-            address(to),
+            address(this),
+            0,
             shares
         );
+
+        // Keep the cached totals in step with bentoBox
+        bentoTotals.sub(amountOut, shareOut);
+    }
+
+    // Kashi pulls and returns our bentoBox shares when we cook
+    function approveKashiMasterContract(
+        IBentoBox _bentoBox,
+        IKashiPair kashiPair
+    ) internal {
+        address masterContract = kashiPair.masterContract();
+
+        if (!_bentoBox.masterContractApproved(masterContract, address(this))) {
+            _bentoBox.setMasterContractApproval(
+                address(this),
+                masterContract,
+                true,
+                0,
+                bytes32(0),
+                bytes32(0)
+            );
+        }
     }
 
     function liquidateKashiPair(
-        IKashiPair kashiPair,
-        uint256 pid,
-        uint256 sharesToFree
+        KashiPairSnapshot memory snapshot,
+        Rebase memory bentoTotals,
+        uint256 sharesToFree,
+        uint256 dust,
+        bool toWant
     ) internal returns (uint256 _shareLiquidated) {
         // We need to call accrue to accurately calculate totalAssets
-        accrueInterest(kashiPair);
+        accrueInterest(snapshot);
 
-        uint256 liquidShares = kashiPairLiquidShares(kashiPair);
+        uint256 liquidShares = kashiPairLiquidShares(snapshot);
         if (sharesToFree > liquidShares) {
             sharesToFree = liquidShares;
         }
@@ -622,31 +1011,107 @@ contract Strategy is BaseStrategy {
         if (sharesToFree == 0) return 0;
 
         uint256 fractionsToFree =
-            bentoSharesToKashiFraction(kashiPair, sharesToFree);
+            bentoSharesToKashiFraction(snapshot, bentoTotals, sharesToFree);
 
         // Remove from masterChef if there is a non-zero pid
-        if (pid != 0) {
-            uint256 fractionInMc = kashiFactionInMasterChef(pid);
+        if (snapshot.pid != 0) {
+            uint256 fractionInMc = snapshot.fractionInMasterChef;
             uint256 fractionsToFreeFromMc = fractionsToFree;
-            if (fractionsToFreeFromMc.add(dustThreshold) > fractionInMc) {
+            if (fractionsToFreeFromMc.add(dust) > fractionInMc) {
                 fractionsToFreeFromMc = fractionInMc;
             }
-            masterChef.withdraw(pid, fractionsToFreeFromMc);
+            masterChef.withdraw(snapshot.pid, fractionsToFreeFromMc);
+
+            snapshot.fractionInMasterChef = fractionInMc.sub(
+                fractionsToFreeFromMc
+            );
+            snapshot.fractionInPair = snapshot.fractionInPair.add(
+                fractionsToFreeFromMc
+            );
         }
 
-        uint256 fractionBalance = kashiFractionInPair(kashiPair);
+        uint256 fractionBalance = snapshot.fractionInPair;
 
-        if (fractionsToFree.add(dustThreshold) > fractionBalance) {
+        if (fractionsToFree.add(dust) > fractionBalance) {
             fractionsToFree = fractionBalance;
         }
 
-        _shareLiquidated = kashiPair.removeAsset(
-            address(this),
-            fractionsToFree
+        _shareLiquidated = removeFromKashiPair(
+            snapshot,
+            bentoTotals,
+            fractionsToFree,
+            toWant
         );
 
         // Redeposit into the masterChef if there's some spare change
-        depositKashiInMasterChef(kashiPair, pid);
+        depositKashiInMasterChef(snapshot);
+
+        emit KashiPairWithdrawal(
+            address(snapshot.kashiPair),
+            _shareLiquidated,
+            fractionsToFree,
+            kashiFractionTotal(snapshot)
+        );
+    }
+
+    // removeFromKashiPair burns the fractions in a single cook, withdrawing
+    // the freed shares from bentoBox to want in the same call if toWant
+    function removeFromKashiPair(
+        KashiPairSnapshot memory snapshot,
+        Rebase memory bentoTotals,
+        uint256 fractionsToFree,
+        bool toWant
+    ) internal returns (uint256 _shareLiquidated) {
+        uint256 actionsLength = toWant ? 2 : 1;
+        uint8[] memory actions = new uint8[](actionsLength);
+        uint256[] memory values = new uint256[](actionsLength);
+        bytes[] memory datas = new bytes[](actionsLength);
+
+        actions[0] = KASHI_ACTION_REMOVE_ASSET;
+        datas[0] = abi.encode(int256(fractionsToFree), address(this));
+
+        if (toWant) {
+            // Withdraw the share amount returned by the removal
+            actions[1] = KASHI_ACTION_BENTO_WITHDRAW;
+            datas[1] = abi.encode(
+                address(want),
+                address(this),
+                int256(0),
+                KASHI_USE_VALUE1
+            );
+        }
+
+        (uint256 value1, uint256 value2) =
+            snapshot.kashiPair.cook(actions, values, datas);
+
+        if (toWant) {
+            // The bentoBox withdrawal returns the amount and share
+            _shareLiquidated = value2;
+            bentoTotals.sub(value1, value2);
+        } else {
+            _shareLiquidated = value1;
+        }
+
+        snapshot.totalAsset = snapshot.totalAsset.sub(
+            _shareLiquidated,
+            fractionsToFree
+        );
+        snapshot.fractionInPair = snapshot.fractionInPair.sub(fractionsToFree);
+    }
+
+    // Loose fractions are always staked, rewards are only claimed once there
+    // are enough of them
+    function shouldClaimSushi(
+        KashiPairSnapshot memory snapshot,
+        uint256 _minPendingSushi
+    ) internal view returns (bool) {
+        if (snapshot.pid == 0) return false;
+        if (snapshot.fractionInPair > 0) return true;
+
+        return
+            _minPendingSushi == 0 ||
+            masterChef.pendingSushi(snapshot.pid, address(this)) >=
+            _minPendingSushi;
     }
 
     // sell all function
@@ -656,20 +1121,33 @@ contract Strategy is BaseStrategy {
             return;
         }
 
+        address[] memory _path = path;
+
+        uint256 _minSushiSellValue = minSushiSellValue;
+        if (_minSushiSellValue > 0) {
+            uint256[] memory amounts =
+                sushiRouter.getAmountsOut(sushiBal, _path);
+            if (amounts[amounts.length - 1] < _minSushiSellValue) {
+                return; // not worth the swap yet
+            }
+        }
+
         sushiRouter.swapExactTokensForTokens(
             sushiBal,
             uint256(0),
-            path,
+            _path,
             address(this),
             now
         );
     }
 
-    function accrueInterest(IKashiPair kashiPair) internal {
-        (, uint256 lastAccrued, ) = kashiPair.accrueInfo();
+    // The snapshot tracks when the pair was last accrued, so a pair is only
+    // accrued once per block however many times we get here
+    function accrueInterest(KashiPairSnapshot memory snapshot) internal {
         // Accure interest
-        if (block.timestamp > lastAccrued) {
-            kashiPair.accrue();
+        if (block.timestamp > snapshot.lastAccrued) {
+            snapshot.kashiPair.accrue();
+            loadKashiPairTotals(snapshot);
         }
     }
 
@@ -677,7 +1155,40 @@ contract Strategy is BaseStrategy {
         external
         onlyAuthorized
     {
-        dustThreshold = _newDustThreshold;
+        require(_newDustThreshold <= type(uint96).max);
+        dustThreshold = uint96(_newDustThreshold);
+    }
+
+    function setAccrueStalenessWindow(uint256 _newAccrueStalenessWindow)
+        external
+        onlyAuthorized
+    {
+        require(_newAccrueStalenessWindow <= type(uint32).max);
+        accrueStalenessWindow = uint32(_newAccrueStalenessWindow);
+    }
+
+    function setMinPendingSushi(uint256 _newMinPendingSushi)
+        external
+        onlyAuthorized
+    {
+        require(_newMinPendingSushi <= type(uint96).max);
+        minPendingSushi = uint96(_newMinPendingSushi);
+    }
+
+    function setMinSushiSellValue(uint256 _newMinSushiSellValue)
+        external
+        onlyAuthorized
+    {
+        require(_newMinSushiSellValue <= type(uint96).max);
+        minSushiSellValue = uint96(_newMinSushiSellValue);
+    }
+
+    function setDepositChunks(uint256 _newDepositChunks)
+        external
+        onlyAuthorized
+    {
+        require(_newDepositChunks <= MAX_DEPOSIT_CHUNKS);
+        depositChunks = uint8(_newDepositChunks);
     }
 
     function setPath(address[] calldata _path) external onlyGovernance {
@@ -692,17 +1203,66 @@ contract Strategy is BaseStrategy {
         return sushi.balanceOf(address(this));
     }
 
-    function sharesInBento() internal view returns (uint256) {
-        return bentoBox.balanceOf(BIERC20(address(want)), address(this));
+    function sharesInBento(IBentoBox _bentoBox)
+        internal
+        view
+        returns (uint256)
+    {
+        return _bentoBox.balanceOf(BIERC20(address(want)), address(this));
+    }
+
+    function loadBentoTotals(IBentoBox _bentoBox)
+        internal
+        view
+        returns (Rebase memory)
+    {
+        return _bentoBox.totals(BIERC20(address(want)));
+    }
+
+    function loadKashiPairs()
+        internal
+        view
+        returns (KashiPairSnapshot[] memory snapshots)
+    {
+        snapshots = new KashiPairSnapshot[](kashiPairs.length);
+
+        for (uint256 i = 0; i < snapshots.length; i++) {
+            snapshots[i] = loadKashiPair(kashiPairs[i]);
+        }
+    }
+
+    function loadKashiPair(KashiPairInfo memory kashiPairInfo)
+        internal
+        view
+        returns (KashiPairSnapshot memory snapshot)
+    {
+        snapshot.kashiPair = kashiPairInfo.kashiPair;
+        snapshot.pid = kashiPairInfo.pid;
+
+        loadKashiPairTotals(snapshot);
+
+        snapshot.fractionInPair = kashiFractionInPair(snapshot.kashiPair);
+        snapshot.fractionInMasterChef = kashiFactionInMasterChef(snapshot.pid);
     }
 
-    function kashiFractionTotal(IKashiPair kashiPair, uint256 pid)
+    function loadKashiPairTotals(KashiPairSnapshot memory snapshot)
         internal
         view
+    {
+        IKashiPair kashiPair = snapshot.kashiPair;
+
+        snapshot.totalAsset = kashiPair.totalAsset();
+        snapshot.totalBorrow = kashiPair.totalBorrow();
+        (snapshot.interestPerBlock, snapshot.lastAccrued, ) = kashiPair
+            .accrueInfo();
+    }
+
+    function kashiFractionTotal(KashiPairSnapshot memory snapshot)
+        internal
+        pure
         returns (uint256)
     {
-        return
-            kashiFactionInMasterChef(pid).add(kashiFractionInPair(kashiPair));
+        return snapshot.fractionInMasterChef.add(snapshot.fractionInPair);
     }
 
     function kashiFactionInMasterChef(uint256 pid)
@@ -723,31 +1283,58 @@ contract Strategy is BaseStrategy {
         return kashiPair.balanceOf(address(this));
     }
 
-    function kashiPairLiquidShares(IKashiPair kashiPair)
+    function kashiPairLiquidShares(KashiPairSnapshot memory snapshot)
         internal
-        view
+        pure
         returns (uint256)
     {
-        return kashiPair.totalAsset().elastic;
+        return snapshot.totalAsset.elastic;
+    }
+
+    // Shares we could take out of the pair right now, limited by what is
+    // not borrowed
+    function kashiPairWithdrawableShares(
+        KashiPairSnapshot memory snapshot,
+        Rebase memory bentoTotals,
+        uint256 dust
+    ) internal pure returns (uint256) {
+        if (kashiFractionTotal(snapshot) <= dust) return 0;
+
+        return
+            Math.min(
+                kashiPairEstimatedShares(snapshot, bentoTotals),
+                kashiPairLiquidShares(snapshot)
+            );
+    }
+
+    function kashiPairEstimatedShares(
+        KashiPairSnapshot memory snapshot,
+        Rebase memory bentoTotals
+    ) internal pure returns (uint256) {
+        return
+            kashiFractionToBentoShares(
+                snapshot,
+                bentoTotals,
+                kashiFractionTotal(snapshot)
+            );
     }
 
     // highestInterestIndex finds the best pair to invest the given deposit
-    function highestInterestPair(uint256 sharesToDeposit)
-        internal
-        view
-        returns (IKashiPair _highestPair, uint256 _highestPid)
-    {
+    function highestInterestPair(
+        KashiPairSnapshot[] memory snapshots,
+        Rebase memory bentoTotals,
+        uint256 sharesToDeposit
+    ) internal pure returns (KashiPairSnapshot memory _highestPair) {
         uint256 highestInterest = 0;
         uint256 highestUtilization = 0;
 
-        for (uint256 i = 0; i < kashiPairs.length; i++) {
-            KashiPairInfo memory kashiPairInfo = kashiPairs[i];
+        for (uint256 i = 0; i < snapshots.length; i++) {
+            KashiPairSnapshot memory snapshot = snapshots[i];
 
-            (uint256 interestPerBlock, , ) =
-                kashiPairInfo.kashiPair.accrueInfo();
+            uint256 interestPerBlock = snapshot.interestPerBlock;
 
             uint256 utilization =
-                kashiPairUtilization(kashiPairInfo.kashiPair, sharesToDeposit);
+                kashiPairUtilization(snapshot, bentoTotals, sharesToDeposit);
 
             // A pair is highest (really best) if either
             //   - It's utilization is higher, and either
@@ -767,28 +1354,104 @@ contract Strategy is BaseStrategy {
             ) {
                 highestInterest = interestPerBlock;
                 highestUtilization = utilization;
-                _highestPair = kashiPairInfo.kashiPair;
-                _highestPid = kashiPairInfo.pid;
+                _highestPair = snapshot;
             }
         }
     }
 
-    function lowestInterestPair(uint256 minLiquidShares)
-        internal
-        view
-        returns (IKashiPair _lowestPair, uint256 _lowestPid)
-    {
+    // allocateDeposit water-fills the given deposit across all pairs. Each of
+    // the equal chunks goes to the pair with the highest supply rate once
+    // that chunk (and everything allocated to it so far) is added.
+    function allocateDeposit(
+        KashiPairSnapshot[] memory snapshots,
+        Rebase memory bentoTotals,
+        uint256 sharesToDeposit,
+        uint256 chunks
+    ) internal pure returns (uint256[] memory allocations) {
+        allocations = new uint256[](snapshots.length);
+
+        if (snapshots.length == 0) return allocations;
+
+        uint256 chunkShares = sharesToDeposit.div(chunks);
+
+        for (uint256 c = 0; c < chunks; c++) {
+            if (c == chunks - 1) {
+                // The last chunk picks up the rounding remainder
+                chunkShares = sharesToDeposit.sub(chunkShares.mul(chunks - 1));
+            }
+
+            uint256 highestIndex =
+                highestSupplyRatePair(
+                    snapshots,
+                    bentoTotals,
+                    allocations,
+                    chunkShares
+                );
+            allocations[highestIndex] = allocations[highestIndex].add(
+                chunkShares
+            );
+        }
+    }
+
+    function highestSupplyRatePair(
+        KashiPairSnapshot[] memory snapshots,
+        Rebase memory bentoTotals,
+        uint256[] memory allocations,
+        uint256 sharesToDeposit
+    ) internal pure returns (uint256 _highestIndex) {
+        uint256 highestRate = 0;
+
+        for (uint256 i = 0; i < snapshots.length; i++) {
+            uint256 rate =
+                kashiPairSupplyRate(
+                    snapshots[i],
+                    bentoTotals,
+                    allocations[i].add(sharesToDeposit)
+                );
+
+            if (rate > highestRate) {
+                highestRate = rate;
+                _highestIndex = i;
+            }
+        }
+    }
+
+    // Kashi borrowers pay interestPerBlock on the borrowed amount, which is
+    // shared by every lender in the pair, so lenders earn the interest
+    // rate scaled by utilization (before the protocol fee, same on all pairs)
+    function kashiPairSupplyRate(
+        KashiPairSnapshot memory snapshot,
+        Rebase memory bentoTotals,
+        uint256 sharesToDeposit
+    ) internal pure returns (uint256) {
+        uint256 utilization =
+            kashiPairUtilization(snapshot, bentoTotals, sharesToDeposit);
+
+        return
+            snapshot.interestPerBlock.mul(utilization).div(
+                KASHI_UTILIZATION_PRECISION
+            );
+    }
+
+    // lowestInterestPair returns snapshots.length if no pair has at least
+    // minShares withdrawable
+    function lowestInterestPair(
+        KashiPairSnapshot[] memory snapshots,
+        Rebase memory bentoTotals,
+        uint256[] memory withdrawable,
+        uint256 minShares
+    ) internal pure returns (uint256 _lowestIndex) {
         uint256 lowestInterest = type(uint256).max;
         uint256 lowestUtilization = KASHI_UTILIZATION_PRECISION;
+        _lowestIndex = snapshots.length;
 
-        for (uint256 i = 0; i < kashiPairs.length; i++) {
-            KashiPairInfo memory kashiPairInfo = kashiPairs[i];
+        for (uint256 i = 0; i < snapshots.length; i++) {
+            KashiPairSnapshot memory snapshot = snapshots[i];
 
-            (uint256 interestPerBlock, , ) =
-                kashiPairInfo.kashiPair.accrueInfo();
+            uint256 interestPerBlock = snapshot.interestPerBlock;
 
             uint256 utilization =
-                kashiPairUtilization(kashiPairInfo.kashiPair, 0);
+                kashiPairUtilization(snapshot, bentoTotals, 0);
 
             // A pair is lowest if either
             //   - It's utilization is lower, and either
@@ -805,32 +1468,26 @@ contract Strategy is BaseStrategy {
                         lowestUtilization < KASHI_MAXIMUM_TARGET_UTILIZATION &&
                         lowestUtilization >
                         KASHI_MINIMUM_TARGET_UTILIZATION)) &&
-                kashiFractionTotal(kashiPairInfo.kashiPair, kashiPairInfo.pid) >
-                dustThreshold &&
-                kashiPairLiquidShares(kashiPairInfo.kashiPair) >=
-                minLiquidShares
+                withdrawable[i] > 0 &&
+                withdrawable[i] >= minShares
             ) {
                 lowestInterest = interestPerBlock;
-                _lowestPair = kashiPairInfo.kashiPair;
-                _lowestPid = kashiPairInfo.pid;
+                lowestUtilization = utilization;
+                _lowestIndex = i;
             }
         }
     }
 
-    function kashiPairUtilization(IKashiPair kashiPair, uint256 sharesToDeposit)
-        internal
-        view
-        returns (uint256)
-    {
-        uint256 totalAssetShares = kashiPair.totalAsset().elastic;
-        uint256 totalBorrowAmount = kashiPair.totalBorrow().elastic;
+    function kashiPairUtilization(
+        KashiPairSnapshot memory snapshot,
+        Rebase memory bentoTotals,
+        uint256 sharesToDeposit
+    ) internal pure returns (uint256) {
+        uint256 totalAssetShares = snapshot.totalAsset.elastic;
+        uint256 totalBorrowAmount = snapshot.totalBorrow.elastic;
         uint256 fullAssetAmount =
-            bentoBox
-                .toAmount(
-                BIERC20(address(this)),
-                totalAssetShares.add(sharesToDeposit),
-                false
-            )
+            bentoTotals
+                .toElastic(totalAssetShares.add(sharesToDeposit), false)
                 .add(totalBorrowAmount);
 
         return
@@ -839,52 +1496,54 @@ contract Strategy is BaseStrategy {
             );
     }
 
-    function wantToBentoShares(uint256 wantAmount)
+    // Same rounding as bentoBox.toShare(want, wantAmount, true)
+    function wantToBentoShares(Rebase memory bentoTotals, uint256 wantAmount)
         internal
-        view
+        pure
         returns (uint256)
     {
         if (wantAmount == 0) return 0;
-        return bentoBox.toShare(BIERC20(address(this)), wantAmount, true);
+        return bentoTotals.toBase(wantAmount, true);
     }
 
-    function bentoSharesToWant(uint256 bentoShares)
+    // Same rounding as bentoBox.toAmount(want, bentoShares, true)
+    function bentoSharesToWant(Rebase memory bentoTotals, uint256 bentoShares)
         internal
-        view
+        pure
         returns (uint256)
     {
         if (bentoShares == 0) return 0;
-        return bentoBox.toAmount(BIERC20(address(this)), bentoShares, true);
+        return bentoTotals.toElastic(bentoShares, true);
     }
 
     function bentoSharesToKashiFraction(
-        IKashiPair kashiPair,
+        KashiPairSnapshot memory snapshot,
+        Rebase memory bentoTotals,
         uint256 bentoShares
-    ) internal view returns (uint256 _kashiFraction) {
+    ) internal pure returns (uint256 _kashiFraction) {
         // Adapted from https://github.com/sushiswap/kashi-lending/blob/b6e3521d8628a835935c94a9039cfd192044d66b/contracts/KashiPair.sol#L320-L323
-        Rebase memory totalAsset = kashiPair.totalAsset();
-        Rebase memory totalBorrow = kashiPair.totalBorrow();
         uint256 allShare =
-            uint256(totalAsset.elastic).add(
-                wantToBentoShares(totalBorrow.elastic)
+            uint256(snapshot.totalAsset.elastic).add(
+                wantToBentoShares(bentoTotals, snapshot.totalBorrow.elastic)
             );
         _kashiFraction = allShare == 0
             ? bentoShares
-            : bentoShares.mul(totalAsset.base).div(allShare);
+            : bentoShares.mul(snapshot.totalAsset.base).div(allShare);
     }
 
     function kashiFractionToBentoShares(
-        IKashiPair kashiPair,
+        KashiPairSnapshot memory snapshot,
+        Rebase memory bentoTotals,
         uint256 _kashiFraction
-    ) internal view returns (uint256 bentoShares) {
+    ) internal pure returns (uint256 bentoShares) {
         // Adapted from https://github.com/sushiswap/kashi-lending/blob/b6e3521d8628a835935c94a9039cfd192044d66b/contracts/KashiPair.sol#L351-L353
-        Rebase memory totalAsset = kashiPair.totalAsset();
-        Rebase memory totalBorrow = kashiPair.totalBorrow();
         uint256 allShare =
-            uint256(totalAsset.elastic).add(
-                wantToBentoShares(totalBorrow.elastic)
+            uint256(snapshot.totalAsset.elastic).add(
+                wantToBentoShares(bentoTotals, snapshot.totalBorrow.elastic)
             );
-        bentoShares = _kashiFraction.mul(allShare).div(totalAsset.base);
+        bentoShares = _kashiFraction.mul(allShare).div(
+            snapshot.totalAsset.base
+        );
     }
 
     function protectedTokens()
@@ -894,6 +1553,225 @@ contract Strategy is BaseStrategy {
         returns (address[] memory)
     {}
 
+    // Harvest when the vault needs it (same schedule and debt checks as
+    // BaseStrategy), or once what it would realize pays for the call
+    // profitFactor times over: interest accrued since the pairs were last
+    // accrued, the SUSHI it would sell and the credit it would deploy
+    function harvestTrigger(uint256 callCostInWei)
+        public
+        view
+        override
+        returns (bool)
+    {
+        StrategyParams memory params = vault.strategies(address(this));
+
+        if (params.activation == 0) return false;
+
+        uint256 sinceReport = block.timestamp.sub(params.lastReport);
+        if (sinceReport < minReportDelay) return false;
+        if (sinceReport >= maxReportDelay) return true;
+
+        if (vault.debtOutstanding() > debtThreshold) return true;
+
+        IBentoBox _bentoBox = bentoBox;
+        KashiPairSnapshot[] memory snapshots = loadKashiPairs();
+        Rebase memory bentoTotals = loadBentoTotals(_bentoBox);
+
+        uint256 accrueWindow = accrueStalenessWindow;
+        for (uint256 i = 0; i < snapshots.length; i++) {
+            accrueSnapshot(snapshots[i], bentoTotals, accrueWindow);
+        }
+
+        uint256 total = estimatedTotalAssets(_bentoBox, snapshots, bentoTotals);
+        if (total.add(debtThreshold) < params.totalDebt) return true;
+
+        uint256 profit = 0;
+        if (total > params.totalDebt) profit = total.sub(params.totalDebt);
+
+        uint256 gain =
+            profit.add(sushiToSellInWant(snapshots)).add(
+                vault.creditAvailable()
+            );
+
+        return paysForCall(callCostInWei, gain);
+    }
+
+    // Tend deploys idle want, which would otherwise wait for the next harvest.
+    // Trigger once the interest it earns until then, at the supply rate of
+    // the pair it would go to with the pair's utilization after the deposit,
+    // pays for the call profitFactor times over
+    function tendTrigger(uint256 callCostInWei)
+        public
+        view
+        override
+        returns (bool)
+    {
+        if (emergencyExit) return false;
+
+        StrategyParams memory params = vault.strategies(address(this));
+
+        if (params.activation == 0) return false;
+
+        uint256 sinceReport = block.timestamp.sub(params.lastReport);
+        if (sinceReport >= maxReportDelay) return false; // harvest is due
+
+        IBentoBox _bentoBox = bentoBox;
+        Rebase memory bentoTotals = loadBentoTotals(_bentoBox);
+        uint256 idleShares =
+            sharesInBento(_bentoBox).add(
+                bentoTotals.toBase(balanceOfWant(), false)
+            );
+
+        if (idleShares <= wantToBentoShares(bentoTotals, dustThreshold)) {
+            return false;
+        }
+
+        KashiPairSnapshot memory highestPair =
+            highestInterestPair(loadKashiPairs(), bentoTotals, idleShares);
+
+        if (address(highestPair.kashiPair) == address(0)) return false;
+
+        uint256 gain =
+            bentoSharesToWant(bentoTotals, idleShares)
+                .mul(kashiPairSupplyRate(highestPair, bentoTotals, idleShares))
+                .mul(maxReportDelay.sub(sinceReport))
+                .div(KASHI_INTEREST_PRECISION)
+                .mul(KASHI_PROTOCOL_FEE_DIVISOR.sub(KASHI_PROTOCOL_FEE))
+                .div(KASHI_PROTOCOL_FEE_DIVISOR);
+
+        return paysForCall(callCostInWei, gain);
+    }
+
+    // Whether gain pays for a call costing callCostInWei profitFactor times
+    // over. A call that cannot be priced in want never pays for itself
+    function paysForCall(uint256 callCostInWei, uint256 gain)
+        internal
+        view
+        returns (bool)
+    {
+        uint256 callCost = ethToWant(callCostInWei);
+        if (callCost == 0 && callCostInWei != 0) return false;
+        return profitFactor.mul(callCost) < gain;
+    }
+
+    // What kashiPair.accrue would do to the snapshot's totals, so views can
+    // estimate our assets with the interest owed since the last accrual.
+    // Pairs accrued within maxStaleness seconds are left as they are
+    function accrueSnapshot(
+        KashiPairSnapshot memory snapshot,
+        Rebase memory bentoTotals,
+        uint256 maxStaleness
+    ) internal view {
+        uint256 elapsed = block.timestamp.sub(snapshot.lastAccrued);
+        if (elapsed <= maxStaleness || snapshot.totalBorrow.base == 0) return;
+
+        uint256 extraAmount =
+            uint256(snapshot.totalBorrow.elastic)
+                .mul(snapshot.interestPerBlock)
+                .mul(elapsed)
+                .div(KASHI_INTEREST_PRECISION);
+        uint256 totalBorrowAmount =
+            uint256(snapshot.totalBorrow.elastic).add(extraAmount);
+        uint256 fullAssetAmount =
+            bentoTotals.toElastic(snapshot.totalAsset.elastic, false).add(
+                totalBorrowAmount
+            );
+        uint256 feeFraction =
+            extraAmount
+                .mul(KASHI_PROTOCOL_FEE)
+                .div(KASHI_PROTOCOL_FEE_DIVISOR)
+                .mul(snapshot.totalAsset.base)
+                .div(fullAssetAmount);
+
+        snapshot.totalBorrow.elastic = uint128(totalBorrowAmount);
+        snapshot.totalAsset.base = uint128(
+            uint256(snapshot.totalAsset.base).add(feeFraction)
+        );
+        snapshot.lastAccrued = block.timestamp;
+    }
+
+    // The want a harvest would get for the SUSHI it holds and claims, 0 when
+    // it is worth less than minSushiSellValue and would not be sold
+    function sushiToSellInWant(KashiPairSnapshot[] memory snapshots)
+        internal
+        view
+        returns (uint256)
+    {
+        uint256 sushiAmount = balanceOfSushi();
+        uint256 _minPendingSushi = minPendingSushi;
+
+        for (uint256 i = 0; i < snapshots.length; i++) {
+            KashiPairSnapshot memory snapshot = snapshots[i];
+            if (kashiFractionTotal(snapshot) == 0) continue;
+            if (shouldClaimSushi(snapshot, _minPendingSushi)) {
+                sushiAmount = sushiAmount.add(
+                    masterChef.pendingSushi(snapshot.pid, address(this))
+                );
+            }
+        }
+
+        if (sushiAmount == 0) return 0;
+
+        address[] memory _path = path;
+        uint256[] memory amounts =
+            sushiRouter.getAmountsOut(sushiAmount, _path);
+        uint256 wantAmount = amounts[amounts.length - 1];
+
+        return wantAmount < minSushiSellValue ? 0 : wantAmount;
+    }
+
+    // Records the pair's price accumulator, and the average since the last
+    // observation once that window is at least WANT_PRICE_PERIOD long
+    function observeWantPrice() internal {
+        IUniswapV2Pair pair = wantPricePair;
+        if (address(pair) == address(0)) return;
+
+        uint256 observedAt = wantPriceObservedAt;
+        uint256 elapsed = block.timestamp.sub(observedAt);
+        if (observedAt != 0 && elapsed < WANT_PRICE_PERIOD) return;
+
+        uint256 priceCumulative = wantPriceCumulative(pair);
+        if (observedAt != 0) {
+            // - overflow is desired
+            wantPriceAverage = uint224(
+                (priceCumulative - wantPriceCumulativeLast) / elapsed
+            );
+        }
+        wantPriceCumulativeLast = priceCumulative;
+        wantPriceObservedAt = uint32(block.timestamp);
+    }
+
+    // The pair's WETH price accumulator as of this block, adapted from
+    // UniswapV2OracleLibrary.currentCumulativePrices
+    function wantPriceCumulative(IUniswapV2Pair pair)
+        internal
+        view
+        returns (uint256 priceCumulative)
+    {
+        bool _wethIsToken0 = wethIsToken0;
+        priceCumulative = _wethIsToken0
+            ? pair.price0CumulativeLast()
+            : pair.price1CumulativeLast();
+
+        (uint112 reserve0, uint112 reserve1, uint32 blockTimestampLast) =
+            pair.getReserves();
+        uint32 elapsed = uint32(block.timestamp) - blockTimestampLast; // overflow is desired
+
+        if (elapsed > 0 && reserve0 != 0 && reserve1 != 0) {
+            // * never overflows, and + overflow is desired
+            priceCumulative += _wethIsToken0
+                ? ((uint256(reserve1) << 112) / reserve0) * elapsed
+                : ((uint256(reserve0) << 112) / reserve1) * elapsed;
+        }
+    }
+
+    // Prices WETH with the sushi WETH/want pair's time weighted average since
+    // the last observation, or the one before when that is too recent. The
+    // accumulators only move at the start of a block, so a price moved within
+    // the block (or held for a few) barely shifts the average. Until an
+    // average covers WANT_PRICE_PERIOD (right after initialization) the spot
+    // quote stands in, as a shorter average is as easy to move. Without a
+    // WETH/want pair there is no price and it returns 0
     function ethToWant(uint256 _amtInWei)
         public
         view
@@ -901,7 +1779,26 @@ contract Strategy is BaseStrategy {
         override
         returns (uint256)
     {
-        // TODO create an accurate price oracle
-        return _amtInWei;
+        if (address(want) == address(weth) || _amtInWei == 0) return _amtInWei;
+
+        IUniswapV2Pair pair = wantPricePair;
+        if (address(pair) == address(0)) return 0; // no pair to price with
+
+        uint256 priceAverage = wantPriceAverage;
+        uint256 elapsed = block.timestamp.sub(wantPriceObservedAt);
+
+        if (elapsed >= WANT_PRICE_PERIOD) {
+            // - overflow is desired
+            priceAverage = uint224(
+                (wantPriceCumulative(pair) - wantPriceCumulativeLast) / elapsed
+            );
+        } else if (priceAverage == 0) {
+            address[] memory _path = new address[](2);
+            _path[0] = address(weth);
+            _path[1] = address(want);
+            return sushiRouter.getAmountsOut(_amtInWei, _path)[1];
+        }
+
+        return _amtInWei.mul(priceAverage) >> 112;
     }
 }
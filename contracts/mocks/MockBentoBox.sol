@@ -0,0 +1,235 @@
+// SPDX-License-Identifier: AGPL-3.0
+
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import {
+    SafeERC20,
+    IERC20
+} from "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+
+import {
+    BoringMath,
+    BoringMath128
+} from "../boringcrypto/boring-solidity/libraries/BoringMath.sol";
+import {
+    Rebase,
+    RebaseLibrary
+} from "../boringcrypto/boring-solidity/libraries/BoringRebase.sol";
+
+// Share accounting, master contract approvals and the rounding of BentoBoxV1
+// without strategies, flash loans or signed approvals
+contract MockBentoBox {
+    using SafeERC20 for IERC20;
+    using BoringMath for uint256;
+    using BoringMath128 for uint128;
+    using RebaseLibrary for Rebase;
+
+    uint256 internal constant MINIMUM_SHARE_BALANCE = 1000;
+
+    address public owner;
+
+    mapping(IERC20 => Rebase) public totals;
+    mapping(IERC20 => mapping(address => uint256)) public balanceOf;
+
+    mapping(address => address) public masterContractOf;
+    mapping(address => mapping(address => bool)) public masterContractApproved;
+    mapping(address => bool) public whitelistedMasterContracts;
+
+    event LogDeposit(
+        IERC20 indexed token,
+        address indexed from,
+        address indexed to,
+        uint256 amount,
+        uint256 share
+    );
+    event LogWithdraw(
+        IERC20 indexed token,
+        address indexed from,
+        address indexed to,
+        uint256 amount,
+        uint256 share
+    );
+    event LogTransfer(
+        IERC20 indexed token,
+        address indexed from,
+        address indexed to,
+        uint256 share
+    );
+    event LogRegisterProtocol(address indexed protocol);
+    event LogWhiteListMasterContract(
+        address indexed masterContract,
+        bool approved
+    );
+    event LogSetMasterContractApproval(
+        address indexed masterContract,
+        address indexed user,
+        bool approved
+    );
+
+    constructor() public {
+        owner = msg.sender;
+    }
+
+    modifier allowed(address _from) {
+        if (_from != msg.sender && _from != address(this)) {
+            address masterContract = masterContractOf[msg.sender];
+            require(
+                masterContract != address(0),
+                "BentoBox: no masterContract"
+            );
+            require(
+                masterContractApproved[masterContract][_from],
+                "BentoBox: Transfer not approved"
+            );
+        }
+        _;
+    }
+
+    function registerProtocol() external {
+        masterContractOf[msg.sender] = msg.sender;
+        emit LogRegisterProtocol(msg.sender);
+    }
+
+    function whitelistMasterContract(address _masterContract, bool _approved)
+        external
+    {
+        require(msg.sender == owner, "Ownable: caller is not the owner");
+        require(_masterContract != address(0), "MasterCMgr: Cannot approve 0");
+        whitelistedMasterContracts[_masterContract] = _approved;
+        emit LogWhiteListMasterContract(_masterContract, _approved);
+    }
+
+    // Only the direct (unsigned) approval path is supported
+    function setMasterContractApproval(
+        address _user,
+        address _masterContract,
+        bool _approved,
+        uint8 _v,
+        bytes32 _r,
+        bytes32 _s
+    ) external {
+        require(
+            _v == 0 && _r == 0 && _s == 0,
+            "MockBentoBox: signed approvals not supported"
+        );
+        require(_user == msg.sender, "MasterCMgr: user not sender");
+        require(
+            masterContractOf[_user] == address(0),
+            "MasterCMgr: user is clone"
+        );
+        require(
+            whitelistedMasterContracts[_masterContract],
+            "MasterCMgr: not whitelisted"
+        );
+
+        masterContractApproved[_masterContract][_user] = _approved;
+        emit LogSetMasterContractApproval(_masterContract, _user, _approved);
+    }
+
+    function toShare(
+        IERC20 _token,
+        uint256 _amount,
+        bool _roundUp
+    ) external view returns (uint256 share) {
+        share = totals[_token].toBase(_amount, _roundUp);
+    }
+
+    function toAmount(
+        IERC20 _token,
+        uint256 _share,
+        bool _roundUp
+    ) external view returns (uint256 amount) {
+        amount = totals[_token].toElastic(_share, _roundUp);
+    }
+
+    function deposit(
+        IERC20 _token,
+        address _from,
+        address _to,
+        uint256 _amount,
+        uint256 _share
+    ) external allowed(_from) returns (uint256 amountOut, uint256 shareOut) {
+        require(_to != address(0), "BentoBox: to not set");
+
+        Rebase memory total = totals[_token];
+        require(
+            total.elastic != 0 || _token.totalSupply() > 0,
+            "BentoBox: No tokens"
+        );
+        if (_share == 0) {
+            _share = total.toBase(_amount, false);
+            if (total.base.add(_share.to128()) < MINIMUM_SHARE_BALANCE) {
+                return (0, 0);
+            }
+        } else {
+            _amount = total.toElastic(_share, true);
+        }
+
+        balanceOf[_token][_to] = balanceOf[_token][_to].add(_share);
+        total.base = total.base.add(_share.to128());
+        total.elastic = total.elastic.add(_amount.to128());
+        totals[_token] = total;
+
+        _token.safeTransferFrom(_from, address(this), _amount);
+        emit LogDeposit(_token, _from, _to, _amount, _share);
+        amountOut = _amount;
+        shareOut = _share;
+    }
+
+    function withdraw(
+        IERC20 _token,
+        address _from,
+        address _to,
+        uint256 _amount,
+        uint256 _share
+    ) external allowed(_from) returns (uint256 amountOut, uint256 shareOut) {
+        require(_to != address(0), "BentoBox: to not set");
+
+        Rebase memory total = totals[_token];
+        if (_share == 0) {
+            _share = total.toBase(_amount, true);
+        } else {
+            _amount = total.toElastic(_share, false);
+        }
+
+        balanceOf[_token][_from] = balanceOf[_token][_from].sub(_share);
+        total.elastic = total.elastic.sub(_amount.to128());
+        total.base = total.base.sub(_share.to128());
+        require(
+            total.base >= MINIMUM_SHARE_BALANCE || total.base == 0,
+            "BentoBox: cannot empty"
+        );
+        totals[_token] = total;
+
+        _token.safeTransfer(_to, _amount);
+        emit LogWithdraw(_token, _from, _to, _amount, _share);
+        amountOut = _amount;
+        shareOut = _share;
+    }
+
+    function transfer(
+        IERC20 _token,
+        address _from,
+        address _to,
+        uint256 _share
+    ) external allowed(_from) {
+        require(_to != address(0), "BentoBox: to not set");
+
+        balanceOf[_token][_from] = balanceOf[_token][_from].sub(_share);
+        balanceOf[_token][_to] = balanceOf[_token][_to].add(_share);
+        emit LogTransfer(_token, _from, _to, _share);
+    }
+
+    // Stands in for strategy profits reported through BentoBox.harvest, it
+    // moves the share price of _token away from 1:1
+    function addProfit(IERC20 _token, uint256 _amount) external {
+        Rebase memory total = totals[_token];
+        require(total.base > 0, "MockBentoBox: no shares");
+
+        total.elastic = total.elastic.add(_amount.to128());
+        totals[_token] = total;
+
+        _token.safeTransferFrom(msg.sender, address(this), _amount);
+    }
+}
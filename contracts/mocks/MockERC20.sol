@@ -0,0 +1,91 @@
+// SPDX-License-Identifier: AGPL-3.0
+
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+// Mintable ERC20 for local testing. Configured through initialize instead of
+// a constructor so its runtime code can be etched at a hardcoded address
+// (weth, sushi) and still report a name and decimals
+contract MockERC20 {
+    using SafeMath for uint256;
+
+    string public name;
+    string public symbol;
+    uint8 public decimals;
+    uint256 public totalSupply;
+
+    mapping(address => uint256) public balanceOf;
+    mapping(address => mapping(address => uint256)) public allowance;
+
+    event Transfer(address indexed from, address indexed to, uint256 value);
+    event Approval(
+        address indexed owner,
+        address indexed spender,
+        uint256 value
+    );
+
+    function initialize(
+        string memory _name,
+        string memory _symbol,
+        uint8 _decimals
+    ) external {
+        require(bytes(name).length == 0); // Check if previously initialized
+
+        name = _name;
+        symbol = _symbol;
+        decimals = _decimals;
+    }
+
+    // Anyone can mint, the mock router and masterChef rely on it
+    function mint(address _to, uint256 _amount) external {
+        totalSupply = totalSupply.add(_amount);
+        balanceOf[_to] = balanceOf[_to].add(_amount);
+        emit Transfer(address(0), _to, _amount);
+    }
+
+    function approve(address _spender, uint256 _amount)
+        external
+        returns (bool)
+    {
+        allowance[msg.sender][_spender] = _amount;
+        emit Approval(msg.sender, _spender, _amount);
+        return true;
+    }
+
+    function transfer(address _to, uint256 _amount) external returns (bool) {
+        _transfer(msg.sender, _to, _amount);
+        return true;
+    }
+
+    function transferFrom(
+        address _from,
+        address _to,
+        uint256 _amount
+    ) external returns (bool) {
+        uint256 allowed = allowance[_from][msg.sender];
+        if (allowed != type(uint256).max) {
+            allowance[_from][msg.sender] = allowed.sub(
+                _amount,
+                "ERC20: transfer amount exceeds allowance"
+            );
+        }
+        _transfer(_from, _to, _amount);
+        return true;
+    }
+
+    function _transfer(
+        address _from,
+        address _to,
+        uint256 _amount
+    ) internal {
+        require(_to != address(0), "ERC20: transfer to the zero address");
+
+        balanceOf[_from] = balanceOf[_from].sub(
+            _amount,
+            "ERC20: transfer amount exceeds balance"
+        );
+        balanceOf[_to] = balanceOf[_to].add(_amount);
+        emit Transfer(_from, _to, _amount);
+    }
+}
@@ -0,0 +1,16 @@
+// SPDX-License-Identifier: AGPL-3.0
+
+pragma solidity 0.6.12;
+
+// Etched at health.ychad.eth, which the strategy sets as its healthCheck
+contract MockHealthCheck {
+    function check(
+        uint256,
+        uint256,
+        uint256,
+        uint256,
+        uint256
+    ) external pure returns (bool) {
+        return true;
+    }
+}
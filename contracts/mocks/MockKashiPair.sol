@@ -0,0 +1,586 @@
+// SPDX-License-Identifier: AGPL-3.0
+
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import {IERC20} from "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+
+import {
+    BoringMath,
+    BoringMath128
+} from "../boringcrypto/boring-solidity/libraries/BoringMath.sol";
+import {
+    Rebase,
+    RebaseLibrary
+} from "../boringcrypto/boring-solidity/libraries/BoringRebase.sol";
+import {MockBentoBox} from "./MockBentoBox.sol";
+
+// KashiPairMediumRiskV1 lending with the same interest model, fees and
+// rounding. The oracle is replaced by a settable exchangeRate (0 treats every
+// borrower with collateral as solvent) and liquidations are not supported.
+// Each pair is its own master contract.
+contract MockKashiPair {
+    using BoringMath for uint256;
+    using BoringMath128 for uint128;
+    using RebaseLibrary for Rebase;
+
+    struct AccrueInfo {
+        uint64 interestPerSecond;
+        uint64 lastAccrued;
+        uint128 feesEarnedFraction;
+    }
+
+    // Interest model (KashiPairMediumRiskV1)
+    uint256 internal constant CLOSED_COLLATERIZATION_RATE = 75000; // 75%
+    uint256 internal constant COLLATERIZATION_RATE_PRECISION = 1e5;
+    uint256 internal constant EXCHANGE_RATE_PRECISION = 1e18;
+    uint256 internal constant MINIMUM_TARGET_UTILIZATION = 7e17; // 70%
+    uint256 internal constant MAXIMUM_TARGET_UTILIZATION = 8e17; // 80%
+    uint256 internal constant UTILIZATION_PRECISION = 1e18;
+    uint256 internal constant FULL_UTILIZATION = 1e18;
+    uint256 internal constant FULL_UTILIZATION_MINUS_MAX =
+        FULL_UTILIZATION - MAXIMUM_TARGET_UTILIZATION;
+    uint256 internal constant FACTOR_PRECISION = 1e18;
+    uint64 internal constant STARTING_INTEREST_PER_SECOND = 317097920; // 1% APR
+    uint64 internal constant MINIMUM_INTEREST_PER_SECOND = 79274480; // 0.25% APR
+    uint64 internal constant MAXIMUM_INTEREST_PER_SECOND = 317097920000; // 1000% APR
+    uint256 internal constant INTEREST_ELASTICITY = 28800e36;
+    uint256 internal constant PROTOCOL_FEE = 10000; // 10%
+    uint256 internal constant PROTOCOL_FEE_DIVISOR = 1e5;
+    uint256 internal constant BORROW_OPENING_FEE = 50; // 0.05%
+    uint256 internal constant BORROW_OPENING_FEE_PRECISION = 1e5;
+
+    // Cook actions
+    uint8 internal constant ACTION_ADD_ASSET = 1;
+    uint8 internal constant ACTION_REPAY = 2;
+    uint8 internal constant ACTION_REMOVE_ASSET = 3;
+    uint8 internal constant ACTION_BORROW = 5;
+    uint8 internal constant ACTION_ACCRUE = 8;
+    uint8 internal constant ACTION_ADD_COLLATERAL = 10;
+    uint8 internal constant ACTION_BENTO_DEPOSIT = 20;
+    uint8 internal constant ACTION_BENTO_WITHDRAW = 21;
+    uint8 internal constant ACTION_BENTO_TRANSFER = 22;
+    int256 internal constant USE_VALUE1 = -1;
+    int256 internal constant USE_VALUE2 = -2;
+
+    string public constant name = "Kashi Medium Risk Mock";
+    string public constant symbol = "kmMOCK";
+
+    MockBentoBox public bentoBox;
+    IERC20 public collateral;
+    IERC20 public asset;
+    uint8 public decimals;
+
+    uint256 public exchangeRate;
+
+    mapping(address => uint256) public userCollateralShare;
+    mapping(address => uint256) public userBorrowPart;
+    uint256 public totalCollateralShare;
+
+    Rebase public totalAsset; // elastic = BentoBox shares held, base = fractions
+    Rebase public totalBorrow; // elastic = total debt, base = borrow parts
+
+    AccrueInfo public accrueInfo;
+
+    mapping(address => uint256) public balanceOf;
+    mapping(address => mapping(address => uint256)) public allowance;
+
+    event Transfer(address indexed from, address indexed to, uint256 value);
+    event Approval(
+        address indexed owner,
+        address indexed spender,
+        uint256 value
+    );
+    event LogAccrue(
+        uint256 accruedAmount,
+        uint256 feeFraction,
+        uint64 rate,
+        uint256 utilization
+    );
+    event LogAddAsset(
+        address indexed from,
+        address indexed to,
+        uint256 share,
+        uint256 fraction
+    );
+    event LogRemoveAsset(
+        address indexed from,
+        address indexed to,
+        uint256 share,
+        uint256 fraction
+    );
+    event LogAddCollateral(
+        address indexed from,
+        address indexed to,
+        uint256 share
+    );
+    event LogBorrow(
+        address indexed from,
+        address indexed to,
+        uint256 amount,
+        uint256 feeAmount,
+        uint256 part
+    );
+    event LogRepay(
+        address indexed from,
+        address indexed to,
+        uint256 amount,
+        uint256 part
+    );
+
+    constructor(
+        MockBentoBox _bentoBox,
+        IERC20 _collateral,
+        IERC20 _asset,
+        uint8 _decimals
+    ) public {
+        bentoBox = _bentoBox;
+        collateral = _collateral;
+        asset = _asset;
+        decimals = _decimals;
+        accrueInfo.interestPerSecond = STARTING_INTEREST_PER_SECOND;
+
+        _bentoBox.registerProtocol();
+    }
+
+    function masterContract() external view returns (address) {
+        return address(this);
+    }
+
+    function totalSupply() external view returns (uint256) {
+        return totalAsset.base;
+    }
+
+    function setExchangeRate(uint256 _exchangeRate) external {
+        exchangeRate = _exchangeRate;
+    }
+
+    // ERC20 over asset fractions
+
+    function approve(address _spender, uint256 _amount)
+        external
+        returns (bool)
+    {
+        allowance[msg.sender][_spender] = _amount;
+        emit Approval(msg.sender, _spender, _amount);
+        return true;
+    }
+
+    function transfer(address _to, uint256 _amount) external returns (bool) {
+        _transfer(msg.sender, _to, _amount);
+        return true;
+    }
+
+    function transferFrom(
+        address _from,
+        address _to,
+        uint256 _amount
+    ) external returns (bool) {
+        uint256 allowed = allowance[_from][msg.sender];
+        if (allowed != type(uint256).max) {
+            require(allowed >= _amount, "ERC20: allowance too low");
+            allowance[_from][msg.sender] = allowed - _amount;
+        }
+        _transfer(_from, _to, _amount);
+        return true;
+    }
+
+    function _transfer(
+        address _from,
+        address _to,
+        uint256 _amount
+    ) internal {
+        require(_to != address(0), "ERC20: no zero address");
+        require(balanceOf[_from] >= _amount, "ERC20: balance too low");
+
+        balanceOf[_from] = balanceOf[_from] - _amount;
+        balanceOf[_to] = balanceOf[_to].add(_amount);
+        emit Transfer(_from, _to, _amount);
+    }
+
+    // Lending
+
+    function accrue() public {
+        AccrueInfo memory _accrueInfo = accrueInfo;
+        // Number of seconds since accrue was called
+        uint256 elapsedTime = block.timestamp - _accrueInfo.lastAccrued;
+        if (elapsedTime == 0) {
+            return;
+        }
+        _accrueInfo.lastAccrued = uint64(block.timestamp);
+
+        Rebase memory _totalBorrow = totalBorrow;
+        if (_totalBorrow.base == 0) {
+            // If there are no borrows, reset the interest rate
+            if (_accrueInfo.interestPerSecond != STARTING_INTEREST_PER_SECOND) {
+                _accrueInfo.interestPerSecond = STARTING_INTEREST_PER_SECOND;
+                emit LogAccrue(0, 0, STARTING_INTEREST_PER_SECOND, 0);
+            }
+            accrueInfo = _accrueInfo;
+            return;
+        }
+
+        Rebase memory _totalAsset = totalAsset;
+
+        // Accrue interest
+        uint256 extraAmount =
+            uint256(_totalBorrow.elastic)
+                .mul(_accrueInfo.interestPerSecond)
+                .mul(elapsedTime) / 1e18;
+        _totalBorrow.elastic = _totalBorrow.elastic.add(extraAmount.to128());
+        uint256 fullAssetAmount =
+            bentoBox.toAmount(asset, _totalAsset.elastic, false).add(
+                _totalBorrow.elastic
+            );
+
+        uint256 feeAmount =
+            extraAmount.mul(PROTOCOL_FEE) / PROTOCOL_FEE_DIVISOR; // % of interest paid goes to fee
+        uint256 feeFraction =
+            feeAmount.mul(_totalAsset.base) / fullAssetAmount;
+        _accrueInfo.feesEarnedFraction = _accrueInfo.feesEarnedFraction.add(
+            feeFraction.to128()
+        );
+        totalAsset.base = _totalAsset.base.add(feeFraction.to128());
+        totalBorrow = _totalBorrow;
+
+        // Update interest rate
+        uint256 utilization =
+            uint256(_totalBorrow.elastic).mul(UTILIZATION_PRECISION) /
+                fullAssetAmount;
+        if (utilization < MINIMUM_TARGET_UTILIZATION) {
+            uint256 underFactor =
+                MINIMUM_TARGET_UTILIZATION.sub(utilization).mul(
+                    FACTOR_PRECISION
+                ) / MINIMUM_TARGET_UTILIZATION;
+            uint256 scale =
+                INTEREST_ELASTICITY.add(
+                    underFactor.mul(underFactor).mul(elapsedTime)
+                );
+            _accrueInfo.interestPerSecond = uint64(
+                uint256(_accrueInfo.interestPerSecond).mul(
+                    INTEREST_ELASTICITY
+                ) / scale
+            );
+
+            if (_accrueInfo.interestPerSecond < MINIMUM_INTEREST_PER_SECOND) {
+                _accrueInfo.interestPerSecond = MINIMUM_INTEREST_PER_SECOND; // 0.25% APR minimum
+            }
+        } else if (utilization > MAXIMUM_TARGET_UTILIZATION) {
+            uint256 overFactor =
+                utilization.sub(MAXIMUM_TARGET_UTILIZATION).mul(
+                    FACTOR_PRECISION
+                ) / FULL_UTILIZATION_MINUS_MAX;
+            uint256 scale =
+                INTEREST_ELASTICITY.add(
+                    overFactor.mul(overFactor).mul(elapsedTime)
+                );
+            uint256 newInterestPerSecond =
+                uint256(_accrueInfo.interestPerSecond).mul(scale) /
+                    INTEREST_ELASTICITY;
+            if (newInterestPerSecond > MAXIMUM_INTEREST_PER_SECOND) {
+                newInterestPerSecond = MAXIMUM_INTEREST_PER_SECOND; // 1000% APR maximum
+            }
+            _accrueInfo.interestPerSecond = uint64(newInterestPerSecond);
+        }
+
+        emit LogAccrue(
+            extraAmount,
+            feeFraction,
+            _accrueInfo.interestPerSecond,
+            utilization
+        );
+        accrueInfo = _accrueInfo;
+    }
+
+    function isSolvent(address _user, bool) public view returns (bool) {
+        // accrue must have already been called
+        uint256 borrowPart = userBorrowPart[_user];
+        if (borrowPart == 0) return true;
+        uint256 collateralShare = userCollateralShare[_user];
+        if (collateralShare == 0) return false;
+
+        Rebase memory _totalBorrow = totalBorrow;
+
+        return
+            bentoBox.toAmount(
+                collateral,
+                collateralShare
+                    .mul(
+                    EXCHANGE_RATE_PRECISION / COLLATERIZATION_RATE_PRECISION
+                )
+                    .mul(CLOSED_COLLATERIZATION_RATE),
+                false
+            ) >=
+            borrowPart.mul(_totalBorrow.elastic).mul(exchangeRate) /
+                _totalBorrow.base;
+    }
+
+    function addCollateral(
+        address _to,
+        bool _skim,
+        uint256 _share
+    ) public {
+        userCollateralShare[_to] = userCollateralShare[_to].add(_share);
+        uint256 oldTotalCollateralShare = totalCollateralShare;
+        totalCollateralShare = oldTotalCollateralShare.add(_share);
+        _addTokens(collateral, _share, oldTotalCollateralShare, _skim);
+        emit LogAddCollateral(
+            _skim ? address(bentoBox) : msg.sender,
+            _to,
+            _share
+        );
+    }
+
+    function addAsset(
+        address _to,
+        bool _skim,
+        uint256 _share
+    ) public returns (uint256 fraction) {
+        accrue();
+        fraction = _addAsset(_to, _skim, _share);
+    }
+
+    function removeAsset(address _to, uint256 _fraction)
+        public
+        returns (uint256 share)
+    {
+        accrue();
+        share = _removeAsset(_to, _fraction);
+    }
+
+    function borrow(address _to, uint256 _amount)
+        public
+        returns (uint256 part, uint256 share)
+    {
+        accrue();
+        (part, share) = _borrow(_to, _amount);
+        require(isSolvent(msg.sender, false), "KashiPair: user insolvent");
+    }
+
+    function repay(
+        address _to,
+        bool _skim,
+        uint256 _part
+    ) public returns (uint256 amount) {
+        accrue();
+        amount = _repay(_to, _skim, _part);
+    }
+
+    struct CookStatus {
+        bool needsSolvencyCheck;
+        bool hasAccrued;
+    }
+
+    function cook(
+        uint8[] calldata _actions,
+        uint256[] calldata,
+        bytes[] calldata _datas
+    ) external payable returns (uint256 value1, uint256 value2) {
+        CookStatus memory status;
+        for (uint256 i = 0; i < _actions.length; i++) {
+            uint8 action = _actions[i];
+            if (!status.hasAccrued && action < 10) {
+                accrue();
+                status.hasAccrued = true;
+            }
+            if (action == ACTION_ADD_COLLATERAL) {
+                (int256 share, address to, bool skim) =
+                    abi.decode(_datas[i], (int256, address, bool));
+                addCollateral(to, skim, num(share, value1, value2));
+            } else if (action == ACTION_ADD_ASSET) {
+                (int256 share, address to, bool skim) =
+                    abi.decode(_datas[i], (int256, address, bool));
+                value1 = _addAsset(to, skim, num(share, value1, value2));
+            } else if (action == ACTION_REPAY) {
+                (int256 part, address to, bool skim) =
+                    abi.decode(_datas[i], (int256, address, bool));
+                _repay(to, skim, num(part, value1, value2));
+            } else if (action == ACTION_REMOVE_ASSET) {
+                (int256 fraction, address to) =
+                    abi.decode(_datas[i], (int256, address));
+                value1 = _removeAsset(to, num(fraction, value1, value2));
+            } else if (action == ACTION_BORROW) {
+                (int256 amount, address to) =
+                    abi.decode(_datas[i], (int256, address));
+                (value1, value2) = _borrow(to, num(amount, value1, value2));
+                status.needsSolvencyCheck = true;
+            } else if (action == ACTION_ACCRUE) {
+                // Accrued above
+            } else if (action == ACTION_BENTO_DEPOSIT) {
+                (value1, value2) = bentoDeposit(_datas[i], value1, value2);
+            } else if (action == ACTION_BENTO_WITHDRAW) {
+                (value1, value2) = bentoWithdraw(_datas[i], value1, value2);
+            } else if (action == ACTION_BENTO_TRANSFER) {
+                bentoTransfer(_datas[i], value1, value2);
+            } else {
+                revert("MockKashiPair: action not supported");
+            }
+        }
+
+        if (status.needsSolvencyCheck) {
+            require(isSolvent(msg.sender, false), "KashiPair: user insolvent");
+        }
+    }
+
+    function bentoDeposit(
+        bytes memory _data,
+        uint256 _value1,
+        uint256 _value2
+    ) internal returns (uint256, uint256) {
+        (IERC20 token, address to, int256 amount, int256 share) =
+            abi.decode(_data, (IERC20, address, int256, int256));
+        return
+            bentoBox.deposit(
+                token,
+                msg.sender,
+                to,
+                num(amount, _value1, _value2),
+                num(share, _value1, _value2)
+            );
+    }
+
+    function bentoWithdraw(
+        bytes memory _data,
+        uint256 _value1,
+        uint256 _value2
+    ) internal returns (uint256, uint256) {
+        (IERC20 token, address to, int256 amount, int256 share) =
+            abi.decode(_data, (IERC20, address, int256, int256));
+        return
+            bentoBox.withdraw(
+                token,
+                msg.sender,
+                to,
+                num(amount, _value1, _value2),
+                num(share, _value1, _value2)
+            );
+    }
+
+    function bentoTransfer(
+        bytes memory _data,
+        uint256 _value1,
+        uint256 _value2
+    ) internal {
+        (IERC20 token, address to, int256 share) =
+            abi.decode(_data, (IERC20, address, int256));
+        bentoBox.transfer(token, msg.sender, to, num(share, _value1, _value2));
+    }
+
+    function num(
+        int256 _inNum,
+        uint256 _value1,
+        uint256 _value2
+    ) internal pure returns (uint256 outNum) {
+        if (_inNum >= 0) {
+            outNum = uint256(_inNum);
+        } else if (_inNum == USE_VALUE1) {
+            outNum = _value1;
+        } else if (_inNum == USE_VALUE2) {
+            outNum = _value2;
+        } else {
+            revert("KashiPair: Num out of bounds");
+        }
+    }
+
+    function _addTokens(
+        IERC20 _token,
+        uint256 _share,
+        uint256 _total,
+        bool _skim
+    ) internal {
+        if (_skim) {
+            require(
+                _share <= bentoBox.balanceOf(_token, address(this)).sub(_total),
+                "KashiPair: Skim too much"
+            );
+        } else {
+            bentoBox.transfer(_token, msg.sender, address(this), _share);
+        }
+    }
+
+    function _addAsset(
+        address _to,
+        bool _skim,
+        uint256 _share
+    ) internal returns (uint256 fraction) {
+        Rebase memory _totalAsset = totalAsset;
+        uint256 totalAssetShare = _totalAsset.elastic;
+        uint256 allShare =
+            _totalAsset.elastic +
+                bentoBox.toShare(asset, totalBorrow.elastic, true);
+        fraction = allShare == 0
+            ? _share
+            : _share.mul(_totalAsset.base) / allShare;
+        if (_totalAsset.base.add(fraction.to128()) < 1000) {
+            return 0;
+        }
+        totalAsset = _totalAsset.add(_share, fraction);
+        balanceOf[_to] = balanceOf[_to].add(fraction);
+        emit Transfer(address(0), _to, fraction);
+        _addTokens(asset, _share, totalAssetShare, _skim);
+        emit LogAddAsset(
+            _skim ? address(bentoBox) : msg.sender,
+            _to,
+            _share,
+            fraction
+        );
+    }
+
+    function _removeAsset(address _to, uint256 _fraction)
+        internal
+        returns (uint256 share)
+    {
+        Rebase memory _totalAsset = totalAsset;
+        uint256 allShare =
+            _totalAsset.elastic +
+                bentoBox.toShare(asset, totalBorrow.elastic, true);
+        share = _fraction.mul(allShare) / _totalAsset.base;
+        balanceOf[msg.sender] = balanceOf[msg.sender].sub(_fraction);
+        emit Transfer(msg.sender, address(0), _fraction);
+        _totalAsset.elastic = _totalAsset.elastic.sub(share.to128());
+        _totalAsset.base = _totalAsset.base.sub(_fraction.to128());
+        require(_totalAsset.base >= 1000, "Kashi: below minimum");
+        totalAsset = _totalAsset;
+        emit LogRemoveAsset(msg.sender, _to, share, _fraction);
+        bentoBox.transfer(asset, address(this), _to, share);
+    }
+
+    function _borrow(address _to, uint256 _amount)
+        internal
+        returns (uint256 part, uint256 share)
+    {
+        uint256 feeAmount =
+            _amount.mul(BORROW_OPENING_FEE) / BORROW_OPENING_FEE_PRECISION; // A flat % fee is charged for any borrow
+
+        (totalBorrow, part) = totalBorrow.add(_amount.add(feeAmount), true);
+        userBorrowPart[msg.sender] = userBorrowPart[msg.sender].add(part);
+        emit LogBorrow(msg.sender, _to, _amount, feeAmount, part);
+
+        share = bentoBox.toShare(asset, _amount, false);
+        Rebase memory _totalAsset = totalAsset;
+        require(_totalAsset.base >= 1000, "Kashi: below minimum");
+        _totalAsset.elastic = _totalAsset.elastic.sub(share.to128());
+        totalAsset = _totalAsset;
+        bentoBox.transfer(asset, address(this), _to, share);
+    }
+
+    function _repay(
+        address _to,
+        bool _skim,
+        uint256 _part
+    ) internal returns (uint256 amount) {
+        (totalBorrow, amount) = totalBorrow.sub(_part, true);
+        userBorrowPart[_to] = userBorrowPart[_to].sub(_part);
+
+        uint256 share = bentoBox.toShare(asset, amount, true);
+        uint128 totalShare = totalAsset.elastic;
+        _addTokens(asset, share, uint256(totalShare), _skim);
+        totalAsset.elastic = totalShare.add(share.to128());
+        emit LogRepay(
+            _skim ? address(bentoBox) : msg.sender,
+            _to,
+            amount,
+            _part
+        );
+    }
+}
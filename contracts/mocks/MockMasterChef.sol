@@ -0,0 +1,174 @@
+// SPDX-License-Identifier: AGPL-3.0
+
+pragma solidity 0.6.12;
+
+import {
+    SafeERC20,
+    SafeMath,
+    IERC20
+} from "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+
+import {MockERC20} from "./MockERC20.sol";
+
+// MasterChef reward accounting (no bonus multiplier, no migrator). SUSHI is
+// minted on demand. Set up through initialize so it can be etched at the
+// masterChef address; pid 0 is reserved as the strategy treats it as "no pid"
+contract MockMasterChef {
+    using SafeERC20 for IERC20;
+    using SafeMath for uint256;
+
+    struct UserInfo {
+        uint256 amount;
+        uint256 rewardDebt;
+    }
+
+    struct PoolInfo {
+        IERC20 lpToken;
+        uint256 allocPoint;
+        uint256 lastRewardBlock;
+        uint256 accSushiPerShare; // times 1e12
+    }
+
+    MockERC20 public sushi;
+    uint256 public sushiPerBlock;
+    uint256 public totalAllocPoint;
+
+    PoolInfo[] public poolInfo;
+    mapping(uint256 => mapping(address => UserInfo)) public userInfo;
+
+    event Deposit(address indexed user, uint256 indexed pid, uint256 amount);
+    event Withdraw(address indexed user, uint256 indexed pid, uint256 amount);
+    event EmergencyWithdraw(
+        address indexed user,
+        uint256 indexed pid,
+        uint256 amount
+    );
+
+    function initialize(MockERC20 _sushi, uint256 _sushiPerBlock) external {
+        require(address(sushi) == address(0)); // Check if previously initialized
+
+        sushi = _sushi;
+        sushiPerBlock = _sushiPerBlock;
+
+        // Placeholder so that real pools start at pid 1
+        poolInfo.push(PoolInfo(IERC20(address(0)), 0, block.number, 0));
+    }
+
+    function poolLength() external view returns (uint256) {
+        return poolInfo.length;
+    }
+
+    function add(uint256 _allocPoint, IERC20 _lpToken)
+        external
+        returns (uint256 pid)
+    {
+        massUpdatePools();
+        totalAllocPoint = totalAllocPoint.add(_allocPoint);
+        poolInfo.push(PoolInfo(_lpToken, _allocPoint, block.number, 0));
+        pid = poolInfo.length - 1;
+    }
+
+    function pendingSushi(uint256 _pid, address _user)
+        external
+        view
+        returns (uint256)
+    {
+        PoolInfo storage pool = poolInfo[_pid];
+        UserInfo storage user = userInfo[_pid][_user];
+        uint256 accSushiPerShare = pool.accSushiPerShare;
+        uint256 lpSupply = pool.lpToken.balanceOf(address(this));
+        if (block.number > pool.lastRewardBlock && lpSupply != 0) {
+            accSushiPerShare = accSushiPerShare.add(
+                poolReward(pool).mul(1e12).div(lpSupply)
+            );
+        }
+        return user.amount.mul(accSushiPerShare).div(1e12).sub(user.rewardDebt);
+    }
+
+    function massUpdatePools() public {
+        for (uint256 pid = 1; pid < poolInfo.length; pid++) {
+            updatePool(pid);
+        }
+    }
+
+    function updatePool(uint256 _pid) public {
+        PoolInfo storage pool = poolInfo[_pid];
+        if (block.number <= pool.lastRewardBlock) {
+            return;
+        }
+        uint256 lpSupply = pool.lpToken.balanceOf(address(this));
+        if (lpSupply == 0) {
+            pool.lastRewardBlock = block.number;
+            return;
+        }
+        uint256 sushiReward = poolReward(pool);
+        sushi.mint(address(this), sushiReward);
+        pool.accSushiPerShare = pool.accSushiPerShare.add(
+            sushiReward.mul(1e12).div(lpSupply)
+        );
+        pool.lastRewardBlock = block.number;
+    }
+
+    function deposit(uint256 _pid, uint256 _amount) external {
+        PoolInfo storage pool = poolInfo[_pid];
+        UserInfo storage user = userInfo[_pid][msg.sender];
+        updatePool(_pid);
+        if (user.amount > 0) {
+            uint256 pending =
+                user.amount.mul(pool.accSushiPerShare).div(1e12).sub(
+                    user.rewardDebt
+                );
+            safeSushiTransfer(msg.sender, pending);
+        }
+        pool.lpToken.safeTransferFrom(msg.sender, address(this), _amount);
+        user.amount = user.amount.add(_amount);
+        user.rewardDebt = user.amount.mul(pool.accSushiPerShare).div(1e12);
+        emit Deposit(msg.sender, _pid, _amount);
+    }
+
+    function withdraw(uint256 _pid, uint256 _amount) external {
+        PoolInfo storage pool = poolInfo[_pid];
+        UserInfo storage user = userInfo[_pid][msg.sender];
+        require(user.amount >= _amount, "withdraw: not good");
+        updatePool(_pid);
+        uint256 pending =
+            user.amount.mul(pool.accSushiPerShare).div(1e12).sub(
+                user.rewardDebt
+            );
+        safeSushiTransfer(msg.sender, pending);
+        user.amount = user.amount.sub(_amount);
+        user.rewardDebt = user.amount.mul(pool.accSushiPerShare).div(1e12);
+        pool.lpToken.safeTransfer(msg.sender, _amount);
+        emit Withdraw(msg.sender, _pid, _amount);
+    }
+
+    function emergencyWithdraw(uint256 _pid) external {
+        PoolInfo storage pool = poolInfo[_pid];
+        UserInfo storage user = userInfo[_pid][msg.sender];
+        uint256 amount = user.amount;
+        user.amount = 0;
+        user.rewardDebt = 0;
+        pool.lpToken.safeTransfer(msg.sender, amount);
+        emit EmergencyWithdraw(msg.sender, _pid, amount);
+    }
+
+    function poolReward(PoolInfo storage _pool)
+        internal
+        view
+        returns (uint256)
+    {
+        if (totalAllocPoint == 0) return 0;
+        return
+            block
+                .number
+                .sub(_pool.lastRewardBlock)
+                .mul(sushiPerBlock)
+                .mul(_pool.allocPoint)
+                .div(totalAllocPoint);
+    }
+
+    function safeSushiTransfer(address _to, uint256 _amount) internal {
+        uint256 sushiBal = sushi.balanceOf(address(this));
+        sushi.transfer(_to, _amount > sushiBal ? sushiBal : _amount);
+    }
+}
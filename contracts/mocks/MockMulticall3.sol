@@ -0,0 +1,40 @@
+// SPDX-License-Identifier: AGPL-3.0
+
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+// Multicall3.aggregate3, etched at the address Multicall3 has on every chain
+// so that scripts batch their reads the same way against the mocks
+contract MockMulticall3 {
+    struct Call3 {
+        address target;
+        bool allowFailure;
+        bytes callData;
+    }
+
+    struct Result {
+        bool success;
+        bytes returnData;
+    }
+
+    function aggregate3(Call3[] memory calls)
+        public
+        payable
+        returns (Result[] memory returnData)
+    {
+        returnData = new Result[](calls.length);
+        for (uint256 i = 0; i < calls.length; i++) {
+            (bool success, bytes memory ret) =
+                calls[i].target.call(calls[i].callData);
+            require(
+                success || calls[i].allowFailure,
+                "Multicall3: call failed"
+            );
+            returnData[i] = Result(success, ret);
+        }
+    }
+
+    function getBlockNumber() external view returns (uint256) {
+        return block.number;
+    }
+}
@@ -0,0 +1,64 @@
+// SPDX-License-Identifier: AGPL-3.0
+
+pragma solidity 0.6.12;
+
+// UniswapV2Pair price accumulators over the reserves of a MockUniswapV2Router,
+// which creates one per token pair and updates it whenever they change
+contract MockUniswapV2Pair {
+    address public immutable factory;
+    address public immutable token0;
+    address public immutable token1;
+
+    uint112 private reserve0;
+    uint112 private reserve1;
+    uint32 private blockTimestampLast;
+
+    uint256 public price0CumulativeLast;
+    uint256 public price1CumulativeLast;
+
+    event Sync(uint112 reserve0, uint112 reserve1);
+
+    constructor(address _tokenA, address _tokenB) public {
+        factory = msg.sender;
+        token0 = _tokenA < _tokenB ? _tokenA : _tokenB;
+        token1 = _tokenA < _tokenB ? _tokenB : _tokenA;
+    }
+
+    function getReserves()
+        public
+        view
+        returns (
+            uint112 _reserve0,
+            uint112 _reserve1,
+            uint32 _blockTimestampLast
+        )
+    {
+        _reserve0 = reserve0;
+        _reserve1 = reserve1;
+        _blockTimestampLast = blockTimestampLast;
+    }
+
+    // Same as UniswapV2Pair._update, prices accumulate at the old reserves
+    function update(uint256 _balance0, uint256 _balance1) external {
+        require(msg.sender == factory, "UniswapV2: FORBIDDEN");
+        require(
+            _balance0 <= uint112(-1) && _balance1 <= uint112(-1),
+            "UniswapV2: OVERFLOW"
+        );
+        uint32 blockTimestamp = uint32(block.timestamp % 2**32);
+        uint32 timeElapsed = blockTimestamp - blockTimestampLast; // overflow is desired
+        if (timeElapsed > 0 && reserve0 != 0 && reserve1 != 0) {
+            // * never overflows, and + overflow is desired
+            price0CumulativeLast +=
+                ((uint256(reserve1) << 112) / reserve0) *
+                timeElapsed;
+            price1CumulativeLast +=
+                ((uint256(reserve0) << 112) / reserve1) *
+                timeElapsed;
+        }
+        reserve0 = uint112(_balance0);
+        reserve1 = uint112(_balance1);
+        blockTimestampLast = blockTimestamp;
+        emit Sync(reserve0, reserve1);
+    }
+}
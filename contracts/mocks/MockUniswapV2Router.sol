@@ -0,0 +1,123 @@
+// SPDX-License-Identifier: AGPL-3.0
+
+pragma solidity 0.6.12;
+
+import {
+    SafeERC20,
+    SafeMath,
+    IERC20
+} from "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+
+import {MockERC20} from "./MockERC20.sol";
+import {MockUniswapV2Pair} from "./MockUniswapV2Pair.sol";
+
+// UniswapV2Router02 swap pricing over virtual reserves set with setReserves.
+// Swaps take the input token and mint the output token. Set up without a
+// constructor so it can be etched at the sushiRouter address. It is also its
+// own factory, with a MockUniswapV2Pair per pool for the price accumulators
+contract MockUniswapV2Router {
+    using SafeERC20 for IERC20;
+    using SafeMath for uint256;
+
+    // reserves[tokenA][tokenB] is the amount of tokenA in the tokenA/tokenB pool
+    mapping(address => mapping(address => uint256)) public reserves;
+
+    mapping(address => mapping(address => address)) public getPair;
+
+    function factory() external view returns (address) {
+        return address(this);
+    }
+
+    function setReserves(
+        address _tokenA,
+        address _tokenB,
+        uint256 _reserveA,
+        uint256 _reserveB
+    ) external {
+        reserves[_tokenA][_tokenB] = _reserveA;
+        reserves[_tokenB][_tokenA] = _reserveB;
+        sync(_tokenA, _tokenB);
+    }
+
+    function getReserves(address _tokenA, address _tokenB)
+        external
+        view
+        returns (uint256 reserveA, uint256 reserveB)
+    {
+        reserveA = reserves[_tokenA][_tokenB];
+        reserveB = reserves[_tokenB][_tokenA];
+    }
+
+    function getAmountOut(
+        uint256 _amountIn,
+        uint256 _reserveIn,
+        uint256 _reserveOut
+    ) public pure returns (uint256) {
+        require(_amountIn > 0, "UniswapV2Library: INSUFFICIENT_INPUT_AMOUNT");
+        require(
+            _reserveIn > 0 && _reserveOut > 0,
+            "UniswapV2Library: INSUFFICIENT_LIQUIDITY"
+        );
+        uint256 amountInWithFee = _amountIn.mul(997);
+        uint256 numerator = amountInWithFee.mul(_reserveOut);
+        uint256 denominator = _reserveIn.mul(1000).add(amountInWithFee);
+        return numerator / denominator;
+    }
+
+    function getAmountsOut(uint256 _amountIn, address[] memory _path)
+        public
+        view
+        returns (uint256[] memory amounts)
+    {
+        require(_path.length >= 2, "UniswapV2Library: INVALID_PATH");
+        amounts = new uint256[](_path.length);
+        amounts[0] = _amountIn;
+        for (uint256 i = 0; i < _path.length - 1; i++) {
+            amounts[i + 1] = getAmountOut(
+                amounts[i],
+                reserves[_path[i]][_path[i + 1]],
+                reserves[_path[i + 1]][_path[i]]
+            );
+        }
+    }
+
+    function swapExactTokensForTokens(
+        uint256 _amountIn,
+        uint256 _amountOutMin,
+        address[] calldata _path,
+        address _to,
+        uint256 _deadline
+    ) external returns (uint256[] memory amounts) {
+        require(_deadline >= block.timestamp, "UniswapV2Router: EXPIRED");
+        amounts = getAmountsOut(_amountIn, _path);
+        uint256 last = _path.length - 1;
+        require(
+            amounts[last] >= _amountOutMin,
+            "UniswapV2Router: INSUFFICIENT_OUTPUT_AMOUNT"
+        );
+
+        IERC20(_path[0]).safeTransferFrom(msg.sender, address(this), _amountIn);
+        for (uint256 i = 0; i < last; i++) {
+            address input = _path[i];
+            address output = _path[i + 1];
+            reserves[input][output] = reserves[input][output].add(amounts[i]);
+            reserves[output][input] = reserves[output][input].sub(
+                amounts[i + 1]
+            );
+            sync(input, output);
+        }
+        MockERC20(_path[last]).mint(_to, amounts[last]);
+    }
+
+    function sync(address _tokenA, address _tokenB) internal {
+        MockUniswapV2Pair pair = MockUniswapV2Pair(getPair[_tokenA][_tokenB]);
+        if (address(pair) == address(0)) {
+            pair = new MockUniswapV2Pair(_tokenA, _tokenB);
+            getPair[_tokenA][_tokenB] = address(pair);
+            getPair[_tokenB][_tokenA] = address(pair);
+        }
+        address token0 = pair.token0();
+        address token1 = pair.token1();
+        pair.update(reserves[token0][token1], reserves[token1][token0]);
+    }
+}
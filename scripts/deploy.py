@@ -1,58 +1,316 @@
+"""
+Deploys strategies from a YAML manifest, one original and any number of clones.
+
+    # deploy.yml
+    account: deployer  # a keystore id, or the index of an unlocked account
+    bento_box: "0xF5BCE5077908a1b7370B9ae04AdC565EBd643966"
+    strategies:
+      - name: StrategyKashiLenderDAI
+        vault: "0x..."
+        pairs:
+          - {kashi_pair: "0x...", pid: 190}
+      - name: ...
+
+The first strategy is deployed as the original and the others are cloned
+from it with cloneKashiLender, or all of them are cloned from an `original`
+already deployed. `strategist`, `rewards` and `keeper` default to the account,
+for all strategies or for one. `gas_price` and `publish_source` are passed on
+to brownie.
+
+Nothing is sent before the manifest checks out against the chain: vaults,
+their API version and token, and every pair's asset, bentoBox and masterChef
+pid, all read in one Multicall3 batch. Clones go out back to back, brownie
+counts the nonces of unconfirmed transactions, and are then waited for
+together. Every transaction is recorded in a state file next to the manifest
+as soon as it is sent, so a run that stopped halfway picks up where it was and
+does not deploy twice.
+
+    brownie run deploy --network mainnet          # deploy.yml
+    python -m scripts.deploy deploy.yml --network mainnet
+
+A keystore password is read from DEPLOYER_PASSWORD, brownie prompts for it
+otherwise.
+"""
+import json
+import os
+from dataclasses import dataclass
 from pathlib import Path
 
-from brownie import Strategy, accounts, config, network, project, web3
-from eth_utils import is_checksum_address
+from brownie import accounts, config, network, project, web3
+from eth_utils import event_signature_to_log_topic, to_checksum_address
 import click
+import yaml
+from web3.exceptions import TransactionNotFound
+
+from scripts.multicall import Call, aggregate, function
+from scripts.reader import ASSET, BENTO_BOX, MASTER_CHEF
+
+MANIFEST = "deploy.yml"
 
 API_VERSION = config["dependencies"][0].split("@")[-1]
-Vault = project.load(
-    Path.home() / ".brownie" / "packages" / config["dependencies"][0]
-).Vault
+
+# Strategy.sol
+MAX_PAIRS = 5
+
+# Clone transactions in flight at once
+PENDING_TRANSACTIONS = 20
+
+VAULT_API_VERSION = function("apiVersion()", "string")
+VAULT_TOKEN = function("token()", "address")
+POOL_INFO = function("poolInfo(uint256)", "address", "uint256", "uint256", "uint256")
+
+CLONED = "0x" + event_signature_to_log_topic("Cloned(address)").hex()
 
 
-def get_address(msg: str, default: str = None) -> str:
-    val = click.prompt(msg, default=default)
+@dataclass(frozen=True)
+class Spec:
+    """One strategy of the manifest"""
 
-    # Keep asking user for click.prompt until it passes
-    while True:
+    name: str
+    vault: str
+    kashi_pairs: tuple
+    pids: tuple
+    strategist: str
+    rewards: str
+    keeper: str
 
-        if is_checksum_address(val):
-            return val
-        elif addr := web3.ens.address(val):
-            click.echo(f"Found ENS '{val}' [{addr}]")
-            return addr
+    @property
+    def key(self):
+        # What the state file knows the strategy by
+        return f"{self.vault}:{self.name}"
 
-        click.echo(
-            f"I'm sorry, but '{val}' is not a checksummed address or valid ENS record"
+
+ROLES = ("strategist", "rewards", "keeper")
+
+
+def load_specs(manifest, account):
+    defaults = {role: manifest.get(role, account) for role in ROLES}
+    specs = []
+    for strategy in manifest["strategies"]:
+        roles = {role: strategy.get(role, defaults[role]) for role in ROLES}
+        specs.append(
+            Spec(
+                name=strategy.get("name", ""),
+                vault=to_checksum_address(strategy["vault"]),
+                kashi_pairs=tuple(
+                    to_checksum_address(pair["kashi_pair"])
+                    for pair in strategy["pairs"]
+                ),
+                pids=tuple(int(pair.get("pid", 0)) for pair in strategy["pairs"]),
+                **{role: to_checksum_address(str(a)) for role, a in roles.items()},
+            )
         )
-        # NOTE: Only display default once
-        val = click.prompt(msg)
+    return specs
 
 
-def main():
-    print(f"You are using the '{network.show_active()}' network")
-    dev = accounts.load(click.prompt("Account", type=click.Choice(accounts.load())))
-    print(f"You are using: 'dev' [{dev.address}]")
+def validate(web3, bento_box, specs):
+    """Everything wrong with specs on chain, in one batch of reads"""
+    problems = []
+    keys = [spec.key for spec in specs]
+    for spec in specs:
+        if keys.count(spec.key) > 1:
+            problems.append(f"{spec.key} is in the manifest twice")
+        if len(spec.kashi_pairs) > MAX_PAIRS:
+            problems.append(f"{spec.key} has more than {MAX_PAIRS} pairs")
+        if len(set(spec.kashi_pairs)) < len(spec.kashi_pairs):
+            problems.append(f"{spec.key} has a pair twice")
+
+    vaults = list(dict.fromkeys(spec.vault for spec in specs))
+    pairs = list(dict.fromkeys(p for spec in specs for p in spec.kashi_pairs))
+    pids = list(dict.fromkeys(p for spec in specs for p in spec.pids if p != 0))
+    calls = (
+        [Call(vault, VAULT_TOKEN) for vault in vaults]
+        + [Call(vault, VAULT_API_VERSION) for vault in vaults]
+        + [Call(pair, ASSET) for pair in pairs]
+        + [Call(pair, BENTO_BOX) for pair in pairs]
+        + [Call(MASTER_CHEF, POOL_INFO, (pid,)) for pid in pids]
+    )
+    results = iter(aggregate(web3, calls))
+    tokens = {vault: next(results) for vault in vaults}
+    api_versions = {vault: next(results) for vault in vaults}
+    assets = {pair: next(results) for pair in pairs}
+    bento_boxes = {pair: next(results) for pair in pairs}
+    lp_tokens = {pid: (next(results) or [None])[0] for pid in pids}
+
+    for vault in vaults:
+        if tokens[vault] is None:
+            problems.append(f"{vault} is not a vault")
+        elif api_versions[vault] != API_VERSION:
+            problems.append(f"{vault} is a {api_versions[vault]} vault")
+    for pair in pairs:
+        if bento_boxes[pair] != bento_box:
+            problems.append(f"{pair} is not a Kashi pair of {bento_box}")
+    for spec in specs:
+        for pair, pid in zip(spec.kashi_pairs, spec.pids):
+            token = tokens[spec.vault]
+            if token is not None and assets[pair] not in (None, token):
+                problems.append(f"{pair} does not lend the token of {spec.vault}")
+            if pid != 0 and lp_tokens[pid] != pair:
+                problems.append(f"masterChef pool {pid} is not {pair}")
+    return problems
+
+
+def load_strategy():
+    # The Strategy of the loaded project, brownie run has it loaded already
+    projects = project.get_loaded_projects()
+    if not projects:
+        projects = [project.load(Path(__file__).parents[1])]
+    return projects[0].Strategy
+
+
+def load_account(manifest):
+    account = manifest["account"]
+    if isinstance(account, int):
+        return accounts[account]
+    return accounts.load(account, password=os.environ.get("DEPLOYER_PASSWORD"))
 
-    if input("Is there a Vault for this strategy already? y/[N]: ").lower() == "y":
-        vault = Vault.at(get_address("Deployed Vault: "))
-        assert vault.apiVersion() == API_VERSION
-    else:
-        print("You should deploy one vault using scripts from Vault project")
-        return  # TODO: Deploy one using scripts from Vault project
 
-    print(
-        f"""
-    Strategy Parameters
+class State:
+    """Transactions and addresses of a run, saved on every change"""
 
-       api: {API_VERSION}
-     token: {vault.token()}
-      name: '{vault.name()}'
-    symbol: '{vault.symbol()}'
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+        if self.path.exists():
+            self.entries = json.loads(self.path.read_text())
+
+    def __getitem__(self, key):
+        return self.entries.setdefault(key, {})
+
+    def save(self):
+        # Replaced at once, a run killed while writing leaves the last state
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.entries, indent=2, sort_keys=True))
+        tmp.replace(self.path)
+
+
+def confirm(entry, original=None):
+    """Waits for the transaction of entry and records the address it created
+
+    A transaction that reverted is forgotten, the next run sends it again.
     """
-    )
-    publish_source = click.confirm("Verify source on etherscan?")
-    if input("Deploy Strategy? y/[N]: ").lower() != "y":
-        return
+    receipt = web3.eth.wait_for_transaction_receipt(entry["tx"], timeout=600)
+    if receipt["status"] == 0:
+        del entry["tx"]
+        return False
+    if original is None:
+        entry["address"] = receipt["contractAddress"]
+        return True
+    for log in receipt["logs"]:
+        if log["address"] == original and log["topics"][0].hex() == CLONED:
+            entry["address"] = to_checksum_address(log["topics"][1][-20:])
+            return True
+    return False
+
+
+def pending(entry):
+    # Sent but not confirmed yet. A transaction of an earlier run that is
+    # neither mined nor pending any more was dropped and is forgotten.
+    if "tx" not in entry or "address" in entry:
+        return False
+    try:
+        web3.eth.get_transaction(entry["tx"])
+    except TransactionNotFound:
+        del entry["tx"]
+        return False
+    return True
+
+
+def deploy(manifest_path):
+    """Deploys what is missing of the manifest, returns the addresses by key"""
+    manifest_path = Path(manifest_path)
+    manifest = yaml.safe_load(manifest_path.read_text())
+    dev = load_account(manifest)
+    specs = load_specs(manifest, dev.address)
+    bento_box = to_checksum_address(manifest["bento_box"])
+    state = State(manifest.get("state", manifest_path.with_suffix(".state.json")))
+    tx_params = {"from": dev, "required_confs": 0}
+    if "gas_price" in manifest:
+        tx_params["gas_price"] = manifest["gas_price"]
+
+    print(f"{len(specs)} strategies on '{network.show_active()}' as {dev.address}")
+    problems = validate(web3, bento_box, specs)
+    if problems:
+        raise ValueError("\n".join(["Manifest does not match the chain:"] + problems))
+
+    Strategy = load_strategy()
+    if "original" in manifest:
+        original, clones = to_checksum_address(manifest["original"]), specs
+    else:
+        original, clones = None, specs[1:]
+        entry = state[specs[0].key]
+        if pending(entry):
+            confirm(entry)
+        if "address" not in entry:
+            spec = specs[0]
+            tx = Strategy.deploy(
+                spec.vault,
+                bento_box,
+                spec.kashi_pairs,
+                spec.pids,
+                spec.name,
+                tx_params,
+            )
+            entry["tx"] = tx.txid
+            state.save()
+            if not confirm(entry):
+                state.save()
+                raise RuntimeError(f"{spec.key}: {tx.txid} reverted")
+            if manifest.get("publish_source", False):
+                Strategy.publish_source(Strategy.at(entry["address"]))
+        state.save()
+        original = entry["address"]
+        print(f"{specs[0].key}: original {original}")
+
+    # Transactions of an earlier run first, brownie would reuse their nonces
+    for spec in clones:
+        if pending(state[spec.key]):
+            confirm(state[spec.key], original)
+    state.save()
+
+    original = Strategy.at(original)
+    missing = [spec for spec in clones if "address" not in state[spec.key]]
+    for i in range(0, len(missing), PENDING_TRANSACTIONS):
+        batch = missing[i : i + PENDING_TRANSACTIONS]
+        # Sent back to back, then waited for together
+        for spec in batch:
+            tx = original.cloneKashiLender(
+                spec.vault,
+                spec.strategist,
+                spec.rewards,
+                spec.keeper,
+                bento_box,
+                spec.kashi_pairs,
+                spec.pids,
+                spec.name,
+                tx_params,
+            )
+            state[spec.key]["tx"] = tx.txid
+            state.save()
+        failed = [
+            spec.key for spec in batch if not confirm(state[spec.key], original.address)
+        ]
+        state.save()
+        if failed:
+            raise RuntimeError(f"Cloning {', '.join(failed)} failed, run again")
+        for spec in batch:
+            print(f"{spec.key}: clone {state[spec.key]['address']}")
+
+    return {spec.key: state[spec.key]["address"] for spec in specs}
+
+
+def main(manifest=MANIFEST):
+    deploy(manifest)
+
+
+@click.command()
+@click.argument("manifest", type=click.Path(exists=True), default=MANIFEST)
+@click.option("--network", "network_name", default="mainnet")
+def cli(manifest, network_name):
+    load_strategy()
+    network.connect(network_name)
+    deploy(manifest)
+
 
-    strategy = Strategy.deploy(vault, {"from": dev}, publish_source=publish_source)
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,552 @@
+"""
+Incremental index of the strategies' and their vaults' events, in SQLite.
+
+Tracked strategies have their Harvested, Cloned, KashiPairDeposit,
+KashiPairWithdrawal and KashiPairsHarvested events indexed, and their vaults
+all StrategyReported events. Every contract keeps a checkpoint, the
+last block it is indexed up to, so an update only asks for the blocks after
+it. The eth_getLogs of all contracts go out together in one JSON-RPC batch,
+range by range, and each range's rows and checkpoints are written in one
+transaction. Clones found in Cloned events are tracked from the block they
+were created in, their vaults with them.
+
+    brownie run indexer --network mainnet
+
+prompts for a file with one strategy address per line, like the keeper. From
+a console, run("indexer", args=(strategy, ...)) takes them directly. Reports
+are read back from the database with an Index:
+
+    index = Index("reports.sqlite")
+    index.apr(strategy)
+"""
+import asyncio
+import json
+import sqlite3
+from dataclasses import dataclass
+
+from brownie import web3
+from eth_abi import decode_abi
+from eth_utils import event_signature_to_log_topic, to_checksum_address
+import click
+
+from scripts.multicall import Call, Rpc, aggregate_async, function
+
+DB = "reports.sqlite"
+
+# eth_getLogs limits of common providers
+BLOCKS_PER_REQUEST = 10_000
+ADDRESSES_PER_REQUEST = 100
+
+YEAR = 365 * 24 * 3600
+
+VAULT = function("vault()", "address")
+
+
+class Event:
+    """An event and the table its logs go to, a column per parameter"""
+
+    def __init__(self, name, table, *params):
+        # params are (column, type, indexed)
+        self.name = name
+        self.table = table
+        self.params = params
+        self.topic = "0x" + (
+            event_signature_to_log_topic(
+                f"{name}({','.join(type_ for _, type_, _ in params)})"
+            ).hex()
+        )
+        self.columns = ["address", "block", "log_index", "tx"] + [
+            column for column, _, _ in params
+        ]
+
+    def decode(self, log):
+        indexed = [p for p in self.params if p[2]]
+        data = [p for p in self.params if not p[2]]
+        values = dict(
+            zip(
+                [column for column, _, _ in data],
+                decode_abi([type_ for _, type_, _ in data], hex_bytes(log["data"])),
+            )
+        )
+        for (column, type_, _), topic in zip(indexed, log["topics"][1:]):
+            values[column] = decode_abi([type_], hex_bytes(topic))[0]
+
+        row = {
+            "address": to_checksum_address(log["address"]),
+            "block": int(log["blockNumber"], 16),
+            "log_index": int(log["logIndex"], 16),
+            "tx": log["transactionHash"],
+        }
+        for column, type_, _ in self.params:
+            row[column] = column_value(type_, values[column])
+        return [row[column] for column in self.columns]
+
+    def schema(self):
+        columns = ", ".join(
+            f"{column} {'INTEGER' if column in ('block', 'log_index') else 'TEXT'}"
+            for column in self.columns
+        )
+        return (
+            f"CREATE TABLE IF NOT EXISTS {self.table} "
+            f"({columns}, PRIMARY KEY (block, log_index))"
+        )
+
+
+HARVESTED = Event(
+    "Harvested",
+    "harvests",
+    ("profit", "uint256", False),
+    ("loss", "uint256", False),
+    ("debt_payment", "uint256", False),
+    ("debt_outstanding", "uint256", False),
+)
+CLONED = Event("Cloned", "clones", ("clone", "address", True))
+STRATEGY_REPORTED = Event(
+    "StrategyReported",
+    "reports",
+    ("strategy", "address", True),
+    ("gain", "uint256", False),
+    ("loss", "uint256", False),
+    ("debt_paid", "uint256", False),
+    ("total_gain", "uint256", False),
+    ("total_loss", "uint256", False),
+    ("total_debt", "uint256", False),
+    ("debt_added", "uint256", False),
+    ("debt_ratio", "uint256", False),
+)
+
+KASHI_PAIR_DEPOSIT = Event(
+    "KashiPairDeposit",
+    "pair_deposits",
+    ("kashi_pair", "address", True),
+    ("shares", "uint256", False),
+    ("fraction", "uint256", False),
+    ("fraction_balance", "uint256", False),
+)
+KASHI_PAIR_WITHDRAWAL = Event(
+    "KashiPairWithdrawal",
+    "pair_withdrawals",
+    ("kashi_pair", "address", True),
+    ("shares", "uint256", False),
+    ("fraction", "uint256", False),
+    ("fraction_balance", "uint256", False),
+)
+
+# What each pair held in want as the harvest reported it
+KASHI_PAIRS_HARVESTED = Event(
+    "KashiPairsHarvested",
+    "pair_assets",
+    ("kashi_pairs", "address[]", False),
+    ("kashi_pair_assets", "uint256[]", False),
+    ("total_assets", "uint256", False),
+)
+
+# The events indexed for each kind of contract
+EVENTS = {
+    "strategy": (
+        HARVESTED,
+        CLONED,
+        KASHI_PAIR_DEPOSIT,
+        KASHI_PAIR_WITHDRAWAL,
+        KASHI_PAIRS_HARVESTED,
+    ),
+    "vault": (STRATEGY_REPORTED,),
+}
+
+
+def column_value(type_, value):
+    # uint256 overflows SQLite's integers, it is stored as text, and arrays as
+    # JSON lists of the same
+    if type_.endswith("[]"):
+        return json.dumps([column_value(type_[:-2], v) for v in value])
+    return to_checksum_address(value) if type_ == "address" else str(value)
+
+
+def hex_bytes(value):
+    return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+
+
+def connect(path):
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    # checkpoint is the last block the contract's events are indexed up to
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS contracts "
+        "(address TEXT PRIMARY KEY, kind TEXT, start_block INTEGER, "
+        "checkpoint INTEGER)"
+    )
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS strategies (address TEXT PRIMARY KEY, vault TEXT)"
+    )
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS blocks "
+        "(number INTEGER PRIMARY KEY, timestamp INTEGER)"
+    )
+    for events in EVENTS.values():
+        for event in events:
+            db.execute(event.schema())
+    return db
+
+
+async def deployment_block(rpc, address, head):
+    # Binary search for the first block with code at address, needs archive
+    # state
+    low, high = 0, head
+    while low < high:
+        middle = (low + high) // 2
+        if await rpc.request("eth_getCode", address, hex(middle)) in ("0x", "0x0"):
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class Indexer:
+    def __init__(
+        self,
+        db,
+        rpc,
+        blocks_per_request=BLOCKS_PER_REQUEST,
+        addresses_per_request=ADDRESSES_PER_REQUEST,
+    ):
+        self.db = db
+        self.rpc = rpc
+        self.blocks_per_request = blocks_per_request
+        self.addresses_per_request = addresses_per_request
+
+    async def head(self):
+        return int(await self.rpc.request("eth_blockNumber"), 16)
+
+    async def track(self, strategies, start_block=None):
+        """Indexes strategies (and their vaults) from start_block on
+
+        Without a start block each strategy is indexed from the block it was
+        deployed in.
+        """
+        strategies = [to_checksum_address(strategy) for strategy in strategies]
+        if start_block is None:
+            head = await self.head()
+            starts = await asyncio.gather(
+                *(deployment_block(self.rpc, strategy, head) for strategy in strategies)
+            )
+        else:
+            starts = [start_block] * len(strategies)
+        with self.db:
+            await self.add_strategies(zip(strategies, starts))
+
+    async def add_strategies(self, strategies):
+        # Inside the caller's transaction
+        strategies = [
+            (strategy, start)
+            for strategy, start in strategies
+            if not self.db.execute(
+                "SELECT 1 FROM strategies WHERE address = ?", (strategy,)
+            ).fetchone()
+        ]
+        if not strategies:
+            return
+        vaults = await aggregate_async(
+            self.rpc, [Call(strategy, VAULT) for strategy, _ in strategies]
+        )
+        for (strategy, start), vault in zip(strategies, vaults):
+            if vault is None:
+                raise ValueError(f"{strategy} is not a strategy")
+            self.db.execute("INSERT INTO strategies VALUES (?, ?)", (strategy, vault))
+            self.add_contract(strategy, "strategy", start)
+            self.add_contract(vault, "vault", start)
+
+    def add_contract(self, address, kind, start):
+        row = self.db.execute(
+            "SELECT start_block FROM contracts WHERE address = ?", (address,)
+        ).fetchone()
+        if row is None:
+            self.db.execute(
+                "INSERT INTO contracts VALUES (?, ?, ?, ?)",
+                (address, kind, start, start - 1),
+            )
+        elif start < row[0]:
+            # Indexed again from the earlier start, rows already there are
+            # ignored
+            self.db.execute(
+                "UPDATE contracts SET start_block = ?, "
+                "checkpoint = MIN(checkpoint, ?) WHERE address = ?",
+                (start, start - 1, address),
+            )
+
+    async def update(self, head=None):
+        """Indexes every tracked contract up to head (latest by default)"""
+        if head is None:
+            head = await self.head()
+        while True:
+            requests = self.requests(head)
+            if not requests:
+                return head
+            logs = await self.rpc.batch(
+                [
+                    (
+                        "eth_getLogs",
+                        [
+                            {
+                                "address": addresses,
+                                "topics": [[event.topic for event in EVENTS[kind]]],
+                                "fromBlock": hex(start),
+                                "toBlock": hex(end),
+                            }
+                        ],
+                    )
+                    for kind, start, end, addresses in requests
+                ]
+            )
+            await self.store(requests, logs)
+
+    def requests(self, head):
+        # The next range of every contract behind head, as (kind, start, end,
+        # addresses). Ranges end on multiples of blocks_per_request, so
+        # contracts starting at different blocks soon share requests.
+        requests = []
+        rows = self.db.execute(
+            "SELECT kind, checkpoint, address FROM contracts WHERE checkpoint < ? "
+            "ORDER BY kind, checkpoint",
+            (head,),
+        ).fetchall()
+        groups = {}
+        for kind, checkpoint, address in rows:
+            groups.setdefault((kind, checkpoint), []).append(address)
+        for (kind, checkpoint), addresses in groups.items():
+            start = checkpoint + 1
+            end = min(
+                (start // self.blocks_per_request + 1) * self.blocks_per_request - 1,
+                head,
+            )
+            for i in range(0, len(addresses), self.addresses_per_request):
+                requests.append(
+                    (kind, start, end, addresses[i : i + self.addresses_per_request])
+                )
+        return requests
+
+    async def store(self, requests, logs):
+        events = {event.topic: event for kind in EVENTS.values() for event in kind}
+        rows = {event.table: [] for event in events.values()}
+        for log in (log for request_logs in logs for log in request_logs):
+            if log.get("removed"):
+                continue
+            event = events.get(log["topics"][0])
+            if event is not None:
+                rows[event.table].append((event, event.decode(log)))
+
+        blocks = sorted(
+            {row[1] for table_rows in rows.values() for _, row in table_rows}
+        )
+        timestamps = await self.timestamps(blocks)
+
+        # Rows, checkpoints and new clones all in one transaction, a run
+        # stopped halfway starts over from the last range stored
+        with self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO blocks VALUES (?, ?)", timestamps.items()
+            )
+            for table, table_rows in rows.items():
+                if table_rows:
+                    event = table_rows[0][0]
+                    self.db.executemany(
+                        f"INSERT OR IGNORE INTO {table} VALUES "
+                        f"({', '.join('?' for _ in event.columns)})",
+                        [row for _, row in table_rows],
+                    )
+            for _, _, end, addresses in requests:
+                self.db.executemany(
+                    "UPDATE contracts SET checkpoint = ? WHERE address = ?",
+                    [(end, address) for address in addresses],
+                )
+            await self.add_strategies(
+                (row[CLONED.columns.index("clone")], row[1])
+                for _, row in rows[CLONED.table]
+            )
+
+    async def timestamps(self, blocks):
+        known = {
+            number
+            for (number,) in self.db.execute(
+                f"SELECT number FROM blocks WHERE number IN "
+                f"({', '.join('?' for _ in blocks)})",
+                blocks,
+            )
+        }
+        missing = [block for block in blocks if block not in known]
+        results = await self.rpc.batch(
+            [("eth_getBlockByNumber", [hex(block), False]) for block in missing]
+        )
+        return {
+            block: int(result["timestamp"], 16)
+            for block, result in zip(missing, results)
+        }
+
+
+@dataclass(frozen=True)
+class Harvest:
+    block: int
+    timestamp: int
+    profit: int
+    loss: int
+    debt_payment: int
+    debt_outstanding: int
+
+
+@dataclass(frozen=True)
+class Report:
+    block: int
+    timestamp: int
+    gain: int
+    loss: int
+    debt_paid: int
+    total_debt: int
+    debt_added: int
+    debt_ratio: int
+
+
+@dataclass(frozen=True)
+class PairAssets:
+    block: int
+    timestamp: int
+    # kashiPair -> want, as estimated by the harvest
+    assets: dict
+    total_assets: int
+
+
+class Index:
+    """Queries of an indexed database"""
+
+    def __init__(self, path=DB):
+        self.db = connect(path) if isinstance(path, str) else path
+
+    def strategies(self):
+        # Every tracked strategy, clones included, and its vault
+        return dict(self.db.execute("SELECT address, vault FROM strategies"))
+
+    def clones(self, strategy):
+        return [
+            clone
+            for (clone,) in self.db.execute(
+                "SELECT clone FROM clones WHERE address = ? ORDER BY block, log_index",
+                (to_checksum_address(strategy),),
+            )
+        ]
+
+    def pair_movements(self, strategy):
+        """(block, kashi pair, fraction moved in, or out if negative, fraction
+        balance after) of every deposit and withdrawal, in order"""
+        return [
+            (block, kashi_pair, int(fraction) * sign, int(balance))
+            for block, _, kashi_pair, fraction, balance, sign in self.db.execute(
+                "SELECT block, log_index, kashi_pair, fraction, fraction_balance, 1 "
+                "FROM pair_deposits WHERE address = ? UNION ALL "
+                "SELECT block, log_index, kashi_pair, fraction, fraction_balance, -1 "
+                "FROM pair_withdrawals WHERE address = ? ORDER BY block, log_index",
+                (to_checksum_address(strategy),) * 2,
+            )
+        ]
+
+    def pair_balances(self, strategy):
+        # The strategy's fraction of each pair it ever used, as of the last
+        # block indexed
+        return {
+            kashi_pair: balance
+            for _, kashi_pair, _, balance in self.pair_movements(strategy)
+        }
+
+    def pair_assets(self, strategy):
+        """The assets of each pair and the total at every harvest"""
+        return [
+            PairAssets(
+                block,
+                timestamp,
+                dict(zip(json.loads(pairs), map(int, json.loads(assets)))),
+                int(total_assets),
+            )
+            for block, timestamp, pairs, assets, total_assets in self.db.execute(
+                "SELECT p.block, b.timestamp, kashi_pairs, kashi_pair_assets, "
+                "total_assets FROM pair_assets p JOIN blocks b ON b.number = p.block "
+                "WHERE address = ? ORDER BY p.block, log_index",
+                (to_checksum_address(strategy),),
+            )
+        ]
+
+    def harvests(self, strategy):
+        return [
+            Harvest(block, timestamp, *map(int, values))
+            for block, timestamp, *values in self.db.execute(
+                "SELECT h.block, b.timestamp, profit, loss, debt_payment, "
+                "debt_outstanding FROM harvests h JOIN blocks b ON b.number = h.block "
+                "WHERE address = ? ORDER BY h.block, log_index",
+                (to_checksum_address(strategy),),
+            )
+        ]
+
+    def reports(self, strategy):
+        return [
+            Report(block, timestamp, *map(int, values))
+            for block, timestamp, *values in self.db.execute(
+                "SELECT r.block, b.timestamp, gain, loss, debt_paid, total_debt, "
+                "debt_added, debt_ratio FROM reports r "
+                "JOIN blocks b ON b.number = r.block "
+                "WHERE strategy = ? ORDER BY r.block, log_index",
+                (to_checksum_address(strategy),),
+            )
+        ]
+
+    def profit_and_loss(self, strategy):
+        """(timestamp, profit - loss, cumulative) of every harvest"""
+        series, total = [], 0
+        for harvest in self.harvests(strategy):
+            total += harvest.profit - harvest.loss
+            series.append((harvest.timestamp, harvest.profit - harvest.loss, total))
+        return series
+
+    def debt_payments(self, strategy):
+        """(timestamp, debt paid, debt still outstanding) of every harvest"""
+        return [
+            (harvest.timestamp, harvest.debt_payment, harvest.debt_outstanding)
+            for harvest in self.harvests(strategy)
+        ]
+
+    def apr(self, strategy):
+        """(timestamp, APR) since the previous report, of every report after
+        the first
+
+        The gain net of losses, over the debt the vault had in the strategy
+        between the two reports, annualized.
+        """
+        series = []
+        reports = self.reports(strategy)
+        for previous, report in zip(reports, reports[1:]):
+            elapsed = report.timestamp - previous.timestamp
+            if elapsed == 0 or previous.total_debt == 0:
+                continue
+            apr = (report.gain - report.loss) / previous.total_debt * YEAR / elapsed
+            series.append((report.timestamp, apr))
+        return series
+
+
+def main(*strategies):
+    if not strategies:
+        path = click.prompt("Strategies file", default="strategies.txt")
+        with open(path) as f:
+            strategies = [line.strip() for line in f if line.strip()]
+
+    async def run():
+        async with Rpc(web3.provider.endpoint_uri) as rpc:
+            indexer = Indexer(connect(DB), rpc)
+            await indexer.track(strategies)
+            return await indexer.update()
+
+    head = asyncio.run(run())
+    index = Index(DB)
+    print(f"{DB} indexed up to block {head}")
+    for strategy in index.strategies():
+        pnl = index.profit_and_loss(strategy)
+        apr = index.apr(strategy)
+        print(
+            f"{strategy}: {len(pnl)} harvests, "
+            f"net profit {pnl[-1][2] if pnl else 0}, "
+            f"last APR {f'{apr[-1][1]:.2%}' if apr else '-'}"
+        )
@@ -0,0 +1,308 @@
+"""
+Keeper for any number of strategies, clones included, from one asyncio process.
+
+Every new block it reads all strategies in one Multicall3 batch, pinned to
+that block: harvestTrigger and tendTrigger at the current gas price, and
+strategyState. The triggers weigh what a harvest or tend would realize
+(interest owed, pending SUSHI, idle want at the utilization of the pair it
+would go to) against the gas it costs, strategyState says why. Due
+strategies get a transaction from one of the signers, whose nonces are handed
+out locally so that many go out in the same block. A strategy is left alone
+while its last transaction is pending.
+
+    brownie run keeper --network mainnet
+
+reads the strategies from a file with one address per line. From a console,
+run("keeper", args=(strategy, ...)) takes them directly.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+
+from brownie import Strategy, accounts, web3
+from eth_account import Account
+from eth_utils import to_checksum_address
+import click
+
+from scripts.multicall import Call, Rpc, RpcError, aggregate_async, functions
+
+log = logging.getLogger("keeper")
+
+# Gas priced into the triggers' callCost, roughly a harvest and a tend with
+# every pair in use
+HARVEST_GAS = 1_500_000
+TEND_GAS = 800_000
+
+# Kashi's target utilization band, 1e18 is 100%
+MINIMUM_TARGET_UTILIZATION = 7 * 10 ** 17
+MAXIMUM_TARGET_UTILIZATION = 8 * 10 ** 17
+
+
+@dataclass
+class Reads:
+    """What one block says about a strategy"""
+
+    strategy: str
+    harvest: bool
+    tend: bool
+    state: dict
+
+    def action(self):
+        if self.harvest:
+            return "harvest"
+        if self.tend:
+            return "tend"
+        return None
+
+    def describe(self):
+        pairs = self.state["kashiPairs"]
+        pending_sushi = sum(pair["pendingSushi"] for pair in pairs)
+        off_target = sum(
+            pair["fractionInPair"] + pair["fractionInMasterChef"] > 0
+            and not (
+                MINIMUM_TARGET_UTILIZATION
+                <= pair["utilization"]
+                <= MAXIMUM_TARGET_UTILIZATION
+            )
+            for pair in pairs
+        )
+        return (
+            f"assets {self.state['totalAssets']}, "
+            f"idle {self.state['idleWant'] + self.state['idleSharesInWant']}, "
+            f"pending SUSHI {pending_sushi}, "
+            f"pairs in use off the utilization target {off_target}"
+        )
+
+
+class Signer:
+    """An account sending transactions, with its nonces counted locally"""
+
+    def __init__(self, address, private_key=None):
+        # Without a private key the node signs (unlocked dev accounts)
+        self.address = to_checksum_address(address)
+        self.private_key = private_key
+        self.nonce = None
+        self.lock = None
+
+    async def send(self, rpc, tx):
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        # Held until the node accepted it, so nonces go out in order
+        async with self.lock:
+            if self.nonce is None:
+                self.nonce = int(
+                    await rpc.request(
+                        "eth_getTransactionCount", self.address, "pending"
+                    ),
+                    16,
+                )
+            tx = {**tx, "from": self.address, "nonce": self.nonce}
+            try:
+                tx_hash = await self.submit(rpc, tx)
+            except Exception:
+                # The node may know better, ask again next time
+                self.nonce = None
+                raise
+            self.nonce += 1
+            return tx_hash
+
+    async def submit(self, rpc, tx):
+        if self.private_key is None:
+            return await rpc.request(
+                "eth_sendTransaction",
+                {
+                    k: v if isinstance(v, str) else hex(v)
+                    for k, v in tx.items()
+                    if k != "chainId"
+                },
+            )
+        tx = {k: v for k, v in tx.items() if k != "from"}
+        signed = Account.sign_transaction(tx, self.private_key)
+        return await rpc.request("eth_sendRawTransaction", signed.rawTransaction.hex())
+
+    def reset(self):
+        self.nonce = None
+
+
+@dataclass
+class Job:
+    strategy: str
+    signer: Signer
+    pending: str = None
+    sent_block: int = 0
+    history: list = field(default_factory=list)
+
+
+class Keeper:
+    def __init__(
+        self,
+        rpc,
+        signers,
+        strategies,
+        strategy_abi,
+        harvest_gas=HARVEST_GAS,
+        tend_gas=TEND_GAS,
+        poll_interval=2,
+        pending_blocks=20,
+    ):
+        self.rpc = rpc
+        self.functions = functions(strategy_abi)
+        # Strategies are spread over the signers
+        self.jobs = [
+            Job(to_checksum_address(strategy), signers[i % len(signers)])
+            for i, strategy in enumerate(strategies)
+        ]
+        self.harvest_gas = harvest_gas
+        self.tend_gas = tend_gas
+        self.poll_interval = poll_interval
+        # Transactions not mined after this many blocks are given up on
+        self.pending_blocks = pending_blocks
+        self.chain_id = None
+        self.block = None
+        self.watchers = set()
+
+    async def run(self):
+        while True:
+            try:
+                await self.step()
+            except RpcError as e:
+                log.warning("step failed: %s", e)
+            await asyncio.sleep(self.poll_interval)
+
+    async def step(self):
+        """Handles the latest block once, returns the (job, action) it sent"""
+        if self.chain_id is None:
+            self.chain_id = int(await self.rpc.request("eth_chainId"), 16)
+        block, gas_price = await self.rpc.batch(
+            [("eth_blockNumber", []), ("eth_gasPrice", [])]
+        )
+        block, gas_price = int(block, 16), int(gas_price, 16)
+        if self.block is not None and block <= self.block:
+            return []
+        self.block = block
+
+        self.expire(block)
+        reads = await self.read(block, gas_price)
+
+        due = []
+        for job, strategy_reads in zip(self.jobs, reads):
+            if job.pending is not None or strategy_reads is None:
+                continue
+            action = strategy_reads.action()
+            if action is not None:
+                log.info(
+                    "%s %s at block %d: %s",
+                    action,
+                    job.strategy,
+                    block,
+                    strategy_reads.describe(),
+                )
+                due.append((job, action))
+
+        sent = await asyncio.gather(
+            *(self.send(job, action, gas_price) for job, action in due)
+        )
+        return [
+            (job, action)
+            for (job, action), tx_hash in zip(due, sent)
+            if tx_hash is not None
+        ]
+
+    async def read(self, block, gas_price):
+        """Reads of every strategy at block, None where they failed"""
+        calls = []
+        for job in self.jobs:
+            calls += [
+                Call(
+                    job.strategy,
+                    self.functions["harvestTrigger"],
+                    (self.harvest_gas * gas_price,),
+                ),
+                Call(
+                    job.strategy,
+                    self.functions["tendTrigger"],
+                    (self.tend_gas * gas_price,),
+                ),
+                Call(job.strategy, self.functions["strategyState"]),
+            ]
+        results = await aggregate_async(self.rpc, calls, block)
+
+        reads = []
+        for i, job in enumerate(self.jobs):
+            harvest, tend, state = results[3 * i : 3 * i + 3]
+            if harvest is None or tend is None or state is None:
+                log.warning("cannot read %s at block %d", job.strategy, block)
+                reads.append(None)
+                continue
+            reads.append(Reads(job.strategy, harvest, tend, state))
+        return reads
+
+    async def send(self, job, action, gas_price):
+        tx = {
+            "to": job.strategy,
+            "data": "0x" + self.functions[action].encode().hex(),
+            "value": 0,
+            "gasPrice": gas_price,
+            "chainId": self.chain_id,
+        }
+        try:
+            # Also where a call that would revert is caught
+            gas = await self.rpc.request(
+                "eth_estimateGas",
+                {"from": job.signer.address, "to": tx["to"], "data": tx["data"]},
+            )
+            tx["gas"] = int(gas, 16) * 6 // 5
+            tx_hash = await job.signer.send(self.rpc, tx)
+        except RpcError as e:
+            log.warning("%s %s not sent: %s", action, job.strategy, e)
+            return None
+
+        job.pending = tx_hash
+        job.sent_block = self.block
+        job.history.append((action, tx_hash))
+        watcher = asyncio.ensure_future(self.watch(job, tx_hash))
+        self.watchers.add(watcher)
+        watcher.add_done_callback(self.watchers.discard)
+        return tx_hash
+
+    async def watch(self, job, tx_hash):
+        while job.pending == tx_hash:
+            try:
+                receipt = await self.rpc.request("eth_getTransactionReceipt", tx_hash)
+            except RpcError:
+                receipt = None
+            if receipt is not None:
+                if int(receipt["status"], 16) == 0:
+                    log.warning("%s reverted in %s", job.strategy, tx_hash)
+                job.pending = None
+                return receipt
+            await asyncio.sleep(self.poll_interval)
+
+    async def wait(self):
+        """Until every transaction sent so far is mined or given up on"""
+        while self.watchers:
+            await asyncio.gather(*list(self.watchers))
+
+    def expire(self, block):
+        for job in self.jobs:
+            if job.pending and block - job.sent_block >= self.pending_blocks:
+                log.warning("giving up on %s for %s", job.pending, job.strategy)
+                job.pending = None
+                job.signer.reset()
+
+
+def main(*strategies):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    if not strategies:
+        path = click.prompt("Strategies file", default="strategies.txt")
+        with open(path) as f:
+            strategies = [line.strip() for line in f if line.strip()]
+    dev = accounts.load(click.prompt("Account", type=click.Choice(accounts.load())))
+    print(f"Keeping {len(strategies)} strategies as {dev.address}")
+
+    async def run():
+        async with Rpc(web3.provider.endpoint_uri) as rpc:
+            signer = Signer(dev.address, dev.private_key)
+            await Keeper(rpc, [signer], strategies, Strategy.abi).run()
+
+    asyncio.run(run())
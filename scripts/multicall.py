@@ -0,0 +1,262 @@
+"""
+Batched contract reads through Multicall3's aggregate3.
+
+Any number of calls go out as one eth_call to the Multicall3 contract, so all
+of them see the same block and cost one round trip. Calls are built from
+contract ABIs and their results decoded with eth_abi, without brownie, so the
+same batches work from brownie scripts (`aggregate`, over a web3 instance) and
+from asyncio services (`aggregate_async`, over an `Rpc` client).
+
+Multicall3 lives at the same address on every chain. The offline test suite
+etches contracts/mocks/MockMulticall3.sol there.
+"""
+import asyncio
+import itertools
+from dataclasses import dataclass, field
+
+import aiohttp
+from eth_abi import decode_abi, encode_abi
+from eth_utils import function_signature_to_4byte_selector, to_checksum_address
+
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+# eth_call gas caps (50M on geth) bound the size of a single batch
+CALLS_PER_BATCH = 300
+
+
+def abi_type(param):
+    # The eth_abi type of an ABI input or output, tuples spelled out
+    if not param["type"].startswith("tuple"):
+        return param["type"]
+    components = ",".join(abi_type(component) for component in param["components"])
+    return f"({components}){param['type'][len('tuple'):]}"
+
+
+def normalize(param, value):
+    # Checksummed addresses, and structs as dicts by field name
+    if param["type"].endswith("]"):
+        item = {**param, "type": param["type"][: param["type"].rindex("[")]}
+        return [normalize(item, v) for v in value]
+    if param["type"] == "tuple":
+        return {c["name"]: normalize(c, v) for c, v in zip(param["components"], value)}
+    if param["type"] == "address":
+        return to_checksum_address(value)
+    return value
+
+
+class Function:
+    """One function of a contract ABI"""
+
+    def __init__(self, abi):
+        self.abi = abi
+        self.name = abi["name"]
+        self.input_types = [abi_type(param) for param in abi["inputs"]]
+        self.output_types = [abi_type(param) for param in abi["outputs"]]
+        self.signature = f"{self.name}({','.join(self.input_types)})"
+        self.selector = function_signature_to_4byte_selector(self.signature)
+
+    def __repr__(self):
+        return f"<Function {self.signature}>"
+
+    def encode(self, *args):
+        return self.selector + encode_abi(self.input_types, args)
+
+    def decode(self, data):
+        # A single output is returned as is, several as a list
+        values = decode_abi(self.output_types, bytes(data))
+        values = [normalize(p, v) for p, v in zip(self.abi["outputs"], values)]
+        return values[0] if len(values) == 1 else values
+
+
+def function(signature, *output_types):
+    """A Function from its signature, for contracts without an ABI at hand"""
+    name, input_types = signature[:-1].split("(")
+    return Function(
+        {
+            "name": name,
+            "inputs": [{"name": "", "type": t} for t in input_types.split(",") if t],
+            "outputs": [{"name": "", "type": t} for t in output_types],
+        }
+    )
+
+
+def functions(abi):
+    # Functions by name, overloads also by signature
+    by_name = {}
+    for entry in abi:
+        if entry.get("type") != "function":
+            continue
+        function = Function(entry)
+        by_name.setdefault(function.name, function)
+        by_name[function.signature] = function
+    return by_name
+
+
+AGGREGATE3 = Function(
+    {
+        "name": "aggregate3",
+        "inputs": [
+            {
+                "name": "calls",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "target", "type": "address"},
+                    {"name": "allowFailure", "type": "bool"},
+                    {"name": "callData", "type": "bytes"},
+                ],
+            }
+        ],
+        "outputs": [
+            {
+                "name": "returnData",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "success", "type": "bool"},
+                    {"name": "returnData", "type": "bytes"},
+                ],
+            }
+        ],
+    }
+)
+
+
+GET_BLOCK_NUMBER = function("getBlockNumber()", "uint256")
+
+
+@dataclass(frozen=True)
+class Call:
+    """A call to one contract, its result decoded with function"""
+
+    target: str
+    function: Function
+    args: tuple = field(default=())
+
+    def encode(self):
+        # Failed calls come back as None rather than revert the whole batch
+        return (self.target, True, self.function.encode(*self.args))
+
+    def decode(self, success, data):
+        if not success:
+            return None
+        return self.function.decode(data)
+
+
+def batches(calls):
+    calls = list(calls)
+    for start in range(0, len(calls), CALLS_PER_BATCH):
+        yield calls[start : start + CALLS_PER_BATCH]
+
+
+def encode_batch(calls):
+    return {
+        "to": MULTICALL3,
+        "data": "0x" + AGGREGATE3.encode([call.encode() for call in calls]).hex(),
+    }
+
+
+def decode_batch(calls, data):
+    if isinstance(data, str):
+        data = bytes.fromhex(data[2:] if data.startswith("0x") else data)
+    results = AGGREGATE3.decode(data)
+    return [
+        call.decode(result["success"], result["returnData"])
+        for call, result in zip(calls, results)
+    ]
+
+
+def block_id(block):
+    if block is None:
+        return "latest"
+    return block if isinstance(block, str) else hex(block)
+
+
+def aggregate(web3, calls, block=None):
+    """Results of calls at block (latest by default), in their order"""
+    results = []
+    for batch in batches(calls):
+        data = web3.eth.call(encode_batch(batch), "latest" if block is None else block)
+        results += decode_batch(batch, data)
+    return results
+
+
+async def aggregate_async(rpc, calls, block=None):
+    """Like aggregate, the batches go out together in one JSON-RPC request"""
+    calls_by_batch = list(batches(calls))
+    data = await rpc.batch(
+        [
+            ("eth_call", [encode_batch(batch), block_id(block)])
+            for batch in calls_by_batch
+        ]
+    )
+    return list(
+        itertools.chain.from_iterable(
+            decode_batch(batch, d) for batch, d in zip(calls_by_batch, data)
+        )
+    )
+
+
+class RpcError(Exception):
+    def __init__(self, error):
+        super().__init__(error.get("message", error))
+        self.error = error
+
+
+class Rpc:
+    """Minimal asyncio JSON-RPC client, one HTTP session for all requests"""
+
+    def __init__(self, url, timeout=30):
+        self.url = url
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.session = None
+        self.ids = itertools.count()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def post(self, payload):
+        # Created on first use, inside the event loop that uses it
+        if self.session is None:
+            self.session = aiohttp.ClientSession(timeout=self.timeout)
+        # Transport failures raise RpcError like errors the node returns, so
+        # callers handle a rate limit or a dropped connection the same way
+        try:
+            async with self.session.post(self.url, json=payload) as response:
+                response.raise_for_status()
+                return await response.json(content_type=None)
+        except aiohttp.ClientResponseError as e:
+            raise RpcError({"code": e.status, "message": e.message}) from e
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            raise RpcError({"message": str(e) or type(e).__name__}) from e
+
+    async def request(self, method, *params):
+        response = await self.post(
+            {"jsonrpc": "2.0", "id": next(self.ids), "method": method, "params": params}
+        )
+        if "error" in response:
+            raise RpcError(response["error"])
+        return response["result"]
+
+    async def batch(self, requests):
+        # One HTTP request for all of them, results in the order of requests
+        if not requests:
+            return []
+        payload = [
+            {"jsonrpc": "2.0", "id": next(self.ids), "method": method, "params": params}
+            for method, params in requests
+        ]
+        responses = {r["id"]: r for r in await self.post(payload)}
+        results = []
+        for request in payload:
+            response = responses[request["id"]]
+            if "error" in response:
+                raise RpcError(response["error"])
+            results.append(response["result"])
+        return results
@@ -0,0 +1,242 @@
+"""
+Typed reads of Kashi pairs, one eth_call per poll however many pairs.
+
+A KashiReader reads every pair's totals, accrual info and an account's
+fraction, held or staked in the masterChef, plus the bentoBox totals of their
+assets, in one Multicall3 batch at one block. Bento shares and want amounts
+are then converted locally with the same rounding as BentoBox and KashiPair,
+rather than with toShare and toAmount calls. A pair's asset and bentoBox
+never change, the reader fetches them once per pair and keeps them.
+
+    reader = KashiReader()
+    snapshot = reader.read(web3, [pair_0, pair_1], strategy, pids=[pid_0, pid_1])
+    snapshot.amounts
+"""
+from dataclasses import dataclass
+
+from eth_utils import to_checksum_address
+
+from scripts.multicall import (
+    GET_BLOCK_NUMBER,
+    MULTICALL3,
+    Call,
+    aggregate,
+    aggregate_async,
+    function,
+)
+
+UTILIZATION_PRECISION = 10 ** 18
+
+ASSET = function("asset()", "address")
+BENTO_BOX = function("bentoBox()", "address")
+BALANCE_OF = function("balanceOf(address)", "uint256")
+TOTAL_ASSET = function("totalAsset()", "uint128", "uint128")
+TOTAL_BORROW = function("totalBorrow()", "uint128", "uint128")
+ACCRUE_INFO = function("accrueInfo()", "uint64", "uint64", "uint128")
+TOTALS = function("totals(address)", "uint128", "uint128")
+USER_INFO = function("userInfo(uint256,address)", "uint256", "uint256")
+
+# Strategy.sol stakes the fractions of pairs with a pid here
+MASTER_CHEF = "0xc2EdaD668740f1aA35E4D8f227fB8E17dcA888Cd"
+
+
+@dataclass(frozen=True)
+class Rebase:
+    """BoringRebase totals, with its conversions and rounding"""
+
+    elastic: int
+    base: int
+
+    def to_base(self, elastic, round_up=False):
+        if self.elastic == 0:
+            return elastic
+        base = elastic * self.base // self.elastic
+        if round_up and base * self.elastic // self.base < elastic:
+            base += 1
+        return base
+
+    def to_elastic(self, base, round_up=False):
+        if self.base == 0:
+            return base
+        elastic = base * self.elastic // self.base
+        if round_up and elastic * self.base // self.elastic < base:
+            elastic += 1
+        return elastic
+
+
+@dataclass(frozen=True)
+class KashiPair:
+    """A pair and one account's position in it, as of one block"""
+
+    address: str
+    asset: str
+    bento_box: str
+    pid: int
+    fraction_in_pair: int
+    fraction_in_master_chef: int
+    total_asset: Rebase
+    total_borrow: Rebase
+    interest_per_second: int
+    last_accrued: int
+    bento_totals: Rebase
+
+    @property
+    def fraction(self):
+        # Held and staked, as Strategy.sol's kashiFractionTotal
+        return self.fraction_in_pair + self.fraction_in_master_chef
+
+    @property
+    def all_share(self):
+        # Lent out and not, in bentoBox shares, as KashiPair counts it
+        return self.total_asset.elastic + self.bento_totals.to_base(
+            self.total_borrow.elastic, True
+        )
+
+    @property
+    def shares(self):
+        # The bentoBox shares the account's fraction is worth
+        if self.total_asset.base == 0:
+            return 0
+        return self.fraction * self.all_share // self.total_asset.base
+
+    @property
+    def amount(self):
+        # The same, in the asset, as bentoBox.toAmount(asset, shares, true)
+        return self.bento_totals.to_elastic(self.shares, True)
+
+    @property
+    def utilization(self):
+        full_asset_amount = (
+            self.bento_totals.to_elastic(self.total_asset.elastic, False)
+            + self.total_borrow.elastic
+        )
+        if full_asset_amount == 0:
+            return 0
+        return self.total_borrow.elastic * UTILIZATION_PRECISION // full_asset_amount
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    block: int
+    account: str
+    pairs: tuple
+
+    @property
+    def amounts(self):
+        return [pair.amount for pair in self.pairs]
+
+
+def address(contract):
+    # Brownie contracts and accounts, or plain addresses
+    return to_checksum_address(str(getattr(contract, "address", contract)))
+
+
+class KashiReader:
+    def __init__(self):
+        # pair -> (asset, bentoBox), they are immutable
+        self.immutables = {}
+
+    def read(self, web3, pairs, account, block=None, pids=None):
+        """Snapshot of pairs for account at block (latest by default)
+
+        pids are the masterChef pools the account stakes each pair's fraction
+        in, 0 for none, as in the strategy's kashiPairs.
+        """
+        pairs, pids = self.pairs_and_pids(pairs, pids)
+        missing = self.immutable_calls(pairs)
+        if missing:
+            self.remember(missing, aggregate(web3, missing, block))
+        calls = self.state_calls(pairs, pids, account)
+        results = aggregate(web3, calls, block)
+        return self.snapshot(pairs, pids, account, calls, results)
+
+    async def read_async(self, rpc, pairs, account, block=None, pids=None):
+        """Like read, over a multicall.Rpc client"""
+        pairs, pids = self.pairs_and_pids(pairs, pids)
+        missing = self.immutable_calls(pairs)
+        if missing:
+            self.remember(missing, await aggregate_async(rpc, missing, block))
+        calls = self.state_calls(pairs, pids, account)
+        results = await aggregate_async(rpc, calls, block)
+        return self.snapshot(pairs, pids, account, calls, results)
+
+    def pairs_and_pids(self, pairs, pids):
+        pairs = [address(pair) for pair in pairs]
+        pids = [0] * len(pairs) if pids is None else [int(pid) for pid in pids]
+        if len(pids) != len(pairs):
+            raise ValueError("a pid is needed for every pair")
+        return pairs, pids
+
+    def immutable_calls(self, pairs):
+        calls = []
+        for pair in dict.fromkeys(pairs):
+            if pair not in self.immutables:
+                calls += [Call(pair, ASSET), Call(pair, BENTO_BOX)]
+        return calls
+
+    def remember(self, calls, results):
+        for i in range(0, len(calls), 2):
+            asset, bento_box = results[i : i + 2]
+            if asset is None or bento_box is None:
+                raise ValueError(f"{calls[i].target} is not a Kashi pair")
+            self.immutables[calls[i].target] = (asset, bento_box)
+
+    def state_calls(self, pairs, pids, account):
+        # The block number first, then every pair and its stake if it has a
+        # pid, then each bentoBox asset
+        calls = [Call(MULTICALL3, GET_BLOCK_NUMBER)]
+        for pair, pid in zip(pairs, pids):
+            calls += [
+                Call(pair, BALANCE_OF, (address(account),)),
+                Call(pair, TOTAL_ASSET),
+                Call(pair, TOTAL_BORROW),
+                Call(pair, ACCRUE_INFO),
+            ]
+            if pid != 0:
+                calls.append(Call(MASTER_CHEF, USER_INFO, (pid, address(account))))
+        for asset, bento_box in self.bento_assets(pairs):
+            calls.append(Call(bento_box, TOTALS, (asset,)))
+        return calls
+
+    def bento_assets(self, pairs):
+        # Each (asset, bentoBox) once, pairs usually share them
+        return list(dict.fromkeys(self.immutables[pair] for pair in pairs))
+
+    def snapshot(self, pairs, pids, account, calls, results):
+        failed = [call for call, result in zip(calls, results) if result is None]
+        if failed:
+            raise ValueError(f"{failed[0].function} failed on {failed[0].target}")
+
+        results = iter(results)
+        block = next(results)
+        pair_results = []
+        for pid in pids:
+            fraction, total_asset, total_borrow, accrue_info = (
+                next(results) for _ in range(4)
+            )
+            staked = next(results)[0] if pid != 0 else 0
+            pair_results.append(
+                (fraction, staked, total_asset, total_borrow, accrue_info)
+            )
+        bento_totals = {key: Rebase(*next(results)) for key in self.bento_assets(pairs)}
+
+        records = []
+        for pair, pid, values in zip(pairs, pids, pair_results):
+            fraction, staked, total_asset, total_borrow, accrue_info = values
+            asset, bento_box = self.immutables[pair]
+            records.append(
+                KashiPair(
+                    address=pair,
+                    asset=asset,
+                    bento_box=bento_box,
+                    pid=pid,
+                    fraction_in_pair=fraction,
+                    fraction_in_master_chef=staked,
+                    total_asset=Rebase(*total_asset),
+                    total_borrow=Rebase(*total_borrow),
+                    interest_per_second=accrue_info[0],
+                    last_accrued=accrue_info[1],
+                    bento_totals=bento_totals[(asset, bento_box)],
+                )
+            )
+        return Snapshot(block, address(account), tuple(records))
@@ -0,0 +1,807 @@
+"""
+Off-chain model of the strategy's allocation logic, batched over scenarios.
+
+Every array has a row per scenario and, for pair values, a column per Kashi
+pair, so one call runs adjustPosition, liquidatePosition or
+adjustKashiPairRatios on thousands of markets at once. Values are numpy
+object arrays of Python ints, products of uint128 values overflow int64, and
+all math is the integer math of Strategy.sol, KashiPairMediumRiskV1 and
+BentoBox, rounding included.
+
+A call that would revert on chain marks its scenarios in `reverted` and leaves
+their state as it was. Degenerate totals (a pair or bentoBox with elastic but
+no base) and SUSHI rewards are not modelled.
+
+    python scripts/simulator.py
+"""
+import functools
+
+import numpy as np
+
+MAX_BPS = 10_000
+
+# Strategy.sol
+KASHI_MINIMUM_TARGET_UTILIZATION = 7 * 10 ** 17
+KASHI_MAXIMUM_TARGET_UTILIZATION = 8 * 10 ** 17
+KASHI_UTILIZATION_PRECISION = 10 ** 18
+
+# KashiPairMediumRiskV1
+FULL_UTILIZATION_MINUS_MAX = 10 ** 18 - KASHI_MAXIMUM_TARGET_UTILIZATION
+FACTOR_PRECISION = 10 ** 18
+STARTING_INTEREST_PER_SECOND = 317097920
+MINIMUM_INTEREST_PER_SECOND = 79274480
+MAXIMUM_INTEREST_PER_SECOND = 317097920000
+INTEREST_ELASTICITY = 28800 * 10 ** 36
+PROTOCOL_FEE = 10_000
+PROTOCOL_FEE_DIVISOR = 10 ** 5
+BORROW_OPENING_FEE = 50
+BORROW_OPENING_FEE_PRECISION = 10 ** 5
+KASHI_MINIMUM_BASE = 1000
+
+# BentoBox
+MINIMUM_SHARE_BALANCE = 1000
+
+# Pair values kept by both the pairs and the strategy's snapshots
+PAIR_TOTALS = (
+    "asset_elastic",
+    "asset_base",
+    "borrow_elastic",
+    "borrow_base",
+    "interest_per_second",
+    "last_accrued",
+)
+STATE = PAIR_TOTALS + (
+    "now",
+    "bento_elastic",
+    "bento_base",
+    "want",
+    "shares",
+    "fraction_in_pair",
+    "fraction_in_master_chef",
+)
+
+
+def ints(value, shape=None):
+    # Python int array, copied so callers never share state
+    array = np.array(value, dtype=object)
+    if shape is not None:
+        array = np.broadcast_to(array, shape).copy()
+    return array
+
+
+def div(a, b):
+    # Floor division where b is not 0, reverting paths are masked by callers
+    return np.where(b == 0, 0, a // np.where(b == 0, 1, b))
+
+
+def to_base(total_elastic, total_base, elastic, round_up):
+    # RebaseLibrary.toBase
+    base = np.where(
+        total_elastic == 0, elastic, div(elastic * total_base, total_elastic)
+    )
+    if round_up:
+        base = base + (
+            (total_elastic != 0) & (div(base * total_elastic, total_base) < elastic)
+        )
+    return base
+
+
+def to_elastic(total_elastic, total_base, base, round_up):
+    # RebaseLibrary.toElastic
+    elastic = np.where(total_base == 0, base, div(base * total_elastic, total_base))
+    if round_up:
+        elastic = elastic + (
+            (total_base != 0) & (div(elastic * total_base, total_elastic) < base)
+        )
+    return elastic
+
+
+def transaction(method):
+    # Rolls back the scenarios a call reverted in
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        saved = {name: getattr(self, name).copy() for name in STATE}
+        self.reverted = np.zeros(self.scenarios, dtype=bool)
+        result = method(self, *args, **kwargs)
+        for name, value in saved.items():
+            current = getattr(self, name)
+            current[self.reverted] = value[self.reverted]
+        return result
+
+    return wrapper
+
+
+class Snapshot:
+    """
+    KashiPairSnapshot for every scenario and pair. Like the one in memory on
+    chain it is only reloaded when the strategy accrues, and otherwise drifts
+    from the pairs as the strategy deposits and withdraws.
+    """
+
+    def __init__(self, simulation):
+        for name in PAIR_TOTALS:
+            setattr(self, name, getattr(simulation, name).copy())
+
+    def reload(self, simulation, cells):
+        for name in PAIR_TOTALS:
+            setattr(
+                self,
+                name,
+                np.where(cells, getattr(simulation, name), getattr(self, name)),
+            )
+
+
+class Simulation:
+    """
+    BentoBox, Kashi pairs and one strategy per scenario.
+
+    Scalars and arrays are broadcast to (scenarios,) for bentoBox, block and
+    strategy values and to (scenarios, pairs) for pair values. `staked` is
+    True for the pairs with a MasterChef pid.
+    """
+
+    def __init__(
+        self,
+        now,
+        bento,
+        total_asset,
+        total_borrow,
+        interest_per_second=STARTING_INTEREST_PER_SECOND,
+        last_accrued=None,
+        staked=False,
+        dust=2,
+        deposit_chunks=0,
+    ):
+        shape = np.broadcast(
+            np.empty(np.shape(now) + (1,)), *total_asset, *total_borrow
+        ).shape
+        self.scenarios, self.pairs = shape
+
+        self.now = ints(now, shape[:1])
+        self.bento_elastic = ints(bento[0], shape[:1])
+        self.bento_base = ints(bento[1], shape[:1])
+        self.asset_elastic = ints(total_asset[0], shape)
+        self.asset_base = ints(total_asset[1], shape)
+        self.borrow_elastic = ints(total_borrow[0], shape)
+        self.borrow_base = ints(total_borrow[1], shape)
+        self.interest_per_second = ints(interest_per_second, shape)
+        self.last_accrued = ints(
+            self.now[:, None] if last_accrued is None else last_accrued, shape
+        )
+        self.staked = np.broadcast_to(np.array(staked, dtype=bool), shape).copy()
+
+        self.want = ints(0, shape[:1])
+        self.shares = ints(0, shape[:1])
+        self.fraction_in_pair = ints(0, shape)
+        self.fraction_in_master_chef = ints(0, shape)
+        self.dust = ints(dust, shape[:1])
+        self.deposit_chunks = ints(deposit_chunks, shape[:1])
+
+        self.reverted = np.zeros(self.scenarios, dtype=bool)
+
+    # Market
+
+    def sleep(self, seconds):
+        self.now = self.now + ints(seconds)
+
+    def fund(self, amount):
+        # want sent to the strategy, as the vault does on harvest
+        self.want = self.want + ints(amount)
+
+    def accrue_pairs(self):
+        # Anyone calling accrue on every pair
+        self.accrue(np.ones((self.scenarios, self.pairs), dtype=bool))
+
+    @transaction
+    def add_profit(self, amount):
+        # BentoBox strategy profits, want per share goes up
+        self.revert(self.bento_base == 0)
+        self.bento_elastic = self.bento_elastic + ints(amount)
+
+    @transaction
+    def borrow(self, amount):
+        # Other users borrowing amount of want from each pair
+        amount = ints(amount, (self.scenarios, self.pairs))
+        cells = amount > 0
+        self.accrue(cells)
+        fee = amount * BORROW_OPENING_FEE // BORROW_OPENING_FEE_PRECISION
+        part = to_base(self.borrow_elastic, self.borrow_base, amount + fee, True)
+        share = to_base(*self.bento_totals(2), amount, False)
+        self.revert((cells & (self.asset_base < KASHI_MINIMUM_BASE)).any(axis=1))
+        self.revert((cells & (share > self.asset_elastic)).any(axis=1))
+        self.borrow_elastic = np.where(
+            cells, self.borrow_elastic + amount + fee, self.borrow_elastic
+        )
+        self.borrow_base = np.where(cells, self.borrow_base + part, self.borrow_base)
+        self.asset_elastic = np.where(
+            cells, self.asset_elastic - share, self.asset_elastic
+        )
+
+    @transaction
+    def repay(self, part):
+        # Other users repaying part of each pair's borrow parts
+        part = ints(part, (self.scenarios, self.pairs))
+        cells = part > 0
+        self.accrue(cells)
+        amount = to_elastic(self.borrow_elastic, self.borrow_base, part, True)
+        self.revert((cells & (part > self.borrow_base)).any(axis=1))
+        self.revert((cells & (amount > self.borrow_elastic)).any(axis=1))
+        share = to_base(*self.bento_totals(2), amount, True)
+        self.borrow_elastic = np.where(
+            cells, self.borrow_elastic - amount, self.borrow_elastic
+        )
+        self.borrow_base = np.where(cells, self.borrow_base - part, self.borrow_base)
+        self.asset_elastic = np.where(
+            cells, self.asset_elastic + share, self.asset_elastic
+        )
+
+    # Strategy entry points
+
+    def snapshot(self):
+        return Snapshot(self)
+
+    def estimated_total_assets(self):
+        return self._estimated_total_assets(self.snapshot())
+
+    def kashi_pair_estimated_assets(self):
+        snapshot = self.snapshot()
+        return self.bento_shares_to_want(self.kashi_pair_estimated_shares(snapshot))
+
+    @transaction
+    def adjust_position(self):
+        dust = self.dust
+        self.deposit_in_bento(self.want, self.want > dust)
+
+        shares = self.shares
+        deposit = shares > self.want_to_bento_shares(dust)
+        snapshot = self.snapshot()
+        chunks = np.minimum(self.deposit_chunks, shares)
+
+        # Spread the deposit so the pairs' supply rates even out
+        spread = deposit & (chunks > 1)
+        allocations = self.allocate_deposit(
+            snapshot, np.where(spread, shares, 0), np.where(spread, chunks, 0)
+        )
+        self.deposit_in_kashi_pair(
+            snapshot, allocations, spread[:, None] & (allocations > 0)
+        )
+
+        single = deposit & ~spread
+        highest = self.highest_interest_pair(snapshot, shares)
+        # There is no pair to deposit in, the cook goes to address(0)
+        self.revert(single & (highest == self.pairs))
+        self.deposit_in_kashi_pair(
+            snapshot, shares[:, None], self.pair_cells(highest, single)
+        )
+
+    @transaction
+    def liquidate_position(self, amount_needed):
+        return self._liquidate_position(
+            self.snapshot(), ints(amount_needed, (self.scenarios,))
+        )
+
+    @transaction
+    def liquidate_all_positions(self):
+        snapshot = self.snapshot()
+        liquidated, _ = self._liquidate_position(
+            snapshot, self._estimated_total_assets(snapshot)
+        )
+        return liquidated
+
+    @transaction
+    def withdraw(self, amount_needed):
+        # BaseStrategy.withdraw, the freed want goes to the vault
+        liquidated, loss = self._liquidate_position(
+            self.snapshot(), ints(amount_needed, (self.scenarios,))
+        )
+        self.want = self.want - liquidated
+        return liquidated, loss
+
+    @transaction
+    def prepare_return(self, debt, debt_outstanding):
+        # The vault's totalDebt and debtOutstanding for the strategy are
+        # inputs, the vault itself is not modelled
+        debt = ints(debt, (self.scenarios,))
+        debt_outstanding = ints(debt_outstanding, (self.scenarios,))
+        snapshot = self.snapshot()
+        self.accrue_and_claim(snapshot)
+
+        assets = self._estimated_total_assets(snapshot)
+        want = self.want
+        profit = np.where(assets >= debt, assets - debt, 0)
+        loss = np.where(assets < debt, debt - assets, 0)
+
+        debt_payment = debt_outstanding
+        to_free = debt_payment + profit
+        free = (to_free > 0) & (want < to_free)
+        loose, _ = self._liquidate_position(snapshot, np.where(free, to_free, 0))
+
+        # Pay down debt before taking profit
+        short = free & (loose < to_free)
+        debt_only = short & (loose <= debt_payment)
+        profit = np.where(debt_only, 0, np.where(short, loose - debt_payment, profit))
+        debt_payment = np.where(debt_only, loose, debt_payment)
+        return profit, loss, debt_payment
+
+    @transaction
+    def adjust_kashi_pair_ratios(self, ratios):
+        ratios = ints(ratios, (self.scenarios, self.pairs))
+        snapshot = self.snapshot()
+        self.accrue_interest(snapshot, np.ones(ratios.shape, dtype=bool))
+        self.revert(ratios.sum(axis=1) != MAX_BPS)
+
+        self.deposit_in_bento(self.want, self.want > self.dust)
+
+        total_assets = self._estimated_total_assets(snapshot)
+        pair_assets = self.bento_shares_to_want(
+            self.kashi_pair_estimated_shares(snapshot)
+        )
+        target_assets = ratios * total_assets[:, None] // MAX_BPS
+
+        lower = target_assets < pair_assets
+        self.liquidate_kashi_pair(
+            snapshot,
+            self.want_to_bento_shares(np.where(lower, pair_assets - target_assets, 0)),
+            lower,
+            False,
+        )
+
+        increase = np.where(target_assets > pair_assets, target_assets - pair_assets, 0)
+        for i in range(self.pairs):
+            shares = np.minimum(self.want_to_bento_shares(increase[:, i]), self.shares)
+            cells = self.pair_cells(np.full(self.scenarios, i), increase[:, i] > 0)
+            self.deposit_in_kashi_pair(snapshot, shares[:, None], cells)
+
+    # Strategy internals, masked by scenario or by (scenario, pair) cell
+
+    def _estimated_total_assets(self, snapshot):
+        shares = self.shares + self.kashi_pair_estimated_shares(snapshot).sum(axis=1)
+        return self.want + self.bento_shares_to_want(shares)
+
+    def _liquidate_position(self, snapshot, amount_needed):
+        dust = self.dust
+        want = self.want
+        done = amount_needed <= want
+
+        total_assets = self._estimated_total_assets(snapshot)
+        to_free = amount_needed - want
+        deposited = total_assets - want
+        to_free = np.where(to_free + dust > deposited, deposited, to_free)
+        free = ~done & (to_free > 0)
+
+        shares_needed = self.want_to_bento_shares(np.where(free, to_free, 0))
+        shares = self.shares
+        self.liquidate_kashi_pairs(
+            snapshot, shares_needed - shares, free & (shares_needed > shares)
+        )
+        # Kashi withdrawals already went straight to want
+        idle = self.shares
+        self.withdraw_from_bento(idle, free & (idle > 0))
+
+        liquidated = np.where(done, amount_needed, np.minimum(self.want, amount_needed))
+        diff = amount_needed - liquidated
+        loss = np.where((diff > 0) & (diff <= dust), diff, 0)
+        return liquidated, loss
+
+    def liquidate_kashi_pairs(self, snapshot, shares_to_free, rows):
+        plan, plan_length = self.plan_liquidation(snapshot, shares_to_free)
+        freed = ints(0, (self.scenarios,))
+        for step in range(self.pairs):
+            active = rows & (step < plan_length) & (freed + self.dust < shares_to_free)
+            freed = (
+                freed
+                + self.liquidate_kashi_pair(
+                    snapshot,
+                    (shares_to_free - freed)[:, None],
+                    self.pair_cells(plan[:, step], active),
+                    True,
+                ).sum(axis=1)
+            )
+        return freed
+
+    def plan_liquidation(self, snapshot, shares_to_free):
+        rows = np.arange(self.scenarios)
+        withdrawable = np.where(
+            self.kashi_fraction_total() <= self.dust[:, None],
+            0,
+            np.minimum(
+                self.kashi_pair_estimated_shares(snapshot), snapshot.asset_elastic
+            ),
+        )
+        plan = np.full((self.scenarios, self.pairs), self.pairs)
+        plan_length = np.zeros(self.scenarios, dtype=int)
+
+        lowest = self.lowest_interest_pair(snapshot, withdrawable, shares_to_free)
+        found = lowest < self.pairs
+        plan[found, 0] = lowest[found]
+        plan_length[found] = 1
+        withdrawable[rows[found], lowest[found]] = 0
+
+        for _ in range(self.pairs):
+            if self.pairs == 0:
+                break
+            largest = np.argmax(withdrawable, axis=1)
+            found = (withdrawable[rows, largest] > 0) & (plan_length < self.pairs)
+            plan[rows[found], plan_length[found]] = largest[found]
+            plan_length[found] += 1
+            withdrawable[rows[found], largest[found]] = 0
+        return plan, plan_length
+
+    def liquidate_kashi_pair(self, snapshot, shares_to_free, cells, to_want):
+        self.accrue_interest(snapshot, cells)
+        shares_to_free = np.minimum(shares_to_free, snapshot.asset_elastic)
+        cells = cells & (shares_to_free > 0)
+        dust = self.dust[:, None]
+
+        fractions = self.bento_shares_to_kashi_fraction(snapshot, shares_to_free)
+
+        # Unstake from MasterChef first
+        staked = cells & self.staked
+        in_master_chef = self.fraction_in_master_chef
+        from_master_chef = np.where(
+            fractions + dust > in_master_chef, in_master_chef, fractions
+        )
+        from_master_chef = np.where(staked, from_master_chef, 0)
+        self.fraction_in_master_chef = in_master_chef - from_master_chef
+        self.fraction_in_pair = self.fraction_in_pair + from_master_chef
+
+        balance = self.fraction_in_pair
+        fractions = np.where(fractions + dust > balance, balance, fractions)
+        shares = self.remove_from_kashi_pair(
+            snapshot, np.where(cells, fractions, 0), cells, to_want
+        )
+
+        self.deposit_in_master_chef(cells)
+        return np.where(cells, shares, 0)
+
+    def remove_from_kashi_pair(self, snapshot, fractions, cells, to_want):
+        # A single cook, to_want only ever has one cell per scenario
+        self.accrue(cells)
+        all_share = self.asset_elastic + to_base(
+            *self.bento_totals(2), self.borrow_elastic, True
+        )
+        shares = np.where(cells, div(fractions * all_share, self.asset_base), 0)
+        asset_elastic = self.asset_elastic - shares
+        asset_base = self.asset_base - fractions
+        self.revert(
+            (cells & ((asset_elastic < 0) | (asset_base < KASHI_MINIMUM_BASE))).any(
+                axis=1
+            )
+        )
+        self.asset_elastic = np.where(cells, asset_elastic, self.asset_elastic)
+        self.asset_base = np.where(cells, asset_base, self.asset_base)
+        self.fraction_in_pair = self.fraction_in_pair - fractions
+        self.shares = self.shares + shares.sum(axis=1)
+
+        if to_want:
+            self.withdraw_from_bento(shares.sum(axis=1), cells.any(axis=1))
+
+        snapshot.asset_elastic = np.where(
+            cells, snapshot.asset_elastic - shares, snapshot.asset_elastic
+        )
+        snapshot.asset_base = np.where(
+            cells, snapshot.asset_base - fractions, snapshot.asset_base
+        )
+        self.revert(
+            (cells & ((snapshot.asset_elastic < 0) | (snapshot.asset_base < 0))).any(
+                axis=1
+            )
+        )
+        return shares
+
+    def deposit_in_kashi_pair(self, snapshot, shares, cells):
+        # One cook per cell, Kashi accrues and pulls the shares
+        shares = np.where(cells, shares, 0)
+        self.accrue(cells)
+        all_share = self.asset_elastic + to_base(
+            *self.bento_totals(2), self.borrow_elastic, True
+        )
+        fractions = np.where(
+            all_share == 0, shares, div(shares * self.asset_base, all_share)
+        )
+        # Kashi takes nothing when the pair would stay below its minimum
+        added = cells & (self.asset_base + fractions >= KASHI_MINIMUM_BASE)
+        fractions = np.where(added, fractions, 0)
+        self.asset_elastic = np.where(
+            added, self.asset_elastic + shares, self.asset_elastic
+        )
+        self.asset_base = self.asset_base + fractions
+        self.shares = self.shares - np.where(added, shares, 0).sum(axis=1)
+        self.revert(self.shares < 0)
+        self.fraction_in_pair = self.fraction_in_pair + fractions
+
+        snapshot.asset_elastic = snapshot.asset_elastic + shares
+        snapshot.asset_base = snapshot.asset_base + fractions
+        self.deposit_in_master_chef(cells)
+
+    def accrue_and_claim(self, snapshot):
+        # Pairs we hold, claiming only moves loose fractions into MasterChef
+        cells = self.kashi_fraction_total() != 0
+        self.accrue_interest(snapshot, cells)
+        self.deposit_in_master_chef(cells)
+
+    def deposit_in_master_chef(self, cells):
+        staked = cells & self.staked
+        self.fraction_in_master_chef = self.fraction_in_master_chef + np.where(
+            staked, self.fraction_in_pair, 0
+        )
+        self.fraction_in_pair = np.where(staked, 0, self.fraction_in_pair)
+
+    def deposit_in_bento(self, amount, rows):
+        shares = to_base(self.bento_elastic, self.bento_base, amount, False)
+        # bentoBox takes nothing when it would stay below its minimum
+        rows = rows & (self.bento_base + shares >= MINIMUM_SHARE_BALANCE)
+        self.bento_elastic = np.where(
+            rows, self.bento_elastic + amount, self.bento_elastic
+        )
+        self.bento_base = np.where(rows, self.bento_base + shares, self.bento_base)
+        self.want = np.where(rows, self.want - amount, self.want)
+        self.shares = np.where(rows, self.shares + shares, self.shares)
+
+    def withdraw_from_bento(self, shares, rows):
+        amount = to_elastic(self.bento_elastic, self.bento_base, shares, False)
+        bento_base = self.bento_base - shares
+        self.revert(
+            rows
+            & (
+                (shares > self.shares)
+                | ((bento_base < MINIMUM_SHARE_BALANCE) & (bento_base != 0))
+            )
+        )
+        self.bento_elastic = np.where(
+            rows, self.bento_elastic - amount, self.bento_elastic
+        )
+        self.bento_base = np.where(rows, bento_base, self.bento_base)
+        self.want = np.where(rows, self.want + amount, self.want)
+        self.shares = np.where(rows, self.shares - shares, self.shares)
+
+    def accrue_interest(self, snapshot, cells):
+        cells = cells & (self.now[:, None] > snapshot.last_accrued)
+        self.accrue(cells)
+        snapshot.reload(self, cells)
+
+    def accrue(self, cells):
+        # KashiPair.accrue
+        now = self.now[:, None]
+        elapsed = now - self.last_accrued
+        cells = cells & (elapsed > 0)
+        self.last_accrued = np.where(cells, now, self.last_accrued)
+
+        # No borrows resets the interest rate
+        idle = cells & (self.borrow_base == 0)
+        self.interest_per_second = np.where(
+            idle, STARTING_INTEREST_PER_SECOND, self.interest_per_second
+        )
+        cells = cells & ~idle
+        rate = self.interest_per_second
+
+        extra = self.borrow_elastic * rate * elapsed // 10 ** 18
+        borrow_elastic = self.borrow_elastic + extra
+        full_asset = (
+            to_elastic(*self.bento_totals(2), self.asset_elastic, False)
+            + borrow_elastic
+        )
+        fee = extra * PROTOCOL_FEE // PROTOCOL_FEE_DIVISOR
+        fee_fraction = div(fee * self.asset_base, full_asset)
+        self.asset_base = np.where(
+            cells, self.asset_base + fee_fraction, self.asset_base
+        )
+        self.borrow_elastic = np.where(cells, borrow_elastic, self.borrow_elastic)
+
+        utilization = div(borrow_elastic * KASHI_UTILIZATION_PRECISION, full_asset)
+        under = cells & (utilization < KASHI_MINIMUM_TARGET_UTILIZATION)
+        under_factor = (
+            (KASHI_MINIMUM_TARGET_UTILIZATION - utilization)
+            * FACTOR_PRECISION
+            // KASHI_MINIMUM_TARGET_UTILIZATION
+        )
+        lowered = np.maximum(
+            rate
+            * INTEREST_ELASTICITY
+            // (INTEREST_ELASTICITY + under_factor * under_factor * elapsed),
+            MINIMUM_INTEREST_PER_SECOND,
+        )
+        over = cells & (utilization > KASHI_MAXIMUM_TARGET_UTILIZATION)
+        over_factor = (
+            (utilization - KASHI_MAXIMUM_TARGET_UTILIZATION)
+            * FACTOR_PRECISION
+            // FULL_UTILIZATION_MINUS_MAX
+        )
+        raised = np.minimum(
+            rate
+            * (INTEREST_ELASTICITY + over_factor * over_factor * elapsed)
+            // INTEREST_ELASTICITY,
+            MAXIMUM_INTEREST_PER_SECOND,
+        )
+        self.interest_per_second = np.where(
+            under, lowered, np.where(over, raised, self.interest_per_second)
+        )
+
+    def revert(self, rows):
+        self.reverted = self.reverted | rows
+
+    # Pair selection
+
+    def highest_interest_pair(self, snapshot, shares_to_deposit):
+        # Index of the best pair to deposit in, pairs if none qualifies
+        utilization = self.kashi_pair_utilization(snapshot, shares_to_deposit[:, None])
+        highest = np.full(self.scenarios, self.pairs)
+        highest_interest = ints(0, (self.scenarios,))
+        highest_utilization = ints(0, (self.scenarios,))
+
+        for i in range(self.pairs):
+            rate = snapshot.interest_per_second[:, i]
+            u = utilization[:, i]
+            better = (
+                (u > highest_utilization)
+                & (
+                    (u > KASHI_MAXIMUM_TARGET_UTILIZATION)
+                    | (highest_utilization < KASHI_MINIMUM_TARGET_UTILIZATION)
+                )
+            ) | (
+                (rate > highest_interest)
+                & in_target(u)
+                & in_target(highest_utilization)
+            )
+            highest = np.where(better, i, highest)
+            highest_interest = np.where(better, rate, highest_interest)
+            highest_utilization = np.where(better, u, highest_utilization)
+        return highest
+
+    def lowest_interest_pair(self, snapshot, withdrawable, min_shares):
+        # Index of the best pair to withdraw from, pairs if none has min_shares
+        utilization = self.kashi_pair_utilization(snapshot, 0)
+        lowest = np.full(self.scenarios, self.pairs)
+        lowest_interest = ints(2 ** 256 - 1, (self.scenarios,))
+        lowest_utilization = ints(KASHI_UTILIZATION_PRECISION, (self.scenarios,))
+
+        for i in range(self.pairs):
+            rate = snapshot.interest_per_second[:, i]
+            u = utilization[:, i]
+            better = (
+                (
+                    (u < lowest_utilization)
+                    & (
+                        (lowest_utilization > KASHI_MAXIMUM_TARGET_UTILIZATION)
+                        | (u < KASHI_MINIMUM_TARGET_UTILIZATION)
+                    )
+                )
+                | (
+                    (rate < lowest_interest)
+                    & in_target(u)
+                    & in_target(lowest_utilization)
+                )
+            ) & ((withdrawable[:, i] > 0) & (withdrawable[:, i] >= min_shares))
+            lowest = np.where(better, i, lowest)
+            lowest_interest = np.where(better, rate, lowest_interest)
+            lowest_utilization = np.where(better, u, lowest_utilization)
+        return lowest
+
+    def allocate_deposit(self, snapshot, shares_to_deposit, chunks):
+        # Water-fills each scenario's deposit in chunks, 0 chunks allocates nothing
+        rows = np.arange(self.scenarios)
+        allocations = ints(0, (self.scenarios, self.pairs))
+        if self.pairs == 0:
+            return allocations
+
+        chunk_shares = div(shares_to_deposit, chunks)
+        for c in range(int(max(chunks, default=0))):
+            active = c < chunks
+            size = np.where(
+                c == chunks - 1,
+                shares_to_deposit - chunk_shares * (chunks - 1),
+                chunk_shares,
+            )
+            rate = self.kashi_pair_supply_rate(snapshot, allocations + size[:, None])
+
+            highest = np.zeros(self.scenarios, dtype=int)
+            highest_rate = ints(0, (self.scenarios,))
+            for i in range(self.pairs):
+                better = rate[:, i] > highest_rate
+                highest = np.where(better, i, highest)
+                highest_rate = np.where(better, rate[:, i], highest_rate)
+
+            allocations[rows[active], highest[active]] += size[active]
+        return allocations
+
+    # Conversions
+
+    def bento_totals(self, ndim):
+        if ndim == 2:
+            return self.bento_elastic[:, None], self.bento_base[:, None]
+        return self.bento_elastic, self.bento_base
+
+    def want_to_bento_shares(self, amount):
+        amount = ints(amount)
+        shares = to_base(*self.bento_totals(amount.ndim), amount, True)
+        return np.where(amount == 0, 0, shares)
+
+    def bento_shares_to_want(self, shares):
+        shares = ints(shares)
+        amount = to_elastic(*self.bento_totals(shares.ndim), shares, True)
+        return np.where(shares == 0, 0, amount)
+
+    def kashi_fraction_total(self):
+        return self.fraction_in_pair + self.fraction_in_master_chef
+
+    def all_share(self, snapshot):
+        return snapshot.asset_elastic + self.want_to_bento_shares(
+            snapshot.borrow_elastic
+        )
+
+    def kashi_pair_estimated_shares(self, snapshot):
+        return div(
+            self.kashi_fraction_total() * self.all_share(snapshot), snapshot.asset_base
+        )
+
+    def bento_shares_to_kashi_fraction(self, snapshot, shares):
+        all_share = self.all_share(snapshot)
+        return np.where(
+            all_share == 0, shares, div(shares * snapshot.asset_base, all_share)
+        )
+
+    def kashi_pair_utilization(self, snapshot, shares_to_deposit):
+        borrowed = snapshot.borrow_elastic
+        full_asset = (
+            to_elastic(
+                *self.bento_totals(2), snapshot.asset_elastic + shares_to_deposit, False
+            )
+            + borrowed
+        )
+        return div(borrowed * KASHI_UTILIZATION_PRECISION, full_asset)
+
+    def kashi_pair_supply_rate(self, snapshot, shares_to_deposit):
+        utilization = self.kashi_pair_utilization(snapshot, shares_to_deposit)
+        return snapshot.interest_per_second * utilization // KASHI_UTILIZATION_PRECISION
+
+    def pair_cells(self, index, rows):
+        # (scenarios, pairs) mask of one pair per scenario
+        return rows[:, None] & (np.arange(self.pairs) == np.asarray(index)[:, None])
+
+
+def in_target(utilization):
+    return (utilization < KASHI_MAXIMUM_TARGET_UTILIZATION) & (
+        utilization > KASHI_MINIMUM_TARGET_UTILIZATION
+    )
+
+
+def random_markets(rng, scenarios, pairs, **kwargs):
+    # Seeded pairs with 1-10M of want lent and 10-95% of it borrowed
+    lent = rng.integers(10 ** 6, 10 ** 7, (scenarios, pairs)).astype(object) * 10 ** 18
+    borrowed = lent * rng.integers(10, 95, (scenarios, pairs)).astype(object) // 100
+    rate = rng.integers(
+        MINIMUM_INTEREST_PER_SECOND,
+        MAXIMUM_INTEREST_PER_SECOND // 100,
+        (scenarios, pairs),
+    )
+    bento = lent.sum(axis=1) * 2
+    return Simulation(
+        now=1_600_000_000,
+        bento=(bento, bento),
+        total_asset=(lent - borrowed, lent),
+        total_borrow=(borrowed, borrowed),
+        interest_per_second=rate.astype(object),
+        **kwargs,
+    )
+
+
+def main():
+    # Compares deposit chunking on the same markets after a week
+    deposit = 10 ** 6 * 10 ** 18
+    for chunks in (0, 5, 20):
+        simulation = random_markets(
+            np.random.default_rng(0), 1_000, 5, deposit_chunks=chunks
+        )
+        simulation.fund(deposit)
+        simulation.adjust_position()
+        simulation.sleep(7 * 24 * 3600)
+        simulation.accrue_pairs()
+        gain = simulation.estimated_total_assets() - deposit
+        print(
+            f"depositChunks {chunks:>2}: mean gain {np.mean(gain) / 1e18:,.2f}, "
+            f"reverted {simulation.reverted.sum()}"
+        )
+
+
+if __name__ == "__main__":
+    main()
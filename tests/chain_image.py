@@ -0,0 +1,120 @@
+"""
+Image of the chain right after session setup, so that later sessions load it
+in one call instead of deploying the mocks, the vault and the strategy again.
+
+An image is the node's state from anvil_dumpState plus the session fixture
+values that live in it. It is keyed by every source that shapes that state and
+rebuilt as soon as one of them changes. Nodes that cannot dump their state
+(Hardhat, Ganache) build the session as usual.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+from brownie import Contract, accounts, project, web3
+from brownie.network.account import PublicKeyAccount
+from brownie.network.contract import _DeployedContractBase
+
+ROOT = Path(__file__).parent.parent
+IMAGES = Path(__file__).parent / ".chain_images"
+SOURCES = (
+    "brownie-config.yml",
+    "contracts/**/*.sol",
+    "tests/conftest.py",
+    "tests/chain_image.py",
+)
+
+
+def fingerprint(network_name):
+    digest = hashlib.sha256(network_name.encode())
+    for pattern in SOURCES:
+        for path in sorted(ROOT.glob(pattern)):
+            digest.update(path.relative_to(ROOT).as_posix().encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+class ChainImage:
+    def __init__(self, network_name):
+        self.network_name = network_name
+        self.path = IMAGES / f"{network_name}-{fingerprint(network_name)}.json"
+        self.values = {}
+        # ABIs of contracts from outside the project, like the Vault
+        self.abis = {}
+        self.loaded = False
+
+    def load(self):
+        if not self.path.exists():
+            return False
+        image = json.loads(self.path.read_text())
+        if "error" in web3.provider.make_request("anvil_loadState", [image["state"]]):
+            return False
+        # Block based accounting (MasterChef) expects to be past the image
+        blocks = image["block"] - web3.eth.block_number
+        if blocks > 0:
+            web3.provider.make_request("hardhat_mine", [hex(blocks)])
+        self.values = image["values"]
+        self.abis = image["abis"]
+        self.loaded = True
+        return True
+
+    def save(self):
+        if self.loaded:
+            return False
+        response = web3.provider.make_request("anvil_dumpState", [])
+        if "error" in response:
+            return False
+        IMAGES.mkdir(exist_ok=True)
+        for stale in IMAGES.glob(f"{self.network_name}-*.json"):
+            if stale != self.path:
+                stale.unlink(missing_ok=True)
+        image = {
+            "state": response["result"],
+            "block": web3.eth.block_number,
+            "values": self.values,
+            "abis": self.abis,
+        }
+        # xdist workers may save at the same time, each replaces it whole
+        partial = self.path.with_suffix(f".{os.getpid()}.partial")
+        partial.write_text(json.dumps(image))
+        partial.replace(self.path)
+        return True
+
+    def cached(self, name, build):
+        # The value of a session fixture, from the image or built and recorded
+        if name in self.values:
+            return self.decode(self.values[name])
+        value = build()
+        self.values[name] = self.encode(value)
+        return value
+
+    def encode(self, value):
+        if isinstance(value, _DeployedContractBase):
+            if value._name not in project.get_loaded_projects()[0]:
+                self.abis[value._name] = value.abi
+            return {"contract": value._name, "address": value.address}
+        if isinstance(value, PublicKeyAccount):
+            return {"account": value.address}
+        if isinstance(value, SimpleNamespace):
+            return {"namespace": {k: self.encode(v) for k, v in vars(value).items()}}
+        if isinstance(value, (list, tuple)):
+            return [self.encode(v) for v in value]
+        return value
+
+    def decode(self, value):
+        if isinstance(value, list):
+            return [self.decode(v) for v in value]
+        if not isinstance(value, dict):
+            return value
+        if "namespace" in value:
+            return SimpleNamespace(
+                **{k: self.decode(v) for k, v in value["namespace"].items()}
+            )
+        if "account" in value:
+            return accounts.at(value["account"], force=True)
+        name, address = value["contract"], value["address"]
+        if name in self.abis:
+            return Contract.from_abi(name, address, self.abis[name])
+        return project.get_loaded_projects()[0][name].at(address)
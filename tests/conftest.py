@@ -1,6 +1,204 @@
+import json
+import os
 import pytest
+from pathlib import Path
+from types import SimpleNamespace
 from brownie import config
 from brownie import Contract
+from brownie import network
+from brownie import web3
+from brownie._config import CONFIG
+from brownie.network import rpc
+from chain_image import ChainImage
+from rpc_cache import RpcCache
+from scripts.reader import KashiReader
+
+# Addresses the strategy hardcodes, the offline mocks are etched there
+WETH = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+SUSHI = "0x6B3595068778DD592e39A122f4f5a5cF09C90fE2"
+MASTER_CHEF = "0xc2EdaD668740f1aA35E4D8f227fB8E17dcA888Cd"
+SUSHI_ROUTER = "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F"
+HEALTH_CHECK = "0xDDCea799fF1699e98EDF118e0629A974Df7DF012"
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+
+def forked():
+    # Forked networks run against the live protocol, anything else (hardhat,
+    # anvil, ganache >= 7) against the mocks in contracts/mocks
+    return "fork" in network.show_active()
+
+
+GAS_BASELINE = Path(__file__).parent / "gas_baseline.json"
+GAS_TOLERANCE = 0.01  # Report increases above 1% as regressions
+
+# Filled by the gas_used fixture, per network as gas differs between a fork
+# and the mocks. With `brownie test -n` every xdist worker fills its own and
+# hands it to the master through workeroutput
+gas_results = {}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--gas-benchmark",
+        action="store_true",
+        help="run the gas benchmarks and compare them to tests/gas_baseline.json",
+    )
+    parser.addoption(
+        "--update-gas-baseline",
+        action="store_true",
+        help="run the gas benchmarks and write them to tests/gas_baseline.json",
+    )
+    parser.addoption(
+        "--differential-sequences",
+        type=int,
+        default=10,
+        metavar="N",
+        help="random operation sequences test_differential.py checks against the model",
+    )
+    parser.addoption(
+        "--rpc-cache",
+        metavar="PATH",
+        help="fork through a record and replay cache of upstream RPC stored at PATH",
+    )
+    parser.addoption(
+        "--rpc-offline",
+        action="store_true",
+        help="only replay from --rpc-cache, never query the upstream",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "gas_benchmark: only runs with --gas-benchmark")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--gas-benchmark") or config.getoption("--update-gas-baseline"):
+        return
+    skip = pytest.mark.skip(reason="needs --gas-benchmark")
+    for item in items:
+        if "gas_benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_sessionstart(session):
+    # Before brownie connects, on the process that launches the node
+    config = session.config
+    if config.getoption("--rpc-cache"):
+        fork_through_rpc_cache(config)
+
+
+def fork_through_rpc_cache(config):
+    # Brownie launches the node with the fork setting of the network, point it
+    # at a local RpcCache in front of the upstream it names. With `-n` every
+    # xdist worker launches a node of its own and serves it its own proxy on
+    # the shared store, the master only opens the store first so that a new
+    # one is pinned to a single block for all of them
+    network_id = CONFIG.argv["network"] or CONFIG.settings["networks"]["default"]
+    cmd_settings = CONFIG.networks[network_id].get("cmd_settings") or {}
+    if "fork" not in cmd_settings:
+        raise pytest.UsageError(f"--rpc-cache needs a forked network, not {network_id}")
+
+    fork = cmd_settings["fork"]
+    if fork in CONFIG.networks:
+        fork = CONFIG.networks[fork]["host"]
+    upstream, _, block = os.path.expandvars(fork).rpartition("@")
+    if not block.isdigit():
+        upstream, block = os.path.expandvars(fork), None
+
+    cache = RpcCache(
+        config.getoption("--rpc-cache"),
+        None if config.getoption("--rpc-offline") else upstream,
+        int(block) if block else None,
+    )
+    if config.getoption("numprocesses", 0) and not hasattr(config, "workerinput"):
+        return
+    cmd_settings["fork"] = f"{cache.serve()}@{cache.block}"
+
+
+def load_gas_baseline():
+    if not GAS_BASELINE.exists():
+        return {}
+    return json.loads(GAS_BASELINE.read_text())
+
+
+def compare_gas_results():
+    baseline = load_gas_baseline()
+    report = []
+    regressions = []
+    missing = []
+    for network_name, results in sorted(gas_results.items()):
+        before = baseline.get(network_name, {})
+        for name, gas in sorted(results.items()):
+            if name not in before:
+                report.append(f"{network_name:<16}{name:<48}{gas:>12,}{'new':>10}")
+                missing.append(name)
+                continue
+            change = (gas - before[name]) / before[name]
+            report.append(f"{network_name:<16}{name:<48}{gas:>12,}{change:>+10.2%}")
+            if change > GAS_TOLERANCE:
+                regressions.append(name)
+    return report, regressions, missing
+
+
+def merge_gas_results(results):
+    for network_name, network_results in results.items():
+        gas_results.setdefault(network_name, {}).update(network_results)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    # xdist master: collect what the worker measured
+    merge_gas_results(json.loads(node.workeroutput.get("gas_results", "{}")))
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not gas_results:
+        return
+    report, regressions, missing = compare_gas_results()
+    terminalreporter.section("gas benchmark")
+    for line in report:
+        terminalreporter.write_line(line)
+    if config.getoption("--update-gas-baseline"):
+        return
+    if missing:
+        terminalreporter.write_line(
+            f"{len(missing)} operation(s) not in {GAS_BASELINE.name}, "
+            "add them with --update-gas-baseline",
+            yellow=True,
+        )
+    if regressions:
+        terminalreporter.write_line(
+            f"{len(regressions)} regression(s) above {GAS_TOLERANCE:.0%}: "
+            + ", ".join(regressions),
+            red=True,
+        )
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if hasattr(session.config, "workerinput"):
+        # xdist worker: the master reports and writes the baseline
+        session.config.workeroutput["gas_results"] = json.dumps(gas_results)
+        return
+    if not gas_results:
+        return
+    if session.config.getoption("--update-gas-baseline"):
+        baseline = load_gas_baseline()
+        for network_name, results in gas_results.items():
+            baseline.setdefault(network_name, {}).update(results)
+        GAS_BASELINE.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+    elif compare_gas_results()[1] and exitstatus == 0:
+        session.exitstatus = 1
+
+
+@pytest.fixture
+def gas_used(request):
+    # Records the gas of a transaction under the running test's id
+    def record(tx):
+        results = gas_results.setdefault(network.show_active(), {})
+        results[request.node.name.replace("test_", "", 1)] = tx.gas_used
+        return tx
+
+    yield record
 
 
 @pytest.fixture(autouse=True)
@@ -8,8 +206,81 @@ def isolation(fn_isolation):
     pass
 
 
+# Fixtures are layered so that each state is built once and tests start from
+# it through snapshots:
+# - session: the protocol (forked, or the mocks), vault, strategy and
+#   collateral_amount are built once, or loaded from a chain image. Modules
+#   revert to that state instead of to the chain brownie connected to
+# - module: funded is built once per module, fn_isolation reverts every test
+#   back to it
+# - function: everything that is cheap or borrows out shared liquidity
+
+
+@pytest.fixture(scope="session")
+def chain_image(chain):
+    # Forks keep their state upstream, there is nothing to image
+    if forked():
+        yield None
+        return
+    image = ChainImage(network.show_active())
+    image.load()
+    yield image
+
+
+def cached(chain_image, name, build):
+    return chain_image.cached(name, build) if chain_image else build()
+
+
+@pytest.fixture(scope="session")
+def session_snapshot(
+    chain, chain_image, mock_protocol, vault, strategy, collateral_amount
+):
+    if chain_image:
+        chain_image.save()
+    yield SimpleNamespace(id=rpc.Rpc().snapshot())
+
+
+@pytest.fixture(scope="module")
+def module_isolation(chain, session_snapshot):
+    # Overrides brownie's module_isolation, which resets to the chain brownie
+    # connected to and would drop the session deployments.
+    # chain._revert re-snapshots and resyncs brownie's view of the chain
+    session_snapshot.id = chain._revert(session_snapshot.id)
+    yield
+    session_snapshot.id = chain._revert(session_snapshot.id)
+
+
+@pytest.fixture(scope="session")
+def time_travel(chain):
+    # chain.mine sends one evm_mine per block, which makes the hours of
+    # accrual the tests simulate slow. Mine them in one call where the node
+    # has a batch method and with chain.mine for whatever it did not mine
+    client = web3.clientVersion.lower()
+    if client.startswith(("hardhat", "anvil")):
+        batch_mine = lambda blocks: ("hardhat_mine", [hex(blocks)])
+    elif client.startswith("ganache/v7"):
+        batch_mine = lambda blocks: ("evm_mine", [{"blocks": blocks}])
+    else:
+        batch_mine = None
+
+    def time_travel(seconds, blocks=1):
+        # The clock moves by seconds, blocks after the first may follow a
+        # second apart
+        chain.sleep(seconds)
+        start = web3.eth.block_number
+        if batch_mine and blocks > 1:
+            web3.provider.make_request(*batch_mine(blocks))
+        # Also resyncs brownie's snapshot after a batch call
+        chain.mine(max(blocks - (web3.eth.block_number - start), 0))
+
+    yield time_travel
+
+
 @pytest.fixture(scope="session")
 def gov(accounts):
+    if not forked():
+        yield accounts[8]
+        return
     yield accounts.at("0xFEB4acf3df3cDEA7399794D0869ef76A6EfAff52", force=True)
 
 
@@ -49,13 +320,19 @@ def user_2(accounts):
 
 
 @pytest.fixture(scope="session")
-def token():
+def token(mock_protocol, IERC20Metadata):
+    if mock_protocol:
+        yield mock_protocol.token
+        return
     token_address = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
-    yield Contract(token_address)
+    yield at(IERC20Metadata, token_address)
 
 
 @pytest.fixture(scope="session")
-def reserve(accounts):
+def reserve(accounts, mock_protocol):
+    if mock_protocol:
+        yield mock_protocol.whale
+        return
     yield accounts.at("0x0A59649758aa4d66E25f08Dd01271e891fe52199", force=True)
 
 
@@ -84,69 +361,113 @@ def amount_2(accounts, reserve, token, user_2):
 
 
 @pytest.fixture(scope="session")
-def weth():
-    token_address = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
-    yield Contract(token_address)
+def weth(mock_protocol, IERC20Metadata):
+    yield at(IERC20Metadata, WETH) if not mock_protocol else mock_protocol.weth
+
+
+def at(container, address):
+    # Contract(address) fetches the ABI from Etherscan on a cold cache, build
+    # from the one compiled from the interfaces in contracts/ instead
+    return Contract.from_abi(container._name, address, container.abi)
+
+
+def mock_or_contract(mock_protocol, index, address, IKashiPair):
+    if mock_protocol:
+        return mock_protocol.kashi_pairs[index]
+    return at(IKashiPair, address)
 
 
 @pytest.fixture(scope="session")
-def kashi_pair_0():
-    yield Contract("0xB7b45754167d65347C93F3B28797887b4b6cd2F3")  # eth/usdc pid 191
+def kashi_pair_0(mock_protocol, IKashiPair):
+    yield mock_or_contract(
+        mock_protocol, 0, "0xB7b45754167d65347C93F3B28797887b4b6cd2F3", IKashiPair
+    )  # eth/usdc pid 191
 
 
 @pytest.fixture(scope="session")
-def kashi_pair_1():
-    yield Contract("0x6EAFe077df3AD19Ade1CE1abDf8bdf2133704f89")  # xsushi/usdc pid 247
+def kashi_pair_1(mock_protocol, IKashiPair):
+    yield mock_or_contract(
+        mock_protocol, 1, "0x6EAFe077df3AD19Ade1CE1abDf8bdf2133704f89", IKashiPair
+    )  # xsushi/usdc pid 247
 
 
 @pytest.fixture(scope="session")
-def kashi_pair_2():
-    yield Contract("0x4f68e70e3a5308d759961643AfcadfC6f74B30f4")  # link/usdc pid 198
+def kashi_pair_2(mock_protocol, IKashiPair):
+    yield mock_or_contract(
+        mock_protocol, 2, "0x4f68e70e3a5308d759961643AfcadfC6f74B30f4", IKashiPair
+    )  # link/usdc pid 198
 
 
 @pytest.fixture(scope="session")
-def kashi_pair_3():
-    yield Contract("0x668edab8A38A962D30602d6Fa7CA489484eE3224")  # wbtc/usdc pid 195
+def kashi_pair_3(mock_protocol, IKashiPair):
+    yield mock_or_contract(
+        mock_protocol, 3, "0x668edab8A38A962D30602d6Fa7CA489484eE3224", IKashiPair
+    )  # wbtc/usdc pid 195
 
 
 @pytest.fixture(scope="session")
-def kashi_pair_4():
-    yield Contract("0xa898974410F7e7689bb626B41BC2292c6A0f5694")  # badger/usdc pid 225
+def kashi_pair_4(mock_protocol, IKashiPair):
+    yield mock_or_contract(
+        mock_protocol, 4, "0xa898974410F7e7689bb626B41BC2292c6A0f5694", IKashiPair
+    )  # badger/usdc pid 225
 
 
 @pytest.fixture(scope="session")
-def kashi_pair_5():
-    yield Contract("0x65089e337109CA4caFF78b97d40453D37F9d23f8")  # yfi/usdc pid 222
+def kashi_pair_5(mock_protocol, IKashiPair):
+    yield mock_or_contract(
+        mock_protocol, 5, "0x65089e337109CA4caFF78b97d40453D37F9d23f8", IKashiPair
+    )  # yfi/usdc pid 222
 
 
 @pytest.fixture(scope="session")
-def pid_0():
-    yield 191
+def unlisted_kashi_pair(mock_protocol, IKashiPair):
+    # A want pair without a masterChef pid
+    if mock_protocol:
+        yield mock_protocol.unlisted_kashi_pair
+        return
+    yield at(IKashiPair, "0x40a12179260997c55619DE3290c5b9918588E791")
 
 
 @pytest.fixture(scope="session")
-def pid_1():
-    yield 247
+def invalid_kashi_pairs(mock_protocol, IKashiPair):
+    # Not a kashiPair, and a kashiPair lending another asset
+    if mock_protocol:
+        yield mock_protocol.invalid_kashi_pairs
+        return
+    yield [
+        at(IKashiPair, "0x11111112542D85B3EF69AE05771c2dCCff4fAa26"),
+        at(IKashiPair, "0x809F2B68f59272740508333898D4e9432A839C75"),
+    ]
 
 
 @pytest.fixture(scope="session")
-def pid_2():
-    yield 198
+def pid_0(mock_protocol):
+    yield mock_protocol.pids[0] if mock_protocol else 191
 
 
 @pytest.fixture(scope="session")
-def pid_3():
-    yield 195
+def pid_1(mock_protocol):
+    yield mock_protocol.pids[1] if mock_protocol else 247
 
 
 @pytest.fixture(scope="session")
-def pid_4():
-    yield 225
+def pid_2(mock_protocol):
+    yield mock_protocol.pids[2] if mock_protocol else 198
 
 
 @pytest.fixture(scope="session")
-def pid_5():
-    yield 222
+def pid_3(mock_protocol):
+    yield mock_protocol.pids[3] if mock_protocol else 195
+
+
+@pytest.fixture(scope="session")
+def pid_4(mock_protocol):
+    yield mock_protocol.pids[4] if mock_protocol else 225
+
+
+@pytest.fixture(scope="session")
+def pid_5(mock_protocol):
+    yield mock_protocol.pids[5] if mock_protocol else 222
 
 
 @pytest.fixture(scope="session")
@@ -160,8 +481,11 @@ def pids(pid_0, pid_1, pid_2, pid_3):
 
 
 @pytest.fixture(scope="session")
-def bento_box(kashi_pair_0):
-    yield Contract(kashi_pair_0.bentoBox())
+def bento_box(mock_protocol, kashi_pair_0, IBentoBoxV1):
+    if mock_protocol:
+        yield mock_protocol.bento_box
+        return
+    yield at(IBentoBoxV1, kashi_pair_0.bentoBox())
 
 
 @pytest.fixture
@@ -171,23 +495,63 @@ def weth_amout(user, weth):
     yield weth_amout
 
 
-@pytest.fixture(scope="function")
-def vault(pm, gov, rewards, guardian, management, token):
-    Vault = pm(config["dependencies"][0]).Vault
-    vault = guardian.deploy(Vault)
-    vault.initialize(token, gov, rewards, "", "", guardian, management)
-    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
-    vault.setManagementFee(0, {"from": gov})
-    vault.setManagement(management, {"from": gov})
-    yield vault
+@pytest.fixture(scope="session")
+def deploy_vault(pm, gov, rewards, guardian, management, token):
+    def deploy_vault():
+        Vault = pm(config["dependencies"][0]).Vault
+        vault = guardian.deploy(Vault)
+        vault.initialize(token, gov, rewards, "", "", guardian, management)
+        vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+        vault.setManagementFee(0, {"from": gov})
+        vault.setManagement(management, {"from": gov})
+        return vault
 
+    yield deploy_vault
 
-@pytest.fixture(scope="function")
-def strategy(strategist, keeper, vault, Strategy, gov, kashi_pairs, bento_box, pids):
-    strategy = strategist.deploy(Strategy, vault, bento_box, kashi_pairs, pids, "")
-    strategy.setKeeper(keeper)
-    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
-    yield strategy
+
+@pytest.fixture(scope="session")
+def deploy_strategy(strategist, keeper, Strategy, gov, kashi_pairs, bento_box, pids):
+    def deploy_strategy(vault):
+        strategy = strategist.deploy(Strategy, vault, bento_box, kashi_pairs, pids, "")
+        strategy.setKeeper(keeper)
+        vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
+        return strategy
+
+    yield deploy_strategy
+
+
+@pytest.fixture(scope="session")
+def vault(chain_image, deploy_vault):
+    yield cached(chain_image, "vault", deploy_vault)
+
+
+@pytest.fixture(scope="session")
+def strategy(chain_image, deploy_strategy, vault):
+    yield cached(chain_image, "strategy", lambda: deploy_strategy(vault))
+
+
+@pytest.fixture(scope="module")
+def funded(chain, deploy_vault, deploy_strategy, token, reserve, user):
+    # A separate vault and strategy with a user deposit already harvested into
+    # the pairs, so tests using it leave vault and strategy untouched
+    vault = deploy_vault()
+    strategy = deploy_strategy(vault)
+    amount = 10_000 * 10 ** token.decimals()
+    token.transfer(user, amount, {"from": reserve})
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    strategy.harvest()
+    yield SimpleNamespace(vault=vault, strategy=strategy, amount=amount)
+
+
+@pytest.fixture
+def borrowed(funded, strategist, kashi_pair_0, borrower, collateral_amount):
+    # funded, with everything lent to kashi_pair_0 and then borrowed out
+    funded.strategy.adjustKashiPairRatios([10_000, 0, 0, 0], {"from": strategist})
+    borrow_amount = kashi_pair_0.totalAsset().dict()["elastic"]
+    kashi_pair_0.borrow(borrower, borrow_amount, {"from": borrower})
+    yield funded
 
 
 @pytest.fixture(scope="session")
@@ -201,12 +565,27 @@ def collateral(weth):
 
 
 @pytest.fixture(scope="session")
-def collateral_whale(accounts):
+def collateral_whale(accounts, mock_protocol):
+    if mock_protocol:
+        yield mock_protocol.whale
+        return
     yield accounts.at("0x2F0b23f53734252Bda2277357e97e1517d6B042A", force=True)
 
 
-@pytest.fixture(scope="function")
-def collateral_amount(borrower, collateral, collateral_whale, bento_box, kashi_pair_0):
+@pytest.fixture(scope="session")
+def collateral_amount(
+    chain_image, borrower, collateral, collateral_whale, bento_box, kashi_pair_0
+):
+    yield cached(
+        chain_image,
+        "collateral_amount",
+        lambda: deposit_collateral(
+            borrower, collateral, collateral_whale, bento_box, kashi_pair_0
+        ),
+    )
+
+
+def deposit_collateral(borrower, collateral, collateral_whale, bento_box, kashi_pair_0):
     collateral_amount = 1_000_000 * 10 ** collateral.decimals()
     collateral.transfer(borrower, collateral_amount, {"from": collateral_whale})
 
@@ -218,19 +597,154 @@ def collateral_amount(borrower, collateral, collateral_whale, bento_box, kashi_p
         collateral, borrower, kashi_pair_0, collateral_amount, {"from": borrower}
     )
     kashi_pair_0.addCollateral(borrower, True, collateral_amount, {"from": borrower})
-    yield collateral_amount
+    return collateral_amount
 
 
 @pytest.fixture(scope="session")
-def sushi():
-    yield Contract("0x6B3595068778DD592e39A122f4f5a5cF09C90fE2")
+def sushi(mock_protocol, IERC20Metadata):
+    yield at(IERC20Metadata, SUSHI) if not mock_protocol else mock_protocol.sushi
 
 
 @pytest.fixture(scope="session")
-def sushi_whale(accounts):
+def sushi_whale(accounts, mock_protocol):
+    if mock_protocol:
+        yield mock_protocol.whale
+        return
     yield accounts.at("0x8798249c2e607446efb7ad49ec89dd1865ff4272", force=True)
 
 
+@pytest.fixture(scope="session")
+def kashi_reader():
+    yield KashiReader()
+
+
 @pytest.fixture(scope="session")
 def RELATIVE_APPROX():
     yield 1e-5
+
+
+@pytest.fixture(scope="session")
+def mock_protocol(
+    chain_image,
+    accounts,
+    MockERC20,
+    MockBentoBox,
+    MockKashiPair,
+    MockMasterChef,
+    MockUniswapV2Router,
+    MockHealthCheck,
+    MockMulticall3,
+):
+    if forked():
+        yield None
+        return
+    yield chain_image.cached(
+        "mock_protocol",
+        lambda: deploy_mock_protocol(
+            accounts,
+            MockERC20,
+            MockBentoBox,
+            MockKashiPair,
+            MockMasterChef,
+            MockUniswapV2Router,
+            MockHealthCheck,
+            MockMulticall3,
+        ),
+    )
+
+
+def deploy_mock_protocol(
+    accounts,
+    MockERC20,
+    MockBentoBox,
+    MockKashiPair,
+    MockMasterChef,
+    MockUniswapV2Router,
+    MockHealthCheck,
+    MockMulticall3,
+):
+    whale = accounts[9]
+    tx = {"from": whale}
+
+    def etch(address, container):
+        # Copy a freshly deployed mock's runtime code to a hardcoded address
+        code = web3.eth.get_code(container.deploy(tx).address).hex()
+        for method in ("anvil_setCode", "hardhat_setCode", "evm_setAccountCode"):
+            if "error" not in web3.provider.make_request(method, [address, code]):
+                return Contract.from_abi(container._name, address, container.abi)
+        raise RuntimeError(f"{network.show_active()} cannot set code at {address}")
+
+    def erc20(name, symbol, decimals, address=None):
+        token = etch(address, MockERC20) if address else MockERC20.deploy(tx)
+        token.initialize(name, symbol, decimals, tx)
+        token.mint(whale, 10_000_000 * 10 ** decimals, tx)
+        return token
+
+    token = erc20("USD Coin", "USDC", 6)
+    weth = erc20("Wrapped Ether", "WETH", 18, WETH)
+    sushi = erc20("SushiToken", "SUSHI", 18, SUSHI)
+    other = erc20("Dai Stablecoin", "DAI", 18)
+
+    etch(HEALTH_CHECK, MockHealthCheck)
+    etch(MULTICALL3, MockMulticall3)
+
+    master_chef = etch(MASTER_CHEF, MockMasterChef)
+    master_chef.initialize(sushi, 10 * 10 ** 18, tx)
+
+    sushi_router = etch(SUSHI_ROUTER, MockUniswapV2Router)
+    sushi_router.setReserves(sushi, weth, 2_000_000 * 10 ** 18, 5_000 * 10 ** 18, tx)
+    sushi_router.setReserves(weth, token, 20_000 * 10 ** 18, 50_000_000 * 10 ** 6, tx)
+
+    # Seed want in the bentoBox and move its share price off 1:1
+    bento_box = MockBentoBox.deploy(tx)
+    for asset in (token, weth, other):
+        asset.approve(bento_box, 2 ** 256 - 1, tx)
+    bento_box.deposit(token, whale, whale, 1_000_000 * 10 ** 6, 0, tx)
+    bento_box.addProfit(token, 12_345 * 10 ** 6, tx)
+    bento_box.deposit(weth, whale, whale, 1_000_000 * 10 ** 18, 0, tx)
+    bento_box.deposit(other, whale, whale, 1_000_000 * 10 ** 18, 0, tx)
+
+    def kashi_pair(asset, utilization, alloc_point):
+        pair = MockKashiPair.deploy(bento_box, weth, asset, asset.decimals(), tx)
+        bento_box.whitelistMasterContract(pair, True, tx)
+        bento_box.setMasterContractApproval(whale, pair, True, 0, 0, 0, tx)
+
+        # Other lenders and a borrower so interest accrues like on mainnet
+        supplied = 100_000 * 10 ** asset.decimals()
+        pair.addAsset(whale, False, bento_box.toShare(asset, supplied, False), tx)
+        pair.addCollateral(whale, False, 1_000 * 10 ** 18, tx)
+        pair.borrow(whale, supplied * utilization // 100, tx)
+
+        if alloc_point == 0:
+            return pair, 0
+        master_chef.add(alloc_point, pair, tx)
+        return pair, master_chef.poolLength() - 1
+
+    # Utilization below, inside and above the 70-80% target
+    listed = [
+        kashi_pair(token, utilization, alloc_point)
+        for utilization, alloc_point in (
+            (75, 100),
+            (60, 50),
+            (85, 80),
+            (50, 20),
+            (70, 40),
+            (65, 10),
+        )
+    ]
+    unlisted_kashi_pair, _ = kashi_pair(token, 70, 0)
+    other_asset_pair, _ = kashi_pair(other, 70, 0)
+
+    return SimpleNamespace(
+        whale=whale,
+        token=token,
+        weth=weth,
+        sushi=sushi,
+        bento_box=bento_box,
+        master_chef=master_chef,
+        sushi_router=sushi_router,
+        kashi_pairs=[pair for pair, _ in listed],
+        pids=[pid for _, pid in listed],
+        unlisted_kashi_pair=unlisted_kashi_pair,
+        invalid_kashi_pairs=[sushi_router, other_asset_pair],
+    )
@@ -0,0 +1,169 @@
+"""
+Record and replay cache for the JSON-RPC requests a forking dev node sends to
+its upstream.
+
+The node forks from the local proxy in here instead of from the upstream. The
+proxy pins every request to one block, so the state at that block is all that
+ever gets asked for, and answers it from a SQLite store. Misses are forwarded
+upstream and recorded, or fail when the cache is offline.
+
+    python tests/rpc_cache.py --store tests/.rpc_cache.sqlite --upstream $URL
+
+conftest.py starts it in-process with --rpc-cache, see README.md.
+"""
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Tags the proxy rewrites to the pinned block
+BLOCK_TAGS = ("latest", "pending", "safe", "finalized")
+
+
+class CacheMiss(Exception):
+    pass
+
+
+class RpcCache:
+    def __init__(self, store, upstream=None, block=None):
+        # Without an upstream the cache is offline and only replays
+        self.upstream = upstream
+        self.db = sqlite3.connect(
+            store, timeout=60, isolation_level=None, check_same_thread=False
+        )
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key BLOB PRIMARY KEY, response TEXT)"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)"
+        )
+        self.lock = threading.Lock()
+
+        recorded = self.meta("block")
+        if block is None and recorded is None:
+            if upstream is None:
+                raise ValueError(f"{store} is empty, record it with an upstream first")
+            block = int(self.forward("eth_blockNumber", [])["result"], 16)
+        if block is None:
+            block = int(recorded)
+        if recorded is None:
+            self.set_meta("block", block)
+        elif int(recorded) != block:
+            raise ValueError(
+                f"{store} is pinned to block {recorded}, use another store for {block}"
+            )
+        self.block = block
+        self.hits = 0
+        self.misses = 0
+
+    def meta(self, name):
+        row = self.db.execute("SELECT value FROM meta WHERE name = ?", (name,))
+        row = row.fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, name, value):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, str(value))
+            )
+
+    def pin(self, params):
+        return [hex(self.block) if p in BLOCK_TAGS else p for p in params]
+
+    def key(self, method, params):
+        # 16 bytes of sha256 over the canonical request
+        request = json.dumps([method, params], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(request.encode()).digest()[:16]
+
+    def forward(self, method, params):
+        body = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+        request = urllib.request.Request(
+            self.upstream,
+            json.dumps(body).encode(),
+            {"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return json.loads(response.read())
+
+    def request(self, method, params):
+        if method == "eth_blockNumber":
+            return {"result": hex(self.block)}
+        params = self.pin(params or [])
+        key = self.key(method, params)
+        row = self.db.execute("SELECT response FROM responses WHERE key = ?", (key,))
+        row = row.fetchone()
+        if row:
+            self.hits += 1
+            return json.loads(row[0])
+
+        self.misses += 1
+        if self.upstream is None:
+            raise CacheMiss(f"{method} {json.dumps(params)} is not in the cache")
+        response = self.forward(method, params)
+        # Errors may be transient, only results are recorded
+        if "error" not in response:
+            response = {"result": response.get("result")}
+            with self.lock:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?)",
+                    (key, json.dumps(response, separators=(",", ":"))),
+                )
+        return response
+
+    def handle(self, payload):
+        if isinstance(payload, list):
+            return [self.handle(p) for p in payload]
+        try:
+            response = self.request(payload["method"], payload.get("params"))
+        except CacheMiss as e:
+            response = {"error": {"code": -32000, "message": str(e)}}
+        except (OSError, ValueError) as e:
+            # URLError, HTTPError and timeouts of the upstream, or an answer
+            # that is not JSON, fail the request rather than the proxy
+            response = {"error": {"code": -32000, "message": f"upstream: {e}"}}
+        return {"jsonrpc": "2.0", "id": payload.get("id"), **response}
+
+    def serve(self, port=0):
+        # Serves on a daemon thread and returns the url to fork from
+        cache = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers["Content-Length"])
+                payload = json.loads(self.rfile.read(length))
+                body = json.dumps(cache.handle(payload)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--store", required=True)
+    parser.add_argument("--upstream", help="record misses from here, else offline")
+    parser.add_argument("--block", type=int, help="defaults to the recorded block")
+    parser.add_argument("--port", type=int, default=8547)
+    args = parser.parse_args()
+
+    cache = RpcCache(args.store, args.upstream, args.block)
+    url = cache.serve(args.port)
+    print(f"Fork from {url}@{cache.block}")
+    threading.Event().wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ import pytest
 
 def test_borrow_all_withdraw(
     chain,
+    time_travel,
     accounts,
     token,
     vault,
@@ -13,6 +14,7 @@ def test_borrow_all_withdraw(
     strategist,
     amount,
     kashi_pair_0,
+    bento_box,
     borrower,
     collateral_amount,
     RELATIVE_APPROX,
@@ -30,14 +32,12 @@ def test_borrow_all_withdraw(
     strategy.adjustKashiPairRatios([10000, 0, 0, 0], {"from": strategist})
 
     # Sleep for a while to earn yield
-    chain.sleep(360)
-    chain.mine(27)
+    time_travel(360, 27)
 
     # Harvest 2: Realize profit
     before_pps = vault.pricePerShare()
     strategy.harvest()
-    chain.sleep(3600 * 6)  # 6 hrs needed for profits to unlock
-    chain.mine(1)
+    time_travel(3600 * 6)  # 6 hrs needed for profits to unlock
     profit = token.balanceOf(vault.address)  # Profits go to vault
     assert strategy.estimatedTotalAssets() + profit > amount
     assert vault.pricePerShare() >= before_pps
@@ -48,7 +48,7 @@ def test_borrow_all_withdraw(
     vault.withdraw({"from": user})
     assert vault.balanceOf(user) > 0
 
-    repay(kashi_pair_0, token, borrower)
+    repay(kashi_pair_0, bento_box, token, borrower)
 
     before_pps = vault.pricePerShare()
     vault.withdraw({"from": user})
@@ -59,6 +59,7 @@ def test_borrow_all_withdraw(
 
 def test_borrow_all_with_mixed_distribution(
     chain,
+    time_travel,
     accounts,
     token,
     vault,
@@ -67,6 +68,7 @@ def test_borrow_all_with_mixed_distribution(
     strategist,
     amount,
     kashi_pair_0,
+    bento_box,
     borrower,
     collateral_amount,
     RELATIVE_APPROX,
@@ -82,14 +84,12 @@ def test_borrow_all_with_mixed_distribution(
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
     # Sleep for a while to earn yield
-    chain.sleep(360)
-    chain.mine(27)
+    time_travel(360, 27)
 
     # Harvest 2: Realize profit
     before_pps = vault.pricePerShare()
     strategy.harvest()
-    chain.sleep(3600 * 6)  # 6 hrs needed for profits to unlock
-    chain.mine(1)
+    time_travel(3600 * 6)  # 6 hrs needed for profits to unlock
     profit = token.balanceOf(vault.address)  # Profits go to vault
     assert strategy.estimatedTotalAssets() + profit > amount
     assert vault.pricePerShare() >= before_pps
@@ -107,7 +107,7 @@ def test_borrow_all_with_mixed_distribution(
     vault.withdraw({"from": user})
     assert vault.balanceOf(user) > 0
 
-    repay(kashi_pair_0, token, borrower)
+    repay(kashi_pair_0, bento_box, token, borrower)
 
     vault.withdraw({"from": user})
     assert token.balanceOf(user) > amount
@@ -115,6 +115,7 @@ def test_borrow_all_with_mixed_distribution(
 
 def test_borrow_all_harvest(
     chain,
+    time_travel,
     accounts,
     token,
     vault,
@@ -123,6 +124,7 @@ def test_borrow_all_harvest(
     strategist,
     amount,
     kashi_pair_0,
+    bento_box,
     borrower,
     collateral_amount,
     RELATIVE_APPROX,
@@ -141,14 +143,12 @@ def test_borrow_all_harvest(
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
     # Sleep for a while to earn yield
-    chain.sleep(360)
-    chain.mine(27)
+    time_travel(360, 27)
 
     # Harvest 2: Realize profit
     before_pps = vault.pricePerShare()
     strategy.harvest()
-    chain.sleep(3600 * 6)  # 6 hrs needed for profits to unlock
-    chain.mine(1)
+    time_travel(3600 * 6)  # 6 hrs needed for profits to unlock
     profit = token.balanceOf(vault.address)  # Profits go to vault
     assert strategy.estimatedTotalAssets() + profit > amount
     assert vault.pricePerShare() >= before_pps
@@ -157,52 +157,33 @@ def test_borrow_all_harvest(
 
     before_pps = vault.pricePerShare()
     strategy.harvest()
-    chain.sleep(3600 * 6)
-    chain.mine(1)
+    time_travel(3600 * 6)
     assert pytest.approx(before_pps, rel=RELATIVE_APPROX) == vault.pricePerShare()
 
-    repay(kashi_pair_0, token, borrower)
+    repay(kashi_pair_0, bento_box, token, borrower)
 
     before_pps = vault.pricePerShare()
     strategy.harvest()
-    chain.sleep(3600 * 6)
-    chain.mine(1)
+    time_travel(3600 * 6)
     assert vault.pricePerShare() > before_pps
 
 
 def test_borrow_set_ratios(
-    chain,
-    accounts,
+    borrowed,
     token,
-    vault,
-    strategy,
     user,
     strategist,
-    amount,
     kashi_pair_0,
+    bento_box,
     borrower,
-    collateral_amount,
     RELATIVE_APPROX,
 ):
-    # Deposit to the vault
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    assert token.balanceOf(vault.address) == amount
-
-    # Harvest 1: Send funds through the strategy
-    chain.sleep(1)
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
-    strategy.adjustKashiPairRatios([10000, 0, 0, 0], {"from": strategist})
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
-    borrow_all(kashi_pair_0, borrower)
+    vault, strategy, amount = borrowed.vault, borrowed.strategy, borrowed.amount
 
     strategy.adjustKashiPairRatios([2500, 2500, 2500, 2500], {"from": strategist})
     assert strategy.estimatedTotalAssets() >= amount
 
-    repay(kashi_pair_0, token, borrower)
+    repay(kashi_pair_0, bento_box, token, borrower)
 
     vault.withdraw({"from": user})
     assert pytest.approx(token.balanceOf(user), rel=RELATIVE_APPROX) == amount
@@ -210,6 +191,7 @@ def test_borrow_set_ratios(
 
 def test_multiple_users_and_part_borrowed(
     chain,
+    time_travel,
     accounts,
     token,
     vault,
@@ -221,6 +203,7 @@ def test_multiple_users_and_part_borrowed(
     amount_2,
     kashi_pairs,
     kashi_pair_0,
+    bento_box,
     borrower,
     collateral_amount,
     RELATIVE_APPROX,
@@ -265,17 +248,15 @@ def test_multiple_users_and_part_borrowed(
     assert pytest.approx(before_pps, rel=RELATIVE_APPROX) == vault.pricePerShare()
 
     # Sleep for a while to earn yield
-    chain.sleep(360)
-    chain.mine(27)
+    time_travel(360, 27)
 
     # Harvest 3: Realize profit
     before_pps = vault.pricePerShare()
     strategy.harvest({"from": strategist})
-    chain.sleep(3600 * 6)  # 6 hrs needed for profits to unlock
-    chain.mine(1)
+    time_travel(3600 * 6)  # 6 hrs needed for profits to unlock
     assert vault.pricePerShare() >= before_pps
 
-    repay(kashi_pair_0, token, borrower)
+    repay(kashi_pair_0, bento_box, token, borrower)
 
     before_pps = vault.pricePerShare()
     vault.withdraw({"from": user})
@@ -292,31 +273,9 @@ def test_multiple_users_and_part_borrowed(
 
 
 def test_remove_kashi_pair_all_borrowed(
-    chain,
-    token,
-    vault,
-    strategy,
-    amount,
-    gov,
-    user,
-    kashi_pairs,
-    kashi_pair_0,
-    borrower,
-    collateral_amount,
-    RELATIVE_APPROX,
+    borrowed, token, gov, kashi_pair_0, bento_box, borrower
 ):
-    # Deposit to the vault and harvest
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-
-    chain.sleep(1)
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
-    strategy.adjustKashiPairRatios([10000, 0, 0, 0])
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
-    borrow_all(kashi_pair_0, borrower)
+    strategy, amount = borrowed.strategy, borrowed.amount
 
     with brownie.reverts():
         strategy.removeKashiPair(kashi_pair_0, 0, False, {"from": gov})
@@ -324,7 +283,7 @@ def test_remove_kashi_pair_all_borrowed(
     assert strategy.kashiPairs(0)[0] != kashi_pair_0.address
     assert strategy.estimatedTotalAssets() < amount
 
-    repay(kashi_pair_0, token, borrower)
+    repay(kashi_pair_0, bento_box, token, borrower)
 
 
 def borrow_all(kashi_pair_0, borrower):
@@ -334,8 +293,7 @@ def borrow_all(kashi_pair_0, borrower):
     ).return_value[0]
 
 
-def repay(kashi_pair_0, token, borrower):
-    bento_box = Contract(kashi_pair_0.bentoBox())
+def repay(kashi_pair_0, bento_box, token, borrower):
     bento_box.transfer(
         token,
         borrower,
@@ -5,6 +5,7 @@ from brownie import Wei, accounts, Contract, config
 
 def test_clone(
     chain,
+    time_travel,
     gov,
     token,
     strategist,
@@ -73,13 +74,11 @@ def test_clone(
     chain.sleep(1)
     new_strategy.harvest({"from": gov})
 
-    chain.sleep(3600)
-    chain.mine(270)
+    time_travel(3600, 270)
 
     # Get profits and withdraw
     new_strategy.harvest({"from": gov})
-    chain.sleep(3600 * 6)
-    chain.mine(1)
+    time_travel(3600 * 6)
 
     before_pps = vault.pricePerShare()
     vault.withdraw({"from": user})
@@ -87,6 +86,5 @@ def test_clone(
     assert user_end_balance > user_start_balance
 
     # Not sure why this is necassary
-    chain.sleep(3600 * 6)
-    chain.mine(1)
+    time_travel(3600 * 6)
     assert vault.pricePerShare() >= before_pps
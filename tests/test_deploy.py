@@ -0,0 +1,131 @@
+import json
+
+import pytest
+import yaml
+from brownie import web3
+from scripts.deploy import deploy
+
+
+@pytest.fixture
+def manifest(tmp_path, accounts, strategist, keeper, bento_box):
+    # Writes a manifest for the strategies given, deployed by the strategist
+    path = tmp_path / "deploy.yml"
+
+    def manifest(strategies, **settings):
+        path.write_text(
+            yaml.safe_dump(
+                {
+                    "account": list(accounts).index(strategist),
+                    "bento_box": bento_box.address,
+                    "keeper": keeper.address,
+                    "strategies": strategies,
+                    **settings,
+                }
+            )
+        )
+        return path
+
+    yield manifest
+
+
+def spec(vault, kashi_pairs, pids, name=""):
+    return {
+        "name": name,
+        "vault": vault.address,
+        "pairs": [
+            {"kashi_pair": kashi_pair.address, "pid": pid}
+            for kashi_pair, pid in zip(kashi_pairs, pids)
+        ],
+    }
+
+
+def test_deploy(
+    manifest, deploy_vault, strategist, keeper, rewards, kashi_pairs, pids, Strategy
+):
+    vaults = [deploy_vault() for _ in range(4)]
+    strategies = [
+        spec(vaults[0], kashi_pairs, pids, "Original"),
+        spec(vaults[1], kashi_pairs[:2], pids[:2], "Clone"),
+        {**spec(vaults[2], kashi_pairs[2:], pids[2:]), "rewards": rewards.address},
+    ]
+    path = manifest(strategies)
+    nonce = strategist.nonce
+    addresses = deploy(path)
+
+    # One deployment and a transaction per clone
+    assert strategist.nonce == nonce + 3
+    original = Strategy.at(addresses[f"{vaults[0].address}:Original"])
+    assert original.name() == "Original"
+    for vault, strategy in zip(vaults, strategies):
+        address = addresses[f"{vault.address}:{strategy['name']}"]
+        deployed = Strategy.at(address)
+        assert deployed.vault() == vault
+        assert [
+            (deployed.kashiPairs(i)[0], deployed.kashiPairs(i)[1])
+            for i in range(len(strategy["pairs"]))
+        ] == [(pair["kashi_pair"], pair["pid"]) for pair in strategy["pairs"]]
+        assert deployed.strategist() == strategist
+        if address != original.address:
+            # EIP-1167 proxies to the original
+            assert len(web3.eth.get_code(address)) == 45
+            assert deployed.keeper() == keeper
+    assert Strategy.at(addresses[f"{vaults[2].address}:"]).rewards() == rewards
+
+    # Only what is missing is sent again
+    assert deploy(path) == addresses
+    assert strategist.nonce == nonce + 3
+
+    strategies.append(spec(vaults[3], kashi_pairs[:1], pids[:1]))
+    path = manifest(strategies)
+    state_path = path.with_suffix(".state.json")
+    state = json.loads(state_path.read_text())
+    # A transaction that never made it, dropped by the node
+    state[f"{vaults[3].address}:"] = {"tx": "0x" + "11" * 32}
+    state_path.write_text(json.dumps(state))
+    addresses_more = deploy(path)
+    assert strategist.nonce == nonce + 4
+    assert {k: v for k, v in addresses_more.items() if k in addresses} == addresses
+    assert Strategy.at(addresses_more[f"{vaults[3].address}:"]).vault() == vaults[3]
+
+
+def test_deploy_from_original(
+    manifest, strategy, deploy_vault, strategist, kashi_pairs, pids, Strategy
+):
+    vault = deploy_vault()
+    path = manifest(
+        [spec(vault, kashi_pairs, pids, "Clone")], original=strategy.address
+    )
+    addresses = deploy(path)
+    clone = Strategy.at(addresses[f"{vault.address}:Clone"])
+    assert clone.vault() == vault
+    assert clone.name() == "Clone"
+
+
+def test_deploy_validates(
+    manifest,
+    deploy_vault,
+    strategist,
+    kashi_pairs,
+    pids,
+    invalid_kashi_pairs,
+    bento_box,
+):
+    vault = deploy_vault()
+    path = manifest(
+        [
+            spec(vault, kashi_pairs[:2], pids[::-1][:2]),
+            spec(vault, invalid_kashi_pairs, [0, 0], "Invalid"),
+            spec(bento_box, kashi_pairs[:1], pids[:1], "No vault"),
+        ]
+    )
+    nonce = strategist.nonce
+    with pytest.raises(ValueError) as e:
+        deploy(path)
+
+    # Every problem at once, before anything is sent
+    message = str(e.value)
+    assert f"masterChef pool {pids[3]} is not {kashi_pairs[0].address}" in message
+    assert f"{invalid_kashi_pairs[0].address} is not a Kashi pair" in message
+    assert f"{invalid_kashi_pairs[1].address} does not lend the token" in message
+    assert f"{bento_box.address} is not a vault" in message
+    assert strategist.nonce == nonce
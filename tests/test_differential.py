@@ -0,0 +1,259 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+from brownie import accounts, chain, web3
+from brownie.exceptions import VirtualMachineError
+from scripts.simulator import MAX_BPS, Simulation, ints, to_elastic
+
+# Random operation sequences run against the strategy on the mocks and against
+# the model in scripts/simulator.py, after every step both must report the same
+# estimatedTotalAssets, kashiPairEstimatedAssets(i) and harvest profit and
+# loss to the wei. Run more of them with --differential-sequences N
+
+OPERATIONS = (
+    "deposit",
+    "harvest",
+    "tend",
+    "withdraw",
+    "adjust_ratios",
+    "borrow",
+    "repay",
+)
+STEPS = 12
+# Seconds between steps, from the same block to days of accrual
+SLEEPS = (0, 1, 60, 3600, 86400, 7 * 86400)
+
+
+def pytest_generate_tests(metafunc):
+    if "seed" in metafunc.fixturenames:
+        count = metafunc.config.getoption("--differential-sequences")
+        metafunc.parametrize("seed", range(count))
+
+
+@pytest.fixture(scope="module")
+def differential(
+    mock_protocol,
+    deploy_vault,
+    strategist,
+    keeper,
+    gov,
+    Strategy,
+    bento_box,
+    kashi_pair_0,
+    kashi_pair_1,
+    kashi_pair_2,
+    unlisted_kashi_pair,
+    pid_0,
+    pid_1,
+    pid_2,
+):
+    if not mock_protocol:
+        pytest.skip("the model is checked against the mocks, not a fork")
+
+    # Three staked pairs and one without a pid
+    kashi_pairs = [kashi_pair_0, kashi_pair_1, kashi_pair_2, unlisted_kashi_pair]
+    pids = [pid_0, pid_1, pid_2, 0]
+    vault = deploy_vault()
+    strategy = strategist.deploy(Strategy, vault, bento_box, kashi_pairs, pids, "")
+    strategy.setKeeper(keeper)
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
+    # SUSHI rewards are not modelled, never sell them for want
+    strategy.setMinSushiSellValue(2 ** 96 - 1, {"from": strategist})
+
+    yield SimpleNamespace(
+        vault=vault,
+        strategy=strategy,
+        kashi_pairs=kashi_pairs,
+        pids=pids,
+        vault_account=impersonate(vault),
+    )
+
+
+def test_differential(
+    seed,
+    differential,
+    mock_protocol,
+    token,
+    bento_box,
+    user,
+    reserve,
+    keeper,
+    strategist,
+):
+    rng = random.Random(seed)
+    strategy = differential.strategy
+    strategy.setDepositChunks(rng.choice([0, 1, 5, 20]), {"from": strategist})
+    # Only harvestTrigger reads the window, the model never needs it
+    strategy.setAccrueStalenessWindow(rng.choice([0, 0, 3600]), {"from": strategist})
+
+    s = SimpleNamespace(
+        rng=rng,
+        model=load_model(differential, token, bento_box, mock_protocol.master_chef),
+        token=token,
+        user=user,
+        reserve=reserve,
+        keeper=keeper,
+        strategist=strategist,
+        whale=mock_protocol.whale,
+        **vars(differential),
+    )
+
+    operations = ["deposit", "harvest"]
+    operations += [rng.choice(OPERATIONS) for _ in range(STEPS)]
+    for step, operation in enumerate(operations):
+        chain.sleep(rng.choice(SLEEPS))
+        globals()[operation](s)
+
+        where = f"seed {seed}, step {step}: {' '.join(operations[: step + 1])}"
+        assert (
+            strategy.estimatedTotalAssets() == s.model.estimated_total_assets()[0]
+        ), where
+        expected = s.model.kashi_pair_estimated_assets()[0]
+        for i in range(len(expected)):
+            assert strategy.kashiPairEstimatedAssets(i) == expected[i], where
+
+
+def deposit(s):
+    # Only the vault holds it until the next harvest
+    amount = s.rng.randint(1, 10_000) * 10 ** s.token.decimals()
+    s.token.transfer(s.user, amount, {"from": s.reserve})
+    s.token.approve(s.vault, amount, {"from": s.user})
+    s.vault.deposit(amount, {"from": s.user})
+
+
+def harvest(s):
+    # The vault's side of the report is read from the chain
+    debt = int(s.vault.strategies(s.strategy).dict()["totalDebt"])
+    debt_outstanding = int(s.vault.debtOutstanding(s.strategy))
+    tx = send(s, s.strategy.harvest, {"from": s.keeper})
+    profit, loss, debt_payment = s.model.prepare_return(debt, debt_outstanding)
+    assert tx is not None and not s.model.reverted[0]
+
+    reported = tx.events["StrategyReported"]
+    s.model.fund(
+        int(reported["debtAdded"]) - int(reported["gain"]) - int(reported["debtPaid"])
+    )
+    s.model.adjust_position()
+    assert not s.model.reverted[0]
+
+    harvested = tx.events["Harvested"]
+    assert harvested["profit"] == profit[0]
+    assert harvested["loss"] == loss[0]
+    assert harvested["debtPayment"] == debt_payment[0]
+
+
+def tend(s):
+    tx = send(s, s.strategy.tend, {"from": s.keeper})
+    s.model.adjust_position()
+    assert (tx is None) == s.model.reverted[0]
+
+
+def withdraw(s):
+    # The vault pulling want for a user, its share math is not modelled
+    amount = s.model.estimated_total_assets()[0] * s.rng.randint(1, 110) // 100
+    before = s.token.balanceOf(s.vault)
+    tx = send(s, s.strategy.withdraw, amount, {"from": s.vault_account})
+    freed, _ = s.model.withdraw(amount)
+    assert (tx is None) == s.model.reverted[0]
+    assert s.token.balanceOf(s.vault) - before == (0 if tx is None else freed[0])
+
+
+def adjust_ratios(s):
+    pairs = len(s.kashi_pairs)
+    if s.rng.random() < 0.3:
+        # Everything in one pair
+        ratios = [0] * pairs
+        ratios[s.rng.randrange(pairs)] = MAX_BPS
+    else:
+        cuts = sorted(s.rng.randint(0, MAX_BPS) for _ in range(pairs - 1))
+        ratios = [b - a for a, b in zip([0] + cuts, cuts + [MAX_BPS])]
+    tx = send(s, s.strategy.adjustKashiPairRatios, ratios, {"from": s.strategist})
+    s.model.adjust_kashi_pair_ratios([ratios])
+    assert (tx is None) == s.model.reverted[0]
+
+
+def borrow(s):
+    # Up to 90% of what a pair has not lent out yet
+    i = s.rng.randrange(len(s.kashi_pairs))
+    liquid = to_elastic(
+        s.model.bento_elastic[0],
+        s.model.bento_base[0],
+        s.model.asset_elastic[0, i],
+        False,
+    ).item()
+    amount = max(liquid * s.rng.randint(1, 90) // 100, 1)
+    tx = send(s, s.kashi_pairs[i].borrow, s.whale, amount, {"from": s.whale})
+    s.model.borrow([one_pair(s, i, amount)])
+    assert (tx is None) == s.model.reverted[0]
+
+
+def repay(s):
+    i = s.rng.randrange(len(s.kashi_pairs))
+    kashi_pair = s.kashi_pairs[i]
+    part = int(kashi_pair.userBorrowPart(s.whale)) * s.rng.randint(1, 100) // 100
+    part = max(part, 1)
+    tx = send(s, kashi_pair.repay, s.whale, False, part, {"from": s.whale})
+    s.model.repay([one_pair(s, i, part)])
+    assert (tx is None) == s.model.reverted[0]
+
+
+def send(s, method, *args):
+    # The model moves to the block the transaction was mined in
+    try:
+        tx = method(*args)
+    except VirtualMachineError:
+        tx = None
+    s.model.now = ints([chain[-1].timestamp])
+    return tx
+
+
+def one_pair(s, i, value):
+    values = [0] * len(s.kashi_pairs)
+    values[i] = value
+    return values
+
+
+def load_model(differential, token, bento_box, master_chef):
+    # The model starts from the state on chain, one scenario per sequence
+    strategy = differential.strategy
+    kashi_pairs = differential.kashi_pairs
+    pids = differential.pids
+
+    total_assets = [kashi_pair.totalAsset() for kashi_pair in kashi_pairs]
+    total_borrows = [kashi_pair.totalBorrow() for kashi_pair in kashi_pairs]
+    accrue_infos = [kashi_pair.accrueInfo() for kashi_pair in kashi_pairs]
+
+    def row(values, index):
+        return [[int(value[index]) for value in values]]
+
+    bento = bento_box.totals(token)
+    model = Simulation(
+        now=[chain[-1].timestamp],
+        bento=([int(bento[0])], [int(bento[1])]),
+        total_asset=(row(total_assets, 0), row(total_assets, 1)),
+        total_borrow=(row(total_borrows, 0), row(total_borrows, 1)),
+        interest_per_second=row(accrue_infos, 0),
+        last_accrued=row(accrue_infos, 1),
+        staked=[pid != 0 for pid in pids],
+        dust=int(strategy.dustThreshold()),
+        deposit_chunks=int(strategy.depositChunks()),
+    )
+    model.want = ints([int(token.balanceOf(strategy))])
+    model.shares = ints([int(bento_box.balanceOf(token, strategy))])
+    model.fraction_in_pair = ints(
+        [[int(kashi_pair.balanceOf(strategy)) for kashi_pair in kashi_pairs]]
+    )
+    model.fraction_in_master_chef = ints(
+        [[int(master_chef.userInfo(pid, strategy)[0]) if pid else 0 for pid in pids]]
+    )
+    return model
+
+
+def impersonate(contract):
+    # The vault calls strategy.withdraw itself, give it gas money
+    for method in ("anvil_setBalance", "hardhat_setBalance", "evm_setAccountBalance"):
+        response = web3.provider.make_request(method, [contract.address, hex(10 ** 18)])
+        if "error" not in response:
+            break
+    return accounts.at(contract.address, force=True)
@@ -4,7 +4,17 @@ import pytest
 
 
 def test_want_donation(
-    chain, accounts, user, gov, amount, token, reserve, vault, strategy, RELATIVE_APPROX
+    chain,
+    time_travel,
+    accounts,
+    user,
+    gov,
+    amount,
+    token,
+    reserve,
+    vault,
+    strategy,
+    RELATIVE_APPROX,
 ):
     # Deposit to the vault
     token.approve(vault.address, amount, {"from": user})
@@ -15,8 +25,7 @@ def test_want_donation(
     strategy.harvest()
 
     # earn some yield
-    chain.sleep(3600)
-    chain.mine(270)
+    time_travel(3600, 270)
 
     # donate want tokens
     donation_amount = 1000 * 10 ** token.decimals()
@@ -33,13 +42,13 @@ def test_want_donation(
     profit = tx.events["Harvested"]["profit"]
     assert profit >= donation_amount
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-    chain.sleep(3600 * 6)
-    chain.mine(1)
+    time_travel(3600 * 6)
     assert before_pps < vault.pricePerShare()
 
 
 def test_sushi_donation(
     chain,
+    time_travel,
     accounts,
     user,
     gov,
@@ -73,6 +82,46 @@ def test_sushi_donation(
     chain.sleep(1)
     strategy.harvest()
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-    chain.sleep(3600 * 6)
-    chain.mine(1)
+    time_travel(3600 * 6)
     assert before_pps < vault.pricePerShare()
+
+
+def test_sushi_below_sell_threshold(
+    chain,
+    user,
+    gov,
+    strategist,
+    token,
+    amount,
+    sushi,
+    sushi_whale,
+    vault,
+    strategy,
+):
+    # Deposit to the vault
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+
+    # Harvest 1: Send funds through the strategy
+    chain.sleep(1)
+    strategy.harvest()
+
+    # Only sell once the sushi is worth 1m want
+    strategy.setMinSushiSellValue(
+        1_000_000 * 10 ** token.decimals(), {"from": strategist}
+    )
+    strategy.setMinPendingSushi(10 ** sushi.decimals(), {"from": strategist})
+
+    donation_amount = 10 * 10 ** sushi.decimals()
+    sushi.transfer(strategy, donation_amount, {"from": sushi_whale})
+
+    chain.sleep(1)
+    strategy.harvest()
+    assert sushi.balanceOf(strategy) >= donation_amount
+
+    # Dropping the threshold sells everything on the next harvest
+    strategy.setDoHealthCheck(False, {"from": gov})
+    strategy.setMinSushiSellValue(0, {"from": strategist})
+    chain.sleep(1)
+    strategy.harvest()
+    assert sushi.balanceOf(strategy) == 0
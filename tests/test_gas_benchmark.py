@@ -0,0 +1,164 @@
+import pytest
+from test_adverse import borrow_all
+
+# Run with --gas-benchmark to compare against tests/gas_baseline.json, or with
+# --update-gas-baseline to rewrite it
+pytestmark = pytest.mark.gas_benchmark
+
+MAX_PAIRS = 5
+
+pair_counts = pytest.mark.parametrize("pair_count", range(1, MAX_PAIRS + 1))
+# empty: nothing deposited, funded: deposited and spread over every pair,
+# borrowed: funded and kashi_pair_0 borrowed out
+states = pytest.mark.parametrize("state", ["empty", "funded", "borrowed"])
+funded_states = pytest.mark.parametrize("state", ["funded", "borrowed"])
+
+
+@pytest.fixture
+def benchmark_pairs(
+    kashi_pair_0,
+    kashi_pair_1,
+    kashi_pair_2,
+    kashi_pair_3,
+    kashi_pair_4,
+    kashi_pair_5,
+    pid_0,
+    pid_1,
+    pid_2,
+    pid_3,
+    pid_4,
+    pid_5,
+):
+    yield [
+        (kashi_pair_0, pid_0),
+        (kashi_pair_1, pid_1),
+        (kashi_pair_2, pid_2),
+        (kashi_pair_3, pid_3),
+        (kashi_pair_4, pid_4),
+        (kashi_pair_5, pid_5),
+    ]
+
+
+@pytest.fixture
+def deploy(
+    request,
+    chain,
+    time_travel,
+    strategist,
+    keeper,
+    gov,
+    user,
+    token,
+    deploy_vault,
+    Strategy,
+    bento_box,
+    amount,
+    borrower,
+    benchmark_pairs,
+):
+    # Every call gets its own vault, the module vault may already have a
+    # strategy taking the whole debt ratio
+    def deploy(pair_count, state):
+        vault = deploy_vault()
+        kashi_pairs, pids = zip(*benchmark_pairs[:pair_count])
+        strategy = strategist.deploy(Strategy, vault, bento_box, kashi_pairs, pids, "")
+        strategy.setKeeper(keeper)
+        vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
+        if state == "empty":
+            return vault, strategy
+
+        token.approve(vault.address, amount, {"from": user})
+        vault.deposit(amount, {"from": user})
+        chain.sleep(1)
+        strategy.harvest({"from": keeper})
+        strategy.adjustKashiPairRatios(even_ratios(pair_count), {"from": strategist})
+
+        if state == "borrowed":
+            request.getfixturevalue("collateral_amount")
+            borrow_all(kashi_pairs[0], borrower)
+
+        # Let interest and rewards accrue before the measured call
+        time_travel(3600)
+        return vault, strategy
+
+    yield deploy
+
+
+@states
+@pair_counts
+def test_harvest(deploy, keeper, gas_used, pair_count, state):
+    _, strategy = deploy(pair_count, state)
+    gas_used(strategy.harvest({"from": keeper}))
+
+
+@states
+@pair_counts
+def test_tend(deploy, keeper, gas_used, pair_count, state):
+    _, strategy = deploy(pair_count, state)
+    gas_used(strategy.tend({"from": keeper}))
+
+
+@funded_states
+@pair_counts
+def test_withdraw(deploy, user, gas_used, pair_count, state):
+    vault, _ = deploy(pair_count, state)
+    gas_used(vault.withdraw({"from": user}))
+
+
+@states
+@pair_counts
+def test_adjust_ratios(deploy, strategist, gas_used, pair_count, state):
+    _, strategy = deploy(pair_count, state)
+    # Move everything into the last pair
+    ratios = [0] * (pair_count - 1) + [10_000]
+    gas_used(strategy.adjustKashiPairRatios(ratios, {"from": strategist}))
+
+
+@states
+@pytest.mark.parametrize("pair_count", range(1, MAX_PAIRS))
+def test_add_kashi_pair(deploy, gov, benchmark_pairs, gas_used, pair_count, state):
+    _, strategy = deploy(pair_count, state)
+    kashi_pair, pid = benchmark_pairs[pair_count]
+    gas_used(strategy.addKashiPair(kashi_pair, pid, {"from": gov}))
+
+
+@states
+@pair_counts
+def test_remove_kashi_pair(deploy, gov, benchmark_pairs, gas_used, pair_count, state):
+    _, strategy = deploy(pair_count, state)
+    kashi_pair, _ = benchmark_pairs[pair_count - 1]
+    gas_used(strategy.removeKashiPair(kashi_pair, pair_count - 1, True, {"from": gov}))
+
+
+@pair_counts
+def test_clone(
+    deploy,
+    strategist,
+    rewards,
+    keeper,
+    bento_box,
+    benchmark_pairs,
+    gas_used,
+    pair_count,
+):
+    vault, strategy = deploy(pair_count, "empty")
+    kashi_pairs, pids = zip(*benchmark_pairs[:pair_count])
+    gas_used(
+        strategy.cloneKashiLender(
+            vault,
+            strategist,
+            rewards,
+            keeper,
+            bento_box,
+            kashi_pairs,
+            pids,
+            "",
+            {"from": strategist},
+        )
+    )
+
+
+def even_ratios(pair_count):
+    ratios = [10_000 // pair_count] * pair_count
+    ratios[0] += 10_000 - sum(ratios)
+    return ratios
@@ -0,0 +1,134 @@
+import asyncio
+
+from brownie import web3
+from scripts.indexer import Index, Indexer, connect
+from scripts.multicall import Rpc
+
+
+class CountingRpc(Rpc):
+    # Records the block ranges of the eth_getLogs sent
+    def __init__(self, url):
+        super().__init__(url)
+        self.ranges = []
+
+    async def batch(self, requests):
+        for method, params in requests:
+            if method == "eth_getLogs":
+                self.ranges.append(
+                    (int(params[0]["fromBlock"], 16), int(params[0]["toBlock"], 16))
+                )
+        return await super().batch(requests)
+
+
+def update(db, start_block=None, strategies=()):
+    async def main():
+        async with CountingRpc(web3.provider.endpoint_uri) as rpc:
+            indexer = Indexer(db, rpc, blocks_per_request=100)
+            if strategies:
+                await indexer.track(strategies, start_block)
+            await indexer.update()
+            return rpc.ranges
+
+    return asyncio.run(main())
+
+
+def test_index(
+    chain,
+    time_travel,
+    funded,
+    deploy_vault,
+    gov,
+    strategist,
+    rewards,
+    keeper,
+    bento_box,
+    kashi_pairs,
+    pids,
+    token,
+    user,
+    reserve,
+    Strategy,
+):
+    strategy, vault = funded.strategy, funded.vault
+    start_block = chain.height + 1
+    time_travel(3600, 10)
+    harvests = [strategy.harvest({"from": strategist})]
+
+    # A clone on a vault of its own, found through the original's Cloned
+    clone_vault = deploy_vault()
+    tx = strategy.cloneKashiLender(
+        clone_vault,
+        strategist,
+        rewards,
+        keeper,
+        bento_box,
+        kashi_pairs,
+        pids,
+        "",
+        {"from": gov},
+    )
+    clone = Strategy.at(tx.return_value)
+    clone_vault.addStrategy(clone, 10_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
+    token.transfer(user, funded.amount, {"from": reserve})
+    token.approve(clone_vault, funded.amount, {"from": user})
+    clone_vault.deposit(funded.amount, {"from": user})
+    clone_harvest = clone.harvest({"from": strategist})
+
+    time_travel(3600, 10)
+    harvests.append(strategy.harvest({"from": strategist}))
+
+    db = connect(":memory:")
+    ranges = update(db, start_block, [strategy])
+    index = Index(db)
+
+    assert index.strategies() == {
+        strategy.address: vault.address,
+        clone.address: clone_vault.address,
+    }
+    assert index.clones(strategy) == [clone.address]
+    for harvest, tx in zip(index.harvests(strategy), harvests):
+        event = tx.events["Harvested"]
+        assert (harvest.block, harvest.timestamp) == (tx.block_number, tx.timestamp)
+        assert harvest.profit == event["profit"]
+        assert harvest.debt_payment == event["debtPayment"]
+    for report, tx in zip(index.reports(strategy), harvests):
+        assert report.gain == tx.events["StrategyReported"]["gain"]
+        assert report.total_debt == tx.events["StrategyReported"]["totalDebt"]
+    assert len(index.harvests(strategy)) == len(harvests)
+    for pair_assets, tx in zip(index.pair_assets(strategy), harvests):
+        event = tx.events["KashiPairsHarvested"]
+        assert pair_assets.block == tx.block_number
+        assert pair_assets.assets == {
+            str(kashi_pair): assets
+            for kashi_pair, assets in zip(event["kashiPairs"], event["kashiPairAssets"])
+        }
+        assert pair_assets.total_assets == event["totalAssets"]
+    assert len(index.pair_assets(strategy)) == len(harvests)
+    assert [h.block for h in index.harvests(clone)] == [clone_harvest.block_number]
+
+    # Profit over the debt between the two harvests
+    assert len(index.apr(strategy)) == 1
+    assert index.apr(strategy)[0][1] > 0
+    assert index.profit_and_loss(strategy)[-1][2] == sum(
+        tx.events["Harvested"]["profit"] - tx.events["Harvested"]["loss"]
+        for tx in harvests
+    )
+
+    # Nothing fetched twice, ranges start where the last ones ended
+    assert min(start for start, _ in ranges) == start_block
+    assert max(end for _, end in ranges) == chain.height
+    assert update(db) == []
+
+    time_travel(3600, 10)
+    tx = strategy.harvest({"from": strategist})
+    indexed = max(end for _, end in ranges)
+    assert all(start > indexed for start, _ in update(db))
+    assert index.harvests(strategy)[-1].block == tx.block_number
+
+    # Each pair's balance follows from the clone's deposits and withdrawals
+    state = clone.strategyState().dict()
+    fractions = {pair[0]: pair[4] + pair[5] for pair in state["kashiPairs"]}
+    balances = index.pair_balances(clone)
+    assert balances
+    for kashi_pair, balance in balances.items():
+        assert balance == fractions[kashi_pair]
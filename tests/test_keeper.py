@@ -0,0 +1,223 @@
+import asyncio
+import json
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from brownie import web3
+from scripts.keeper import Keeper, Signer
+from scripts.multicall import Rpc, RpcError
+
+YEAR = 365 * 24 * 3600
+
+
+@pytest.fixture(scope="module")
+def clones(
+    strategy,
+    Strategy,
+    deploy_vault,
+    gov,
+    strategist,
+    rewards,
+    keeper,
+    bento_box,
+    kashi_pairs,
+    pids,
+    token,
+    reserve,
+    user,
+):
+    # Clones on vaults of their own, each with a deposit waiting for a harvest
+    clones = []
+    for _ in range(3):
+        vault = deploy_vault()
+        tx = strategy.cloneKashiLender(
+            vault,
+            strategist,
+            rewards,
+            keeper,
+            bento_box,
+            kashi_pairs,
+            pids,
+            "",
+            {"from": gov},
+        )
+        clone = Strategy.at(tx.return_value)
+        vault.addStrategy(clone, 10_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
+        # SUSHI rewards would make harvests due block by block
+        clone.setMinSushiSellValue(2 ** 96 - 1, {"from": strategist})
+
+        amount = 10_000 * 10 ** token.decimals()
+        token.transfer(user, amount, {"from": reserve})
+        token.approve(vault, amount, {"from": user})
+        vault.deposit(amount, {"from": user})
+        clones.append(clone)
+    yield clones
+
+
+@pytest.fixture
+def rate_limited():
+    # Serves the node behind a proxy that answers 429 to the requests
+    # limited(payload) picks, as a provider over its quota does
+    servers = []
+
+    def serve(limited):
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                if limited(json.loads(body)):
+                    self.send_response(429)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                request = urllib.request.Request(
+                    web3.provider.endpoint_uri,
+                    body,
+                    {"Content-Type": "application/json"},
+                )
+                with urllib.request.urlopen(request) as response:
+                    body = response.read()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def keep(clones, keeper, Strategy, session, url=None):
+    # Runs session(service) against the node brownie is connected to, or url
+    async def main():
+        async with Rpc(url or web3.provider.endpoint_uri) as rpc:
+            service = Keeper(rpc, [Signer(keeper.address)], clones, Strategy.abi)
+            return await session(service)
+
+    return asyncio.run(main())
+
+
+def test_read(clones, keeper, Strategy):
+    async def session(service):
+        return await service.read(web3.eth.block_number, 0)
+
+    reads = keep(clones, keeper, Strategy, session)
+    for clone, strategy_reads in zip(clones, reads):
+        assert strategy_reads.strategy == clone.address
+        assert strategy_reads.state["totalAssets"] == clone.estimatedTotalAssets()
+        assert len(strategy_reads.state["kashiPairs"]) == 4
+        # Deposits wait in the vaults
+        assert strategy_reads.action() == "harvest"
+
+
+def test_harvest(clones, keeper, token, Strategy, RELATIVE_APPROX):
+    nonce = keeper.nonce
+
+    async def session(service):
+        sent = await service.step()
+        await service.wait()
+        return sent, await service.step()
+
+    sent, sent_next = keep(clones, keeper, Strategy, session)
+
+    # All in one step, nonces counted by the keeper
+    assert [(job.strategy, action) for job, action in sent] == [
+        (clone.address, "harvest") for clone in clones
+    ]
+    assert keeper.nonce == nonce + len(clones)
+    for clone in clones:
+        assert (
+            pytest.approx(clone.estimatedTotalAssets(), rel=RELATIVE_APPROX)
+            == 10_000 * 10 ** token.decimals()
+        )
+        assert token.balanceOf(clone) == 0
+
+    # Nothing left that pays for the gas
+    assert sent_next == []
+
+
+def test_tend(clones, keeper, strategist, Strategy):
+    async def harvest(service):
+        await service.step()
+        await service.wait()
+
+    keep(clones, keeper, Strategy, harvest)
+
+    # A removed pair leaves its want idle until a tend or harvest
+    clone = clones[1]
+    clone.setMaxReportDelay(YEAR, {"from": strategist})
+    clone.setProfitFactor(1, {"from": strategist})
+    assets = [clone.kashiPairEstimatedAssets(i) for i in range(4)]
+    i = assets.index(max(assets))
+    clone.removeKashiPair(clone.kashiPairs(i)[0], i, False, {"from": strategist})
+    idle = clone.strategyState().dict()["idleWant"]
+    assert idle > 0
+
+    async def tend(service):
+        sent = await service.step()
+        await service.wait()
+        return sent
+
+    sent = keep(clones, keeper, Strategy, tend)
+    assert [(job.strategy, action) for job, action in sent] == [(clone.address, "tend")]
+    assert clone.strategyState().dict()["idleWant"] < idle
+
+
+def test_rate_limited(clones, keeper, Strategy, rate_limited):
+    url = rate_limited(lambda payload: True)
+
+    async def request():
+        async with Rpc(url) as rpc:
+            return await rpc.request("eth_chainId")
+
+    with pytest.raises(RpcError) as e:
+        asyncio.run(request())
+    assert e.value.error["code"] == 429
+
+    # Steps that fail are logged and retried, run keeps going
+    async def run(service):
+        service.poll_interval = 0.1
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(service.run(), 1)
+        return service.block
+
+    assert keep(clones, keeper, Strategy, run, url) is None
+
+
+def test_rate_limited_send(clones, keeper, Strategy, rate_limited):
+    # Only the first clone's harvest is refused
+    def limited(payload):
+        return (
+            isinstance(payload, dict)
+            and payload["method"] == "eth_estimateGas"
+            and payload["params"][0]["to"] == clones[0].address
+        )
+
+    url = rate_limited(limited)
+    nonce = keeper.nonce
+
+    async def session(service):
+        sent = await service.step()
+        await service.wait()
+        return sent, service.jobs[0].pending
+
+    sent, pending = keep(clones, keeper, Strategy, session, url)
+
+    # The other harvests still go out in the same step
+    assert [(job.strategy, action) for job, action in sent] == [
+        (clone.address, "harvest") for clone in clones[1:]
+    ]
+    assert pending is None
+    assert keeper.nonce == nonce + len(clones) - 1
@@ -48,7 +48,16 @@ def test_migration(
 
 
 def test_new_kashi_pair(
-    chain, token, vault, strategy, amount, gov, user, kashi_pairs, RELATIVE_APPROX
+    chain,
+    token,
+    vault,
+    strategy,
+    amount,
+    gov,
+    user,
+    kashi_pairs,
+    unlisted_kashi_pair,
+    RELATIVE_APPROX,
 ):
     # Deposit to the vault and harvest
     token.approve(vault.address, amount, {"from": user})
@@ -58,7 +67,7 @@ def test_new_kashi_pair(
     strategy.harvest()
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
-    new_kashi_pair = Contract("0x40a12179260997c55619DE3290c5b9918588E791")
+    new_kashi_pair = unlisted_kashi_pair
     strategy.addKashiPair(new_kashi_pair, 0, {"from": gov})
     assert (
         strategy.kashiPairs(len(kashi_pairs)).dict()["kashiPair"]
@@ -78,80 +87,48 @@ def test_add_existing_kashi_pair(
         strategy.addKashiPair(kashi_pair_0, 0, {"from": gov})
 
 
-def test_remove_kashi_pair(
-    chain,
-    token,
-    vault,
-    strategy,
-    amount,
-    gov,
-    user,
-    kashi_pairs,
-    kashi_pair_0,
-    RELATIVE_APPROX,
-):
-    # Deposit to the vault and harvest
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-
-    chain.sleep(1)
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
+def test_remove_kashi_pair(chain, funded, gov, kashi_pair_0, RELATIVE_APPROX):
+    strategy = funded.strategy
+    assert (
+        pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX)
+        == funded.amount
+    )
 
     strategy.removeKashiPair(kashi_pair_0, 0, False, {"from": gov})
     assert strategy.kashiPairs(0)[0] != kashi_pair_0.address
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
+    assert (
+        pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX)
+        == funded.amount
+    )
 
     chain.sleep(1)
     strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
+    assert (
+        pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX)
+        == funded.amount
+    )
 
-def test_remove_all_kashi_pairs(
-    chain,
-    token,
-    vault,
-    strategy,
-    amount,
-    gov,
-    user,
-    kashi_pairs,
-    RELATIVE_APPROX,
-):
-    # Deposit to the vault and harvest
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
 
-    chain.sleep(1)
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
+def test_remove_all_kashi_pairs(funded, gov, kashi_pairs, RELATIVE_APPROX):
+    strategy = funded.strategy
 
     # based on the removal logic, the indexes will be determinstic and it's easier to hardcode
     for kashi_pair, i in zip(kashi_pairs, [0, 1, 1, 0]):
         strategy.removeKashiPair(kashi_pair, i, False, {"from": gov})
         assert (
             pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX)
-            == amount
+            == funded.amount
         )
 
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
-
-def test_invalid_new_kashi_pair(
-    chain, token, vault, strategy, amount, gov, user, RELATIVE_APPROX
-):
-    # Deposit to the vault and harvest
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
+    assert (
+        pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX)
+        == funded.amount
+    )
 
-    chain.sleep(1)
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
-    invalid_kashi_pair = Contract("0x11111112542D85B3EF69AE05771c2dCCff4fAa26")
-    with brownie.reverts():
-        strategy.addKashiPair(invalid_kashi_pair, 0, {"from": gov})
+def test_invalid_new_kashi_pair(funded, gov, invalid_kashi_pairs):
+    strategy = funded.strategy
 
-    invalid_kashi_pair = Contract("0x809F2B68f59272740508333898D4e9432A839C75")
-    with brownie.reverts():
-        strategy.addKashiPair(invalid_kashi_pair, 0, {"from": gov})
+    for invalid_kashi_pair in invalid_kashi_pairs:
+        with brownie.reverts():
+            strategy.addKashiPair(invalid_kashi_pair, 0, {"from": gov})
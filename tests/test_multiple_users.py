@@ -0,0 +1,167 @@
+import pytest
+from brownie import web3
+
+
+def test_multiple_users(
+    chain,
+    time_travel,
+    accounts,
+    token,
+    vault,
+    strategy,
+    user,
+    user_2,
+    strategist,
+    amount,
+    amount_2,
+    kashi_pairs,
+    RELATIVE_APPROX,
+):
+    # Deposit to the vault
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    assert token.balanceOf(vault.address) == amount
+
+    # Harvest 1: Send funds through the strategy
+    chain.sleep(1)
+    strategy.harvest()
+    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
+
+    # Sleep for a while to earn yield
+    time_travel(360, 27)
+
+    token.approve(vault.address, amount, {"from": user_2})
+    vault.deposit(amount_2, {"from": user_2})
+    assert token.balanceOf(vault.address) >= amount_2
+
+    # Sleep for a while to earn yield
+    time_travel(3600, 270)
+
+    # Harvest 2: Realize profit
+    before_pps = vault.pricePerShare()
+    strategy.harvest()
+    time_travel(3600 * 6)  # 6 hrs needed for profits to unlock
+    profit = token.balanceOf(vault.address)  # Profits go to vault
+    assert strategy.estimatedTotalAssets() + profit > amount + amount_2
+    assert vault.pricePerShare() >= before_pps
+
+    before_pps = vault.pricePerShare()
+    vault.withdraw({"from": user_2})
+    assert token.balanceOf(user_2) > amount_2
+    assert pytest.approx(token.balanceOf(user_2), rel=RELATIVE_APPROX) == amount_2 * (
+        before_pps / 10 ** vault.decimals()
+    )
+    assert pytest.approx(before_pps, rel=RELATIVE_APPROX) == vault.pricePerShare()
+
+    # Sleep for a while to earn yield
+    time_travel(3600, 270)
+
+    # Harvest 2: Realize profit
+    before_pps = vault.pricePerShare()
+    strategy.harvest()
+    time_travel(3600 * 6)  # 6 hrs needed for profits to unlock
+    assert vault.pricePerShare() > before_pps
+
+    before_pps = vault.pricePerShare()
+    vault.withdraw({"from": user})
+    assert pytest.approx(token.balanceOf(user), rel=RELATIVE_APPROX) == amount * (
+        before_pps / 10 ** vault.decimals()
+    )
+
+    # Sleep needed, not sure why
+    time_travel(3600 * 6)
+    assert before_pps <= vault.pricePerShare()
+
+
+def test_multiple_users_and_adjust_ratios(
+    chain,
+    time_travel,
+    accounts,
+    token,
+    vault,
+    strategy,
+    user,
+    user_2,
+    strategist,
+    amount,
+    amount_2,
+    kashi_pairs,
+    pids,
+    kashi_reader,
+    RELATIVE_APPROX,
+):
+    # Deposit to the vault
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    assert token.balanceOf(vault.address) == amount
+
+    # Harvest 1: Send funds through the strategy
+    chain.sleep(1)
+    strategy.harvest()
+    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
+
+    # Sleep for a while to earn yield
+    time_travel(360, 27)
+
+    strategy.adjustKashiPairRatios([2500, 2500, 2500, 2500], {"from": strategist})
+
+    amounts = kashi_reader.read(web3, kashi_pairs, strategy, pids=pids).amounts
+    assert amounts[0] > 0
+    assert amounts == [strategy.kashiPairEstimatedAssets(i) for i in range(len(pids))]
+    for n in range(1, len(kashi_pairs)):
+        assert (
+            pytest.approx(amounts[0] / 10 ** token.decimals(), rel=RELATIVE_APPROX)
+            == amounts[n] / 10 ** token.decimals()
+        )
+
+    token.approve(vault.address, amount, {"from": user_2})
+    vault.deposit(amount_2, {"from": user_2})
+    assert token.balanceOf(vault.address) >= amount_2
+
+    # Sleep for a while to earn yield
+    time_travel(3600, 270)
+
+    # Harvest 2: Realize profit
+    before_pps = vault.pricePerShare()
+    strategy.harvest()
+    time_travel(3600 * 6)  # 6 hrs needed for profits to unlock
+    profit = token.balanceOf(vault.address)  # Profits go to vault
+    assert strategy.estimatedTotalAssets() + profit > amount + amount_2
+    assert vault.pricePerShare() > before_pps
+
+    before_pps = vault.pricePerShare()
+    vault.withdraw({"from": user_2})
+    assert token.balanceOf(user_2) > amount_2
+    assert pytest.approx(token.balanceOf(user_2), rel=RELATIVE_APPROX) == amount_2 * (
+        before_pps / 10 ** vault.decimals()
+    )
+    assert pytest.approx(before_pps, rel=RELATIVE_APPROX) == vault.pricePerShare()
+
+    # Sleep for a while to earn yield
+    time_travel(360, 27)
+
+    # Harvest 2: Realize profit
+    before_pps = vault.pricePerShare()
+    strategy.harvest()
+    time_travel(3600 * 6)  # 6 hrs needed for profits to unlock
+    assert vault.pricePerShare() >= before_pps
+
+    strategy.adjustKashiPairRatios([4000, 2000, 2000, 2000], {"from": strategist})
+    amounts = kashi_reader.read(web3, kashi_pairs, strategy, pids=pids).amounts
+    assert amounts[0] > 0
+    assert amounts == [strategy.kashiPairEstimatedAssets(i) for i in range(len(pids))]
+    for n in range(1, len(kashi_pairs)):
+        assert (
+            pytest.approx(amounts[0] / 10 ** token.decimals(), rel=RELATIVE_APPROX)
+            == amounts[n] * 2 / 10 ** token.decimals()
+        )
+
+    before_pps = vault.pricePerShare()
+    vault.withdraw({"from": user})
+    assert pytest.approx(token.balanceOf(user), rel=RELATIVE_APPROX) == amount * (
+        before_pps / 10 ** vault.decimals()
+    )
+
+    # Sleep needed, not sure why
+    time_travel(3600 * 6)
+    assert before_pps <= vault.pricePerShare()
@@ -1,5 +1,5 @@
 import brownie
-from brownie import Contract
+from brownie import Contract, ZERO_ADDRESS, web3
 import pytest
 
 
@@ -47,7 +47,16 @@ def test_emergency_exit(
 
 
 def test_profitable_harvest(
-    chain, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX
+    chain,
+    time_travel,
+    accounts,
+    token,
+    vault,
+    strategy,
+    user,
+    strategist,
+    amount,
+    RELATIVE_APPROX,
 ):
     # Deposit to the vault
     token.approve(vault.address, amount, {"from": user})
@@ -60,14 +69,12 @@ def test_profitable_harvest(
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
     # Sleep for a while to earn yield
-    chain.sleep(3600 * 6)
-    chain.mine(270 * 6)
+    time_travel(3600 * 6, 270 * 6)
 
     # Harvest 2: Realize profit
     before_pps = vault.pricePerShare()
     strategy.harvest()
-    chain.sleep(3600 * 6)  # 6 hrs needed for profits to unlock
-    chain.mine(1)
+    time_travel(3600 * 6)  # 6 hrs needed for profits to unlock
     profit = token.balanceOf(vault.address)  # Profits go to vault
     assert strategy.estimatedTotalAssets() + profit > amount
     assert vault.pricePerShare() > before_pps
@@ -75,6 +82,7 @@ def test_profitable_harvest(
 
 def test_adjust_ratios(
     chain,
+    time_travel,
     accounts,
     token,
     vault,
@@ -83,6 +91,8 @@ def test_adjust_ratios(
     strategist,
     amount,
     kashi_pairs,
+    pids,
+    kashi_reader,
     RELATIVE_APPROX,
 ):
     # Deposit to the vault
@@ -96,25 +106,23 @@ def test_adjust_ratios(
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
     # Sleep for a while to earn yield
-    chain.sleep(3600)
-    chain.mine(270)
+    time_travel(3600, 270)
 
     strategy.adjustKashiPairRatios([2500, 2500, 2500, 2500], {"from": strategist})
 
+    amounts = kashi_reader.read(web3, kashi_pairs, strategy, pids=pids).amounts
+    assert amounts[0] > 0
+    assert amounts == [strategy.kashiPairEstimatedAssets(i) for i in range(len(pids))]
     for n in range(1, len(kashi_pairs)):
         assert (
-            pytest.approx(
-                kashi_pair_in_want(kashi_pairs[0], strategy) / 10 ** token.decimals(),
-                rel=RELATIVE_APPROX,
-            )
-            == kashi_pair_in_want(kashi_pairs[n], strategy) / 10 ** token.decimals()
+            pytest.approx(amounts[0] / 10 ** token.decimals(), rel=RELATIVE_APPROX)
+            == amounts[n] / 10 ** token.decimals()
         )
 
     # Harvest 2: Realize profit
     before_pps = vault.pricePerShare()
     strategy.harvest()
-    chain.sleep(3600 * 10)  # 6 hrs needed for profits to unlock
-    chain.mine(1)
+    time_travel(3600 * 10)  # 6 hrs needed for profits to unlock
     profit = token.balanceOf(vault.address)  # Profits go to vault
     assert strategy.estimatedTotalAssets() + profit > amount
     assert vault.pricePerShare() >= before_pps
@@ -126,178 +134,278 @@ def test_adjust_ratios(
     )
 
 
-def test_multiple_users(
+def test_split_deposit(
     chain,
-    accounts,
+    time_travel,
     token,
     vault,
     strategy,
     user,
-    user_2,
+    reserve,
     strategist,
     amount,
-    amount_2,
     kashi_pairs,
     RELATIVE_APPROX,
 ):
-    # Deposit to the vault
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    assert token.balanceOf(vault.address) == amount
+    with brownie.reverts():
+        strategy.setDepositChunks(21, {"from": strategist})
 
-    # Harvest 1: Send funds through the strategy
-    chain.sleep(1)
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
+    # Enough to bring the pair paying the most down to the next one
+    deposit = amount * 5
+    token.transfer(user, deposit - amount, {"from": reserve})
+    token.approve(vault.address, deposit, {"from": user})
+    vault.deposit(deposit, {"from": user})
 
-    # Sleep for a while to earn yield
-    chain.sleep(360)
-    chain.mine(27)
+    def supply_rates():
+        # What lending earns in each pair, as highestInterestPair compares
+        pairs = strategy.strategyState().dict()["kashiPairs"]
+        return [pair[9] * pair[8] // 10 ** 18 for pair in pairs]
 
-    token.approve(vault.address, amount, {"from": user_2})
-    vault.deposit(amount_2, {"from": user_2})
-    assert token.balanceOf(vault.address) >= amount_2
+    # The whole deposit in one pair, to compare against
+    chain.sleep(1)
+    strategy.harvest()
+    single_rates = supply_rates()
+    chain.undo()
 
-    # Sleep for a while to earn yield
-    chain.sleep(3600)
-    chain.mine(270)
+    strategy.setDepositChunks(10, {"from": strategist})
+    assert strategy.depositChunks() == 10
 
-    # Harvest 2: Realize profit
-    before_pps = vault.pricePerShare()
+    # Harvest 1: Send funds through the strategy in chunks
+    chain.sleep(1)
     strategy.harvest()
-    chain.sleep(3600 * 6)  # 6 hrs needed for profits to unlock
-    chain.mine(1)
-    profit = token.balanceOf(vault.address)  # Profits go to vault
-    assert strategy.estimatedTotalAssets() + profit > amount + amount_2
-    assert vault.pricePerShare() >= before_pps
-
-    before_pps = vault.pricePerShare()
-    vault.withdraw({"from": user_2})
-    assert token.balanceOf(user_2) > amount_2
-    assert pytest.approx(token.balanceOf(user_2), rel=RELATIVE_APPROX) == amount_2 * (
-        before_pps / 10 ** vault.decimals()
+    assert (
+        pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == deposit
     )
-    assert pytest.approx(before_pps, rel=RELATIVE_APPROX) == vault.pricePerShare()
+
+    pair_assets = [
+        strategy.kashiPairEstimatedAssets(i) for i in range(len(kashi_pairs))
+    ]
+    assert pytest.approx(sum(pair_assets), rel=RELATIVE_APPROX) == deposit
+
+    # Spread over several pairs, their rates end closer together
+    assert sum(assets > 0 for assets in pair_assets) >= 2
+    split_rates = supply_rates()
+    assert max(split_rates) - min(split_rates) < max(single_rates) - min(single_rates)
 
     # Sleep for a while to earn yield
-    chain.sleep(3600)
-    chain.mine(270)
+    time_travel(3600, 270)
 
-    # Harvest 2: Realize profit
     before_pps = vault.pricePerShare()
     strategy.harvest()
-    chain.sleep(3600 * 6)  # 6 hrs needed for profits to unlock
-    chain.mine(1)
+    time_travel(3600 * 6)  # 6 hrs needed for profits to unlock
     assert vault.pricePerShare() > before_pps
 
-    before_pps = vault.pricePerShare()
     vault.withdraw({"from": user})
-    assert pytest.approx(token.balanceOf(user), rel=RELATIVE_APPROX) == amount * (
-        before_pps / 10 ** vault.decimals()
-    )
+    assert token.balanceOf(user) > deposit
 
-    # Sleep needed, not sure why
-    chain.sleep(3600 * 6)
-    chain.mine(1)
-    assert before_pps <= vault.pricePerShare()
 
-
-def test_multiple_users_and_adjust_ratios(
+def test_withdraw_touches_single_pair(
     chain,
-    accounts,
     token,
     vault,
     strategy,
     user,
-    user_2,
     strategist,
     amount,
-    amount_2,
     kashi_pairs,
     RELATIVE_APPROX,
 ):
     # Deposit to the vault
     token.approve(vault.address, amount, {"from": user})
     vault.deposit(amount, {"from": user})
-    assert token.balanceOf(vault.address) == amount
 
     # Harvest 1: Send funds through the strategy
     chain.sleep(1)
     strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
-
-    # Sleep for a while to earn yield
-    chain.sleep(360)
-    chain.mine(27)
-
     strategy.adjustKashiPairRatios([2500, 2500, 2500, 2500], {"from": strategist})
 
-    for n in range(1, len(kashi_pairs)):
-        assert (
-            pytest.approx(
-                kashi_pair_in_want(kashi_pairs[0], strategy) / 10 ** token.decimals(),
-                rel=RELATIVE_APPROX,
-            )
-            == kashi_pair_in_want(kashi_pairs[n], strategy) / 10 ** token.decimals()
-        )
+    before_assets = [
+        strategy.kashiPairEstimatedAssets(i) for i in range(len(kashi_pairs))
+    ]
 
-    token.approve(vault.address, amount, {"from": user_2})
-    vault.deposit(amount_2, {"from": user_2})
-    assert token.balanceOf(vault.address) >= amount_2
+    # A tenth of the assets fits in any single pair
+    vault.withdraw(vault.balanceOf(user) // 10, {"from": user})
 
-    # Sleep for a while to earn yield
-    chain.sleep(3600)
-    chain.mine(270)
+    after_assets = [
+        strategy.kashiPairEstimatedAssets(i) for i in range(len(kashi_pairs))
+    ]
+    touched = [i for i in range(len(kashi_pairs)) if after_assets[i] < before_assets[i]]
+    assert len(touched) == 1
+    assert pytest.approx(token.balanceOf(user), rel=RELATIVE_APPROX) == amount // 10
 
-    # Harvest 2: Realize profit
-    before_pps = vault.pricePerShare()
-    strategy.harvest()
-    chain.sleep(3600 * 6)  # 6 hrs needed for profits to unlock
-    chain.mine(1)
-    profit = token.balanceOf(vault.address)  # Profits go to vault
-    assert strategy.estimatedTotalAssets() + profit > amount + amount_2
-    assert vault.pricePerShare() > before_pps
 
-    before_pps = vault.pricePerShare()
-    vault.withdraw({"from": user_2})
-    assert token.balanceOf(user_2) > amount_2
-    assert pytest.approx(token.balanceOf(user_2), rel=RELATIVE_APPROX) == amount_2 * (
-        before_pps / 10 ** vault.decimals()
-    )
-    assert pytest.approx(before_pps, rel=RELATIVE_APPROX) == vault.pricePerShare()
+def test_accrue_staleness_window(
+    chain,
+    time_travel,
+    token,
+    vault,
+    strategy,
+    user,
+    strategist,
+    amount,
+    kashi_pairs,
+    RELATIVE_APPROX,
+):
+    with brownie.reverts():
+        strategy.setAccrueStalenessWindow(3600, {"from": user})
+    strategy.setAccrueStalenessWindow(3600, {"from": strategist})
+    assert strategy.accrueStalenessWindow() == 3600
+    strategy.setMaxReportDelay(30 * 24 * 3600, {"from": strategist})
+    # SUSHI would be sold too, leave only interest as a gain
+    strategy.setMinSushiSellValue(2 ** 96 - 1, {"from": strategist})
 
-    # Sleep for a while to earn yield
-    chain.sleep(360)
-    chain.mine(27)
+    # Deposit to the vault
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
 
-    # Harvest 2: Realize profit
-    before_pps = vault.pricePerShare()
+    # Harvest 1: Send funds through the strategy
+    chain.sleep(1)
     strategy.harvest()
-    chain.sleep(3600 * 6)  # 6 hrs needed for profits to unlock
-    chain.mine(1)
-    assert vault.pricePerShare() >= before_pps
+    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
-    strategy.adjustKashiPairRatios([4000, 2000, 2000, 2000], {"from": strategist})
-    for n in range(1, len(kashi_pairs)):
+    # Harvests accrue the pairs they hold whatever the window
+    time_travel(60)
+    tx = strategy.harvest()
+    held = [
+        kashi_pair
+        for i, kashi_pair in enumerate(kashi_pairs)
+        if strategy.kashiPairEstimatedAssets(i) > 0
+    ]
+    assert held
+    for kashi_pair in held:
+        assert kashi_pair.accrueInfo()[1] == tx.timestamp
+
+    # So do ratio adjustments, for every pair
+    time_travel(60)
+    tx = strategy.adjustKashiPairRatios([10_000, 0, 0, 0], {"from": strategist})
+    for kashi_pair in kashi_pairs:
+        assert kashi_pair.accrueInfo()[1] == tx.timestamp
+
+    # harvestTrigger counts no interest owed within the window
+    time_travel(1800)
+    assert not strategy.harvestTrigger(0)
+    strategy.setAccrueStalenessWindow(0, {"from": strategist})
+    assert strategy.harvestTrigger(0)
+
+
+def test_packed_setting_bounds(strategy, strategist):
+    # Settings are packed into narrower slots and must reject values that
+    # would not fit rather than truncate them
+    with brownie.reverts():
+        strategy.setDustThreshold(2 ** 96, {"from": strategist})
+    with brownie.reverts():
+        strategy.setAccrueStalenessWindow(2 ** 32, {"from": strategist})
+    with brownie.reverts():
+        strategy.setMinPendingSushi(2 ** 96, {"from": strategist})
+    with brownie.reverts():
+        strategy.setMinSushiSellValue(2 ** 96, {"from": strategist})
+
+    strategy.setDustThreshold(2 ** 96 - 1, {"from": strategist})
+    strategy.setAccrueStalenessWindow(2 ** 32 - 1, {"from": strategist})
+    assert strategy.dustThreshold() == 2 ** 96 - 1
+    assert strategy.accrueStalenessWindow() == 2 ** 32 - 1
+
+    # Neighbouring values in the shared slot are untouched
+    assert strategy.depositChunks() == 0
+    assert strategy.minPendingSushi() == 0
+    assert strategy.bentoBox() != ZERO_ADDRESS
+
+
+def test_strategy_state(
+    time_travel,
+    funded,
+    strategist,
+    reserve,
+    token,
+    bento_box,
+    kashi_pairs,
+    IMasterChef,
+):
+    strategy = funded.strategy
+    master_chef = IMasterChef.at(strategy.masterChef())
+    strategy.adjustKashiPairRatios([2_500] * 4, {"from": strategist})
+    token.transfer(strategy, funded.amount // 10, {"from": reserve})
+    time_travel(3600, 10)
+
+    # One call matches the views and reads it replaces
+    state = strategy.strategyState().dict()
+    assert state["totalAssets"] == strategy.estimatedTotalAssets()
+    assert state["idleWant"] == token.balanceOf(strategy)
+    assert state["idleShares"] == bento_box.balanceOf(token, strategy)
+    assert len(state["kashiPairs"]) == len(kashi_pairs)
+
+    # Brownie does not name the fields of structs in arrays
+    components = strategy.strategyState.abi["outputs"][0]["components"][0]
+    fields = [component["name"] for component in components["components"]]
+    shares_of_assets = []
+    for i, values in enumerate(state["kashiPairs"]):
+        pair_state = dict(zip(fields, values))
+        kashi_pair = kashi_pairs[i]
+        pid = strategy.kashiPairs(i).dict()["pid"]
+        assert pair_state["kashiPair"] == kashi_pair.address
+        assert pair_state["pid"] == pid
+        assert pair_state["assets"] == strategy.kashiPairEstimatedAssets(i)
         assert (
-            pytest.approx(
-                kashi_pair_in_want(kashi_pairs[0], strategy) / 10 ** token.decimals(),
-                rel=RELATIVE_APPROX,
-            )
-            == kashi_pair_in_want(kashi_pairs[n], strategy) * 2 / 10 ** token.decimals()
+            pair_state["shareOfAssets"]
+            == pair_state["assets"] * 10_000 // state["totalAssets"]
         )
-
-    before_pps = vault.pricePerShare()
-    vault.withdraw({"from": user})
-    assert pytest.approx(token.balanceOf(user), rel=RELATIVE_APPROX) == amount * (
-        before_pps / 10 ** vault.decimals()
+        assert pair_state["fractionInPair"] == kashi_pair.balanceOf(strategy)
+        assert pair_state["liquidShares"] == kashi_pair.totalAsset().dict()["elastic"]
+        assert pair_state["interestPerBlock"] == kashi_pair.accrueInfo()[0]
+        assert pair_state["lastAccrued"] == kashi_pair.accrueInfo()[1]
+        if pid != 0:
+            assert (
+                pair_state["fractionInMasterChef"]
+                == master_chef.userInfo(pid, strategy)[0]
+            )
+            assert pair_state["pendingSushi"] == master_chef.pendingSushi(pid, strategy)
+        assert pair_state["utilization"] < 10 ** 18
+
+        shares_of_assets.append(pair_state["shareOfAssets"])
+
+    assert sum(shares_of_assets) <= 10_000
+
+
+def test_kashi_pair_events(time_travel, funded, strategist, kashi_pairs):
+    strategy, vault = funded.strategy, funded.vault
+
+    def fraction_balances():
+        state = strategy.strategyState().dict()
+        return {
+            pair_state[0]: pair_state[4] + pair_state[5]
+            for pair_state in state["kashiPairs"]
+        }
+
+    # Every pair's balance follows from its deposits and withdrawals
+    balances = fraction_balances()
+    tx = strategy.adjustKashiPairRatios([2_500] * 4, {"from": strategist})
+    assert len(tx.events["KashiPairDeposit"]) >= 3
+    assert len(tx.events["KashiPairWithdrawal"]) >= 1
+    for event in tx.events:
+        if event.name == "KashiPairDeposit":
+            balances[event["kashiPair"]] += event["fraction"]
+        elif event.name == "KashiPairWithdrawal":
+            balances[event["kashiPair"]] -= event["fraction"]
+        else:
+            continue
+        assert event["shares"] > 0
+        assert balances[event["kashiPair"]] == event["fractionBalance"]
+    assert balances == fraction_balances()
+
+    # Harvests sum up every pair before moving funds
+    time_travel(3600, 10)
+    debt = vault.strategies(strategy).dict()["totalDebt"]
+    tx = strategy.harvest({"from": strategist})
+    harvested = tx.events["KashiPairsHarvested"]
+    assert list(harvested["kashiPairs"]) == [pair.address for pair in kashi_pairs]
+    assert len(harvested["kashiPairAssets"]) == len(kashi_pairs)
+    assert all(assets > 0 for assets in harvested["kashiPairAssets"])
+    assert sum(harvested["kashiPairAssets"]) <= harvested["totalAssets"]
+    assert (
+        harvested["totalAssets"]
+        == debt + tx.events["Harvested"]["profit"] - tx.events["Harvested"]["loss"]
     )
 
-    # Sleep needed, not sure why
-    chain.sleep(3600 * 6)
-    chain.mine(1)
-    assert before_pps <= vault.pricePerShare()
-
 
 def test_change_debt(
     chain, gov, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX
@@ -356,16 +464,3 @@ def test_new_strategy_no_pairs(
     name = "NewStrat"
     new_strategy = strategist.deploy(Strategy, vault, bento_box, [], [], name)
     assert new_strategy.estimatedTotalAssets() == 0
-
-
-def kashi_pair_in_want(kashi_pair, account):
-    kashi_fraction = kashi_pair.balanceOf(account)
-    bento_box = Contract(kashi_pair.bentoBox())
-    token = Contract(kashi_pair.asset())
-    total_asset = kashi_pair.totalAsset().dict()
-    total_borrow = kashi_pair.totalBorrow().dict()
-    all_share = total_asset["elastic"] + bento_box.toShare(
-        token, total_borrow["elastic"], True
-    )
-    bento_shares = (kashi_fraction * all_share) / total_asset["base"]
-    return bento_box.toAmount(token, bento_shares, True)
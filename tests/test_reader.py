@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+
+from brownie import web3
+from scripts.reader import KashiReader
+
+
+def counting(calls):
+    # A web3 stand-in that counts the eth_calls going through it
+    def call(tx, block):
+        calls.append(block)
+        return web3.eth.call(tx, block)
+
+    return SimpleNamespace(eth=SimpleNamespace(call=call))
+
+
+def test_read(borrowed, kashi_pairs, pids, bento_box, token, IMasterChef):
+    strategy = borrowed.strategy
+    master_chef = IMasterChef.at(strategy.masterChef())
+    snapshot = KashiReader().read(web3, kashi_pairs, strategy, pids=pids)
+
+    assert snapshot.block == web3.eth.block_number
+    assert snapshot.account == strategy.address
+    for i, (kashi_pair, pair) in enumerate(zip(kashi_pairs, snapshot.pairs)):
+        assert pair.address == kashi_pair.address
+        assert pair.asset == token.address
+        assert pair.bento_box == bento_box.address
+        assert pair.pid == pids[i]
+        assert pair.fraction_in_pair == kashi_pair.balanceOf(strategy)
+        assert (
+            pair.fraction_in_master_chef == master_chef.userInfo(pids[i], strategy)[0]
+        )
+        assert pair.total_asset.elastic == kashi_pair.totalAsset()[0]
+        assert pair.total_borrow.elastic == kashi_pair.totalBorrow()[0]
+        assert pair.last_accrued == kashi_pair.accrueInfo()[1]
+        assert pair.amount == strategy.kashiPairEstimatedAssets(i)
+
+    # The strategy's position is staked, and all of it is borrowed
+    assert snapshot.pairs[0].fraction_in_master_chef > 0
+    assert snapshot.amounts[0] > 0
+    assert snapshot.pairs[0].utilization > 0
+
+
+def test_read_pinned(chain, funded, strategist, kashi_pairs, pids):
+    strategy = funded.strategy
+    reader = KashiReader()
+    block = chain.height
+    before = reader.read(web3, kashi_pairs, strategy, pids=pids)
+
+    strategy.adjustKashiPairRatios([10_000, 0, 0, 0], {"from": strategist})
+    after = reader.read(web3, kashi_pairs, strategy, pids=pids)
+    assert before.amounts[0] > 0
+    assert after.amounts[0] > before.amounts[0]
+    assert after.amounts == [strategy.kashiPairEstimatedAssets(i) for i in range(4)]
+
+    # The same state as at the time, whatever happened since
+    assert reader.read(web3, kashi_pairs, strategy, block, pids) == before
+
+
+def test_read_caches_immutables(funded, kashi_pairs, pids):
+    strategy = funded.strategy
+    reader = KashiReader()
+    calls = []
+
+    # The assets and bentoBoxes once, then one call for every read
+    reader.read(counting(calls), kashi_pairs, strategy, pids=pids)
+    assert len(calls) == 2
+    reader.read(counting(calls), kashi_pairs, strategy, pids=pids)
+    reader.read(counting(calls), kashi_pairs[:2], strategy, pids=pids[:2])
+    assert len(calls) == 4
@@ -5,6 +5,7 @@ import pytest
 
 def test_multiple_users_shutdown(
     chain,
+    time_travel,
     accounts,
     token,
     vault,
@@ -28,30 +29,26 @@ def test_multiple_users_shutdown(
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
     # Sleep for a while to earn yield
-    chain.sleep(360)
-    chain.mine(27)
+    time_travel(360, 27)
 
     token.approve(vault.address, amount, {"from": user_2})
     vault.deposit(amount_2, {"from": user_2})
     assert token.balanceOf(vault.address) >= amount_2
 
     # Sleep for a while to earn yield
-    chain.sleep(3600)
-    chain.mine(270)
+    time_travel(3600, 270)
 
     # Harvest 2: Realize profit
     before_pps = vault.pricePerShare()
     strategy.harvest()
-    chain.sleep(3600 * 6)  # 6 hrs needed for profits to unlock
-    chain.mine(1)
+    time_travel(3600 * 6)  # 6 hrs needed for profits to unlock
     profit = token.balanceOf(vault.address)  # Profits go to vault
     assert strategy.estimatedTotalAssets() + profit > amount + amount_2
     assert vault.pricePerShare() >= before_pps
 
     strategy.setEmergencyExit()
     strategy.harvest()
-    chain.sleep(3600 * 10)  # 6 hrs needed for profits to unlock
-    chain.mine(1)
+    time_travel(3600 * 10)  # 6 hrs needed for profits to unlock
 
     before_pps = vault.pricePerShare()
     vault.withdraw({"from": user_2})
@@ -62,8 +59,7 @@ def test_multiple_users_shutdown(
     assert pytest.approx(before_pps, rel=RELATIVE_APPROX) == vault.pricePerShare()
 
     # Sleep for a while to earn yield
-    chain.sleep(3600)
-    chain.mine(270)
+    time_travel(3600, 270)
 
     before_pps = vault.pricePerShare()
     vault.withdraw({"from": user})
@@ -0,0 +1,146 @@
+import pytest
+from brownie import ZERO_ADDRESS, config
+
+DAY = 24 * 3600
+
+
+def test_eth_to_want(time_travel, funded, token, weth, IUniswapV2Router02):
+    strategy = funded.strategy
+    sushi_router = IUniswapV2Router02.at(strategy.sushiRouter())
+    time_travel(3600)
+
+    # Close to the spot price of a small trade
+    spot = sushi_router.getAmountsOut(10 ** 15, [weth, token])[-1] * 1_000
+    assert pytest.approx(strategy.ethToWant(10 ** 18), rel=0.01) == spot
+    assert strategy.ethToWant(0) == 0
+
+
+def test_eth_to_want_fresh(
+    time_travel, deploy_vault, deploy_strategy, token, weth, IUniswapV2Router02
+):
+    strategy = deploy_strategy(deploy_vault())
+    sushi_router = IUniswapV2Router02.at(strategy.sushiRouter())
+
+    # No average over a full period yet, the spot quote stands in for it
+    for _ in range(2):
+        spot = sushi_router.getAmountsOut(10 ** 18, [weth, token])[-1]
+        assert strategy.ethToWant(10 ** 18) == spot
+        time_travel(60)
+
+
+def test_eth_to_want_without_pair(
+    mock_protocol,
+    pm,
+    gov,
+    rewards,
+    guardian,
+    management,
+    strategist,
+    user,
+    bento_box,
+    invalid_kashi_pairs,
+    MockERC20,
+    Strategy,
+):
+    if not mock_protocol:
+        pytest.skip("needs a want without a WETH pair")
+    # The mock router has no WETH/DAI pool
+    kashi_pair = invalid_kashi_pairs[1]
+    dai = MockERC20.at(kashi_pair.asset())
+    vault = guardian.deploy(pm(config["dependencies"][0]).Vault)
+    vault.initialize(dai, gov, rewards, "", "", guardian, management)
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    strategy = strategist.deploy(Strategy, vault, bento_box, [kashi_pair], [0], "")
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
+    assert strategy.wantPricePair() == ZERO_ADDRESS
+    assert strategy.ethToWant(10 ** 18) == 0
+
+    # A deposit waiting in the vault does not pay for a call it cannot price
+    amount = 1_000 * 10 ** 18
+    dai.mint(user, amount, {"from": user})
+    dai.approve(vault, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    assert not strategy.harvestTrigger(10 ** 15)
+    assert strategy.harvestTrigger(0)
+
+
+def test_eth_to_want_resists_manipulation(
+    time_travel, mock_protocol, funded, token, weth
+):
+    if not mock_protocol:
+        pytest.skip("moves the reserves of the mock router")
+    strategy = funded.strategy
+    time_travel(2 * 3600)
+    price = strategy.ethToWant(10 ** 18)
+
+    # Ten times the price, the block it happens in does not count yet
+    mock_protocol.sushi_router.setReserves(
+        weth,
+        token,
+        20_000 * 10 ** 18,
+        500_000_000 * 10 ** 6,
+        {"from": mock_protocol.whale},
+    )
+    assert pytest.approx(strategy.ethToWant(10 ** 18), rel=1e-3) == price
+
+    # Held for a minute, it weighs a minute of the average
+    time_travel(60)
+    assert price < strategy.ethToWant(10 ** 18) < price * 11 // 10
+
+
+def test_harvest_trigger(
+    chain, time_travel, funded, strategist, token, user, amount, kashi_pairs
+):
+    vault, strategy = funded.vault, funded.strategy
+    strategy.setMaxReportDelay(30 * DAY, {"from": strategist})
+    # SUSHI would be sold too, leave only interest as a gain
+    strategy.setMinSushiSellValue(2 ** 96 - 1, {"from": strategist})
+
+    # Nothing to realize right after a harvest
+    time_travel(1)
+    assert not strategy.harvestTrigger(10 ** 15)
+
+    # The interest owed by borrowers counts before the pairs are accrued
+    time_travel(7 * DAY)
+    for kashi_pair in kashi_pairs:
+        kashi_pair.accrue({"from": user})
+    debt = vault.strategies(strategy).dict()["totalDebt"]
+    profit = strategy.estimatedTotalAssets() - debt
+    chain.undo(len(kashi_pairs))
+    assert profit > 0
+
+    # Gas worth a 200th and a 50th of the profit, times a profitFactor of 100
+    call_cost = profit * 10 ** 18 // strategy.ethToWant(10 ** 18) // 200
+    assert strategy.harvestTrigger(call_cost)
+    assert not strategy.harvestTrigger(call_cost * 4)
+
+    # New deposits for the strategy count as well
+    token.approve(vault, amount, {"from": user})
+    vault.deposit(amount // 100, {"from": user})
+    assert strategy.harvestTrigger(call_cost * 4)
+
+    # Overdue harvests go ahead whatever they cost
+    time_travel(30 * DAY)
+    assert strategy.harvestTrigger(10 ** 24)
+
+
+def test_tend_trigger(time_travel, funded, strategist, token, reserve):
+    strategy = funded.strategy
+    strategy.setMaxReportDelay(30 * DAY, {"from": strategist})
+
+    # Everything is lent out already
+    time_travel(1)
+    assert not strategy.tendTrigger(0)
+
+    # Idle want earns interest until the next harvest would have lent it
+    token.transfer(strategy, funded.amount, {"from": reserve})
+    assert strategy.tendTrigger(0)
+    assert not strategy.tendTrigger(10 ** 21)
+
+    strategy.tend({"from": strategist})
+    assert not strategy.tendTrigger(0)
+
+    # Overdue, harvestTrigger takes over
+    token.transfer(strategy, funded.amount, {"from": reserve})
+    time_travel(30 * DAY)
+    assert not strategy.tendTrigger(0)